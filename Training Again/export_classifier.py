@@ -0,0 +1,66 @@
+"""
+Export the trained posture classifier for CPU inference without PyTorch
+
+Writes an ONNX model (runs on ONNX Runtime) and/or an OpenVINO IR directory
+next to the .pt weights, where the app's classifier backend looks for them:
+
+runs/classify/train3/weights/
+    best.pt
+    best.onnx               # --format onnx
+    best_openvino_model/    # --format openvino
+
+Usage:
+    python export_classifier.py                      # ONNX
+    python export_classifier.py --format openvino
+    python export_classifier.py --format all --weights path/to/best.pt
+
+Requirements:
+    - ultralytics
+    - onnx (ONNX export), openvino (OpenVINO export)
+    - (see requirements.txt)
+"""
+
+import argparse
+import os
+import shutil
+
+from ultralytics import YOLO
+
+# Paths
+WEIGHTS = os.path.join(os.path.dirname(__file__), 'runs', 'classify', 'train3', 'weights', 'best.pt')
+IMG_SIZE = 224  # Must match the training image size
+
+
+def export(weights, fmt, imgsz=IMG_SIZE):
+    """Export weights to fmt ('onnx' or 'openvino') and return the output path."""
+    model = YOLO(weights)
+    # Static batch-1 graph: the app classifies one frame at a time
+    kwargs = {'simplify': True} if fmt == 'onnx' else {}
+    output = model.export(format=fmt, imgsz=imgsz, dynamic=False, half=False, **kwargs)
+
+    # Keep the output next to the weights even if ultralytics chose another location
+    stem = os.path.splitext(weights)[0]
+    expected = f"{stem}.onnx" if fmt == 'onnx' else f"{stem}_openvino_model"
+    if os.path.abspath(str(output).rstrip(os.sep)) != os.path.abspath(expected):
+        if os.path.isdir(expected):
+            shutil.rmtree(expected)
+        shutil.move(str(output), expected)
+    return expected
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export the posture classifier to ONNX / OpenVINO')
+    parser.add_argument('--weights', default=WEIGHTS, help='Trained .pt classifier weights')
+    parser.add_argument('--format', default='onnx', choices=['onnx', 'openvino', 'all'])
+    parser.add_argument('--imgsz', type=int, default=IMG_SIZE)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.weights):
+        raise FileNotFoundError(f"Model weights not found: {args.weights}")
+
+    formats = ['onnx', 'openvino'] if args.format == 'all' else [args.format]
+    for fmt in formats:
+        path = export(args.weights, fmt, args.imgsz)
+        print(f"Exported {fmt}: {path}")
+
+    print("Export complete. Verify with: python test_classifier_backends.py (from the app directory)")
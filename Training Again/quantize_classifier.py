@@ -0,0 +1,231 @@
+"""
+INT8 post-training quantization for the posture classifier
+
+Quantizes the exported FP32 classifier (see export_classifier.py) with static
+post-training quantization, calibrated on images from the training split,
+then compares the FP32 and INT8 models on the validation split:
+top-1 accuracy, per-image latency (mean / p95) and memory (file size and
+resident memory added by loading the model).
+
+Outputs next to the weights:
+
+runs/classify/train3/weights/
+    best_int8.onnx              # --backend onnx (ONNX Runtime, QDQ format)
+    best_int8_openvino_model/   # --backend openvino (NNCF via ultralytics)
+
+and the report in runs/quantize/report_<backend>.json / .md
+
+Select the quantized model in the app with CLASSIFIER_PRECISION=int8.
+
+Usage:
+    python quantize_classifier.py
+    python quantize_classifier.py --backend openvino --calibration-images 300
+
+Requirements:
+    - ultralytics, onnx, onnxruntime (ONNX) or openvino + nncf (OpenVINO)
+    - (see requirements.txt)
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+import psutil
+
+from export_classifier import WEIGHTS, IMG_SIZE, export
+
+# The app's classifier backends live one directory up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from classifier_backend import exported_path, load_exported_classifier  # noqa: E402
+
+# Paths
+DATASET_DIR = os.path.join(os.path.dirname(__file__), 'yolo_dataset')
+REPORT_DIR = os.path.join(os.path.dirname(__file__), 'runs', 'quantize')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def list_images(split):
+    """(path, class_name) pairs for a dataset split organised as split/class/image."""
+    split_dir = os.path.join(DATASET_DIR, split)
+    samples = []
+    for class_name in sorted(os.listdir(split_dir)):
+        class_dir = os.path.join(split_dir, class_name)
+        if os.path.isdir(class_dir):
+            samples.extend((os.path.join(class_dir, f), class_name)
+                           for f in sorted(os.listdir(class_dir)) if f.lower().endswith(IMAGE_EXTENSIONS))
+    return samples
+
+
+class _CalibrationReader:
+    """Feeds preprocessed training images to onnxruntime's calibrator."""
+
+    def __init__(self, classifier, paths):
+        self._input = classifier.session.get_inputs()[0].name
+        self._batches = (classifier.preprocess(cv2.imread(p)) for p in paths)
+
+    def get_next(self):
+        batch = next(self._batches, None)
+        return None if batch is None else {self._input: batch}
+
+
+def quantize_onnx(weights, calibration_paths):
+    import onnx
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    fp32_path = exported_path(weights, 'onnx')
+    if not os.path.exists(fp32_path):
+        export(weights, 'onnx', IMG_SIZE)
+    int8_path = exported_path(weights, 'onnx', 'int8')
+
+    fp32 = load_exported_classifier(weights, 'onnx')
+    quantize_static(
+        fp32_path, int8_path,
+        _CalibrationReader(fp32, calibration_paths),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=CalibrationMethod.MinMax
+    )
+
+    # Carry over the ultralytics metadata (class names, image size) the app reads
+    source, quantized = onnx.load(fp32_path), onnx.load(int8_path)
+    present = {p.key for p in quantized.metadata_props}
+    for prop in source.metadata_props:
+        if prop.key not in present:
+            quantized.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(quantized, int8_path)
+    return int8_path
+
+
+def quantize_openvino(weights):
+    from ultralytics import YOLO
+
+    # ultralytics drives NNCF and calibrates on the dataset itself
+    output = YOLO(weights).export(format='openvino', int8=True, imgsz=IMG_SIZE, data=DATASET_DIR)
+    expected = exported_path(weights, 'openvino', 'int8')
+    if not output or not os.path.isdir(output):
+        raise RuntimeError(f"OpenVINO INT8 export did not produce a model directory (got {output!r})")
+    if os.path.abspath(output) != os.path.abspath(expected):
+        # Put it where classifier_backend looks for it
+        if os.path.exists(expected):
+            shutil.rmtree(expected)
+        shutil.move(output, expected)
+    print(f"OpenVINO INT8 export: {expected}")
+    return expected
+
+
+def _file_size_mb(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1e6
+    return os.path.getsize(path) / 1e6
+
+
+def evaluate(weights, backend, precision, samples, warmup=5):
+    """Top-1 accuracy, latency and memory of one exported variant on samples (see evaluate_isolated)."""
+    gc.collect()
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    classifier = load_exported_classifier(weights, backend, precision=precision)
+    rss_loaded = process.memory_info().rss
+
+    images = [(cv2.imread(path), label) for path, label in samples]
+    for image, _ in images[:warmup]:
+        classifier.predict(image)
+
+    correct, latencies = 0, []
+    for image, label in images:
+        started = time.perf_counter()
+        predicted, _ = classifier.predict(image)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+        correct += predicted == label
+
+    return {
+        'model': exported_path(weights, backend, precision),
+        'top1_accuracy': round(correct / len(images), 4),
+        'latency_ms_mean': round(float(np.mean(latencies)), 2),
+        'latency_ms_p95': round(float(np.percentile(latencies, 95)), 2),
+        'file_size_mb': round(_file_size_mb(exported_path(weights, backend, precision)), 2),
+        'load_rss_mb': round((rss_loaded - rss_before) / 1e6, 1),
+        'peak_rss_mb': round(process.memory_info().rss / 1e6, 1),
+        'images': len(images)
+    }
+
+
+def evaluate_isolated(weights, backend, precision, samples):
+    """
+    evaluate() in a fresh process, so memory freed by the previous variant
+    (rarely returned to the OS) doesn't skew this one's RSS figures.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(evaluate, weights, backend, precision, samples).result()
+
+
+def write_report(backend, results):
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    json_path = os.path.join(REPORT_DIR, f'report_{backend}.json')
+    with open(json_path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    fp32, int8 = results['fp32'], results['int8']
+    rows = [
+        ('Top-1 accuracy', 'top1_accuracy', '{:.2%}'),
+        ('Latency mean (ms)', 'latency_ms_mean', '{:.2f}'),
+        ('Latency p95 (ms)', 'latency_ms_p95', '{:.2f}'),
+        ('Model size (MB)', 'file_size_mb', '{:.2f}'),
+        ('RSS added on load (MB)', 'load_rss_mb', '{:.1f}'),
+    ]
+    lines = [f"# Posture classifier INT8 report ({backend})", "",
+             f"Validation images: {fp32['images']}", "",
+             "| Metric | FP32 | INT8 |", "|---|---|---|"]
+    lines += [f"| {name} | {fmt.format(fp32[key])} | {fmt.format(int8[key])} |" for name, key, fmt in rows]
+    lines += ["", f"Speedup (mean latency): {fp32['latency_ms_mean'] / max(int8['latency_ms_mean'], 1e-6):.2f}x",
+              f"Accuracy change: {(int8['top1_accuracy'] - fp32['top1_accuracy']) * 100:+.2f} pts"]
+    md_path = os.path.join(REPORT_DIR, f'report_{backend}.md')
+    with open(md_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    print('\n'.join(lines))
+    return md_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='INT8-quantize the posture classifier and report accuracy/latency')
+    parser.add_argument('--weights', default=WEIGHTS, help='Trained .pt classifier weights')
+    parser.add_argument('--backend', default='onnx', choices=['onnx', 'openvino'])
+    parser.add_argument('--calibration-images', type=int, default=200, help='Training images used for calibration')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.weights):
+        raise FileNotFoundError(f"Model weights not found: {args.weights}")
+    if not os.path.exists(DATASET_DIR):
+        raise FileNotFoundError(f"Dataset directory not found: {DATASET_DIR}")
+
+    train = [path for path, _ in list_images('train')]
+    random.Random(0).shuffle(train)
+    calibration = train[:args.calibration_images]
+
+    if args.backend == 'onnx':
+        quantize_onnx(args.weights, calibration)
+    else:
+        if not os.path.exists(exported_path(args.weights, 'openvino')):
+            export(args.weights, 'openvino', IMG_SIZE)
+        quantize_openvino(args.weights)
+
+    val = list_images('val')
+    results = {
+        'backend': args.backend,
+        'calibration_images': len(calibration),
+        'fp32': evaluate_isolated(args.weights, args.backend, 'fp32', val),
+        'int8': evaluate_isolated(args.weights, args.backend, 'int8', val)
+    }
+    report = write_report(args.backend, results)
+    print(f"Report saved to {report}")
@@ -1,12 +1,12 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, Response, jsonify, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, session, Response, jsonify, send_file, stream_with_context
 import os
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import mediapipe as mp
+from mediapipe.framework.formats import landmark_pb2
 import time
 from config import Config
-from db import create_user, verify_user, save_posture_record, get_user_posture_history, get_exercises, record_completed_exercise, update_user, get_all_users, admin_create_user, delete_user, toggle_user_status, get_db_connection, test_connection, save_verification_token, verify_email_token, verify_password_change_token, clear_password_change_token, get_user_by_email, clear_user_posture_history, delete_posture_record
+from db import pool_stats, create_user, verify_user, save_posture_records, get_user_posture_history, get_exercises, record_completed_exercise, update_user, get_all_users, admin_create_user, delete_user, toggle_user_status, db_health, save_verification_token, verify_email_token, verify_password_change_token, clear_password_change_token, get_user_by_email, clear_user_posture_history, delete_posture_record, save_stream_settings, db_cursor, DatabaseUnavailable
 from datetime import datetime, timedelta
 from functools import wraps
 import logging
@@ -15,11 +15,28 @@ from werkzeug.security import generate_password_hash, check_password_hash
 import bcrypt
 # Removed face recognition and security logger imports as part of simplifying to single-person posture monitoring
 from email_service import email_service
+from camera import camera_registry
+from model_manager import model_manager
+from inference_pool import InferencePool
+from posture_events import PostureEventBus
+from posture_state import create_state_store
+from posture_scoring import landmarks_to_array, score_posture
+from inference_cadence import InferenceCadence
+from posture_smoothing import PostureSmoother
+from posture_sessions import MonitoringSessions
+from record_writer import PostureRecordWriter
+from person_tracker import PersonTracker
+from frame_preprocessor import FramePreprocessor
+from frame_ingest import FrameIngest
+from stage_timings import StageTimings
+from metrics import stage_latency, db_latency, record_flush_latency, format_metric
+from video_pipeline import get_stream_pipeline, get_active_pipelines, get_all_pipelines, resolve_stream_settings, STREAM_PRESETS
 import io
 import csv
 import zipfile
 import google.generativeai as genai
 import json
+import itertools
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -28,6 +45,10 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.config.from_object(Config)
 
+# Inference worker processes (INFERENCE_WORKERS) import this module as __mp_main__ when
+# the app is run as a script; they must not start the app's background services
+_IN_INFERENCE_WORKER = __name__ == '__mp_main__'
+
 # Removed face registration configuration
 
 # Ensure the secret key is set
@@ -43,22 +64,41 @@ if Config.GEMINI_API_KEY:
 
  
 
-# Global state for posture calibration and latest pose landmarks
-# Note: This is per-process memory and resets on server restart
-LATEST_POINTS = None  # dict[int, tuple[int, int]] of last detected pixel points
-CALIBRATION = {
-	'front_angle_deg': None,   # Baseline front angle (nose vs shoulders mid vertical)
-	'timestamp': None,
-	'tolerance_deg': 12.0      # Allowed deviation from baseline before marking as bad
-}
-
-# Global state for real-time posture data
-CURRENT_POSTURE_DATA = {
-    'posture_quality': 'unknown',
-    'confidence': 0.0,
-    'timestamp': None,
-    'last_update': None
-}
+# Per-user live monitoring state: latest posture reading, latest landmark points,
+# calibration baseline and pending alarm. In-process by default; set
+# POSTURE_STATE_BACKEND=redis to share it between worker processes.
+posture_state = create_state_store(Config.POSTURE_STATE_BACKEND, Config.POSTURE_STATE_REDIS_URL)
+
+# Server-Sent Events fan-out of posture changes and session totals (replaces 1 s polling on the dashboard)
+posture_events = PostureEventBus(
+    heartbeat=Config.POSTURE_EVENT_HEARTBEAT,
+    min_delta=Config.POSTURE_EVENT_MIN_DELTA,
+    session_stats=lambda user_id: monitoring_sessions.stats(user_id)
+)
+
+# Posture records are written behind the request, batched into one multi-row INSERT per flush.
+# Registered for exit before the monitoring sessions, so it drains after they have been saved
+record_writer = PostureRecordWriter(
+    save_posture_records,
+    batch_size=Config.RECORD_WRITER_BATCH_SIZE,
+    flush_interval=Config.RECORD_WRITER_FLUSH_INTERVAL,
+    max_queue=Config.RECORD_WRITER_MAX_QUEUE
+)
+if not _IN_INFERENCE_WORKER:
+    record_writer.register_atexit()
+
+# Monitoring sessions accounted from the smoothed posture stream; rows are saved on stop,
+# after SESSION_IDLE_TIMEOUT seconds without readings, every SESSION_MAX_SEGMENT seconds and at exit
+monitoring_sessions = MonitoringSessions(
+    record_writer.submit,
+    good_threshold=Config.SESSION_GOOD_THRESHOLD,
+    fair_threshold=Config.SESSION_FAIR_THRESHOLD,
+    idle_timeout=Config.SESSION_IDLE_TIMEOUT,
+    max_segment=Config.SESSION_MAX_SEGMENT,
+    on_change=posture_events.publish_session
+)
+if not _IN_INFERENCE_WORKER:
+    monitoring_sessions.register_atexit()
 
 # Exercise recommendation system
 def generate_exercise_recommendations(current_record, history_records):
@@ -188,18 +228,22 @@ def _gemini_generate_text(_model_name_unused, prompt, *, response_mime_type=None
     except Exception:
         return ''
 
-# Test database connection on startup
-if not test_connection():
-    logger.error("Failed to establish initial database connection. The application may not function correctly.")
-else:
-    logger.info("Initial database connection successful")
+# Monitor database health in the background; requests only read the cached flag
+if not _IN_INFERENCE_WORKER:
+    db_health.start()
+
+# Endpoints that never touch the database: static assets, the video stream,
+# the readiness probe and the in-memory posture polling endpoints
+DB_EXEMPT_ENDPOINTS = {'static', 'video_feed', 'healthz', 'get_current_posture', 'check_posture_alarm', 'posture_events_stream', 'get_pose_engine_status', 'pose_stream', 'ingest_frame', 'video_feed_stats', 'metrics', 'monitoring_session_stats', 'start_monitoring_session'}
 
 @app.before_request
 def before_request():
     """
-    Check database connection before each request
+    Reject requests early while the database is known to be down
     """
-    if not test_connection():
+    if request.endpoint in DB_EXEMPT_ENDPOINTS:
+        return
+    if not db_health.is_healthy:
         logger.error("Database connection lost before request")
         return jsonify({'success': False, 'message': 'Database connection error'}), 500
 
@@ -212,182 +256,24 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def calculate_angle(a, b, c):
-    """Calculate the angle between three points"""
-    a = np.array(a)
-    b = np.array(b)
-    c = np.array(c)
-    
-    radians = np.arctan2(c[1]-b[1], c[0]-b[0]) - np.arctan2(a[1]-b[1], a[0]-b[0])
-    angle = np.abs(radians*180.0/np.pi)
-    
-    if angle > 180.0:
-        angle = 360-angle
-        
-    return angle
-
-def classify_posture(landmarks, image_shape):
-    """Classify posture using rule-based logic (ML classifier removed)."""
-    
-    if not landmarks:
-        return "Unknown", 0.0
-    
-    # Convert landmarks to pixel coordinates
-    h, w = image_shape[:2]
-    points = {}
-    for idx, landmark in enumerate(landmarks.landmark):
-        points[idx] = (int(landmark.x * w), int(landmark.y * h))
-    
-    try:
-        # Calculate multiple angles for better accuracy
-        
-        # 1. Neck angle (ear through shoulder to hip)
-        neck_angle = calculate_angle(
-            points[mp_pose.PoseLandmark.RIGHT_EAR.value],
-            points[mp_pose.PoseLandmark.RIGHT_SHOULDER.value],
-            points[mp_pose.PoseLandmark.RIGHT_HIP.value]
-        )
-        
-        # 2. Upper back angle (shoulder through hip to knee)
-        upper_back_angle = calculate_angle(
-            points[mp_pose.PoseLandmark.RIGHT_SHOULDER.value],
-            points[mp_pose.PoseLandmark.RIGHT_HIP.value],
-            points[mp_pose.PoseLandmark.RIGHT_KNEE.value]
-        )
-        
-        # 3. Head tilt (ear to ear through nose)
-        head_tilt = calculate_angle(
-            points[mp_pose.PoseLandmark.LEFT_EAR.value],
-            points[mp_pose.PoseLandmark.NOSE.value],
-            points[mp_pose.PoseLandmark.RIGHT_EAR.value]
-        )
-        
-        # 4. Shoulder alignment (left to right shoulder)
-        shoulder_angle = calculate_angle(
-            points[mp_pose.PoseLandmark.LEFT_SHOULDER.value],
-            points[mp_pose.PoseLandmark.RIGHT_SHOULDER.value],
-            (points[mp_pose.PoseLandmark.RIGHT_SHOULDER.value][0] + 100, 
-             points[mp_pose.PoseLandmark.RIGHT_SHOULDER.value][1])
-        )
-
-        # 5. Front angle (calibrated): angle between vector from shoulder midpoint to nose and vertical axis
-        ls = points.get(mp_pose.PoseLandmark.LEFT_SHOULDER.value)
-        rs = points.get(mp_pose.PoseLandmark.RIGHT_SHOULDER.value)
-        nose = points.get(mp_pose.PoseLandmark.NOSE.value)
-
-        front_angle_deg = None
-        front_score = 1.0
-        if ls and rs and nose:
-            shoulder_mid = ((ls[0] + rs[0]) // 2, (ls[1] + rs[1]) // 2)
-            # Vector from shoulder midpoint to nose
-            vx = nose[0] - shoulder_mid[0]
-            vy = nose[1] - shoulder_mid[1]
-            # Angle relative to vertical axis (0 = perfectly vertical above/below shoulders)
-            # We use atan2 of x vs -y so that small lateral offsets also contribute
-            front_angle_rad = np.arctan2(vx, -vy)
-            front_angle_deg = float(abs(front_angle_rad * 180.0 / np.pi))
-
-            # If calibration exists, score based on deviation from baseline
-            if CALIBRATION.get('front_angle_deg') is not None:
-                baseline = CALIBRATION['front_angle_deg']
-                tol = CALIBRATION.get('tolerance_deg', 12.0)
-                diff = abs(front_angle_deg - baseline)
-                front_score = 1.0 - min(diff / max(tol, 1e-6), 1.0)
-
-        # Calculate confidence scores for each metric
-        neck_score = 1.0 - min(abs(170 - neck_angle) / 40.0, 1.0)
-        back_score = 1.0 - min(abs(175 - upper_back_angle) / 40.0, 1.0)
-        head_score = 1.0 - min(abs(180 - head_tilt) / 30.0, 1.0)
-        shoulder_score = 1.0 - min(abs(180 - shoulder_angle) / 30.0, 1.0)
-        
-        # Weight the scores
-        weights = {
-            'neck': 0.30,
-            'back': 0.30,
-            'head': 0.15,
-            'shoulder': 0.10,
-            'front': 0.15
-        }
-        
-        # Calculate weighted confidence score
-        confidence = (
-            (neck_score * weights['neck']) +
-            (back_score * weights['back']) +
-            (head_score * weights['head']) +
-            (shoulder_score * weights['shoulder']) +
-            (front_score * weights['front'])
-        )
-        
-        # Clamp between 0 and 1
-        confidence = max(0.0, min(1.0, confidence))
-        
-        # Simplified classification (just good/bad) with front-angle check emphasized if calibrated
-        good_thresh = 0.7  # Fixed threshold
-        posture = "Good Posture" if confidence > good_thresh else "Bad Posture"
-        
-        # Attach auxiliary details via function attributes for downstream display
-        classify_posture.last_front_angle_deg = front_angle_deg
-        classify_posture.last_front_score = front_score
-        
-        return posture, confidence
-            
-    except KeyError:
-        return "Unknown", 0.0
-
-# Load YOLO and MediaPipe
-if 'yolo_model' not in globals():
-    # Prefer project classifier weights; gracefully fall back to classifier base, then detector
-    posture_model = None
-    USE_CLASSIFIER = False
-    try:
-        # 1) Try project-trained classifier (best.pt)
-        _candidate = YOLO(os.path.join('Training Again', 'runs', 'classify', 'train3', 'weights', 'best.pt'))
-        _dummy = np.zeros((32, 32, 3), dtype=np.uint8)
-        _res = _candidate(_dummy, verbose=False)
-        # Classifier outputs should expose probs on results
-        _has_probs = False
-        for _r in _res:
-            if hasattr(_r, 'probs') and _r.probs is not None:
-                _has_probs = True
-                break
-        if _has_probs:
-            posture_model = _candidate
-            USE_CLASSIFIER = True
-            logger.info("Loaded posture classifier from Training Again/runs/classify/train3/weights/best.pt")
-        else:
-            raise RuntimeError('best.pt did not return classification probabilities')
-    except Exception as _e1:
-        try:
-            # 2) Fallback to yolov8n-cls.pt
-            _candidate2 = YOLO('yolov8n-cls.pt')
-            _dummy2 = np.zeros((32, 32, 3), dtype=np.uint8)
-            _res2 = _candidate2(_dummy2, verbose=False)
-            _has_probs2 = False
-            for _r in _res2:
-                if hasattr(_r, 'probs') and _r.probs is not None:
-                    _has_probs2 = True
-                    break
-            if _has_probs2:
-                posture_model = _candidate2
-                USE_CLASSIFIER = True
-                logger.info("Loaded posture classifier from yolov8n-cls.pt")
-            else:
-                raise RuntimeError('yolov8n-cls.pt did not return classification probabilities')
-        except Exception as _e2:
-            # 3) Revert to detector for person detection
-            yolo_model = YOLO('yolov8n.pt')
-            USE_CLASSIFIER = False
-            logger.info("Classifier unavailable; reverted to yolov8n.pt detector")
-# Removed MyPostureDetection integration (classifier-only path)
-if 'mp_pose' not in globals():
-    mp_pose = mp.solutions.pose
-    pose = mp_pose.Pose(
-        static_image_mode=False,
-        model_complexity=2,
-        min_detection_confidence=0.3,  # Further lowered for better side/back detection
-        min_tracking_confidence=0.3   # Further lowered for better side/back detection
-    )
-    mp_drawing = mp.solutions.drawing_utils
+# MediaPipe solution handles (landmark enums, drawing helpers). The heavy pose
+# graph and YOLO weights are owned by model_manager and loaded off the import path.
+mp_pose = mp.solutions.pose
+mp_drawing = mp.solutions.drawing_utils
+
+# With INFERENCE_WORKERS > 0 the models live in a pool of worker processes that stands in
+# for model_manager; otherwise they run in this process as before
+inference_pool = InferencePool(
+    workers=Config.INFERENCE_WORKERS,
+    pose_width=Config.POSE_INPUT_WIDTH,
+    classifier_size=Config.CLASSIFIER_INPUT_SIZE,
+    timeout=Config.INFERENCE_WORKER_TIMEOUT,
+    start_method=Config.INFERENCE_START_METHOD
+) if Config.INFERENCE_WORKERS > 0 else None
+posture_models = inference_pool or model_manager
+
+if Config.MODEL_LOAD_MODE == 'background' and not _IN_INFERENCE_WORKER:
+    posture_models.start_background_load()
 
 def draw_posture_status(image, prediction, conf):
     """Draw posture status label on the image."""
@@ -395,27 +281,72 @@ def draw_posture_status(image, prediction, conf):
     color = (0, 255, 0) if (isinstance(prediction, str) and ("Good" in prediction or "good" in prediction)) else (0, 0, 255)
     cv2.putText(image, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
 
+def new_posture_smoother():
+    return PostureSmoother(
+        tau=Config.POSTURE_SMOOTHING_TAU,
+        enter_bad=Config.POSTURE_BAD_ENTER,
+        exit_bad=Config.POSTURE_BAD_EXIT,
+        min_dwell=Config.POSTURE_MIN_DWELL,
+        unknown_after=Config.POSTURE_UNKNOWN_AFTER
+    )
+
+def update_posture_state(state, user_ids, posture_quality, confidence, current_time):
+    """Feed a raw reading through each viewer's smoother; store and publish their smoothed state.
+
+    The stored state, SSE events and alarm only change on smoothed transitions;
+    in between the state is rewritten every POSTURE_STATE_REFRESH seconds so
+    polling clients don't see it as stale. Without viewers the reading still
+    goes through a pipeline-level smoother for the overlay and session stats.
+    Returns the first viewer's smoothed (quality, confidence).
+    """
+    smoothers = state['smoothers']
+    published = state['posture_published']
+    result = None
+    for user_id in (user_ids or [None]):
+        smoother = smoothers.get(user_id)
+        if smoother is None:
+            smoother = smoothers[user_id] = new_posture_smoother()
+        changed = smoother.update(posture_quality, confidence, current_time)
+        if result is None:
+            result = (smoother.quality, smoother.confidence)
+        if user_id is not None:
+            monitoring_sessions.observe(user_id, smoother.quality, current_time)
+        if user_id is None or not (changed or current_time - published.get(user_id, 0) >= Config.POSTURE_STATE_REFRESH):
+            continue
+        published[user_id] = current_time
+        posture_state.set_posture(user_id, smoother.quality, smoother.confidence, current_time)
+        if changed and smoother.quality == 'bad':
+            posture_state.trigger_alarm(user_id)
+        posture_events.publish_state(user_id, {
+            'posture_quality': smoother.quality,
+            'confidence': round(float(smoother.confidence), 3),
+            'timestamp': current_time
+        })
+    return result
+
+def store_latest_points(user_ids, points):
+    """Keep each viewer's latest pixel (x, y) per landmark id for the calibration endpoint."""
+    pts_cache = points[:, :2].astype(int).tolist()
+    for user_id in user_ids:
+        posture_state.set_points(user_id, pts_cache)
+
 def detect_available_cameras():
-    """Detect all available cameras and return their indices."""
-    available_cameras = []
-    for i in range(5):  # Check first 5 camera indices
-        cap = cv2.VideoCapture(i)
-        if cap.isOpened():
-            ret, frame = cap.read()
-            if ret and frame is not None:
-                available_cameras.append(i)
-            cap.release()
-    return available_cameras
+    """Return indices of available cameras from the cached camera registry."""
+    return [c['index'] for c in camera_registry.get_cameras()]
 
 def get_camera_index():
     """Get the best camera index to use."""
+    # A recorded video file or image directory replaces the camera entirely
+    if app.config.get('CAMERA_SOURCE'):
+        return app.config['CAMERA_SOURCE']
+
     # Check if specific camera index is configured
     config_camera = app.config.get('CAMERA_INDEX', -1)
     if config_camera >= 0:
         logger.info(f"Using configured camera index: {config_camera}")
         return config_camera
     
-    # Auto-detect available cameras
+    # Auto-detect available cameras (cached; probed once at startup)
     available_cameras = detect_available_cameras()
     logger.info(f"Available cameras: {available_cameras}")
     
@@ -431,227 +362,262 @@ def get_camera_index():
     logger.info(f"Auto-selected camera index: {selected_camera}")
     return selected_camera
 
-def gen_frames():
-    camera_index = get_camera_index()
-    cap = cv2.VideoCapture(camera_index)
-    last_save_time = 0
-    save_interval = 30  # Save posture data every 30 seconds
-    current_session_data = {
-        'start_time': time.time(),
-        'posture_counts': {'good': 0, 'bad': 0},
-        'total_frames': 0,
-        'last_posture': None
+# Probe cameras once in the background so the first stream doesn't pay for it
+if Config.CAMERA_INDEX < 0 and not Config.CAMERA_SOURCE and not _IN_INFERENCE_WORKER:
+    camera_registry.probe_in_background()
+
+# Distinguishes frame states (camera pipelines, upload sessions) for worker affinity
+_stream_ids = itertools.count(1)
+
+def new_frame_state(inference_mode=None):
+    """Fresh per-pipeline posture tracking state."""
+    return {
+        'stream_id': next(_stream_ids),
+        'timings': StageTimings(histogram=stage_latency),
+        'cadence': InferenceCadence(
+            mode=inference_mode or Config.INFERENCE_MODE,
+            every_n=Config.INFERENCE_EVERY_N,
+            max_hz=Config.INFERENCE_MAX_HZ,
+            min_hz=Config.INFERENCE_MIN_HZ
+        ),
+        'overlay': {'quality': None, 'raw_quality': None},
+        'smoothers': {},  # user id (None: no viewer) -> PostureSmoother
+        'posture_published': {},  # user id -> time their state was last stored
+        'preprocessor': FramePreprocessor(
+            pose_width=Config.POSE_INPUT_WIDTH,
+            classifier_size=Config.CLASSIFIER_INPUT_SIZE
+        ),
+        'tracker': PersonTracker(
+            redetect_every=Config.TRACKER_REDETECT_PASSES,
+            padding=Config.TRACKER_PADDING
+        ) if Config.PERSON_TRACKING else None
     }
-    
-    # Initialize global alarm flag
-    gen_frames.alarm_triggered = False
-    
-    while True:
-        success, frame = cap.read()
-        if not success:
-            break
 
-        current_time = time.time()
-        current_session_data['total_frames'] += 1
-
-        if 'USE_CLASSIFIER' in globals() and USE_CLASSIFIER:
-            # Classifier-driven path (no person detector). Use whole frame like posture_detection_simple.py
-            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results_pose = pose.process(image_rgb)
-
-            if results_pose.pose_landmarks:
-                # Draw landmarks on the frame
-                mp_drawing.draw_landmarks(
-                    frame,
-                    results_pose.pose_landmarks,
-                    mp_pose.POSE_CONNECTIONS,
-                    mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                    mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2)
-                )
+def draw_overlay(frame, overlay):
+    """Draw the latest inference result (skeleton and posture label) on a frame."""
+    landmarks = overlay.get('landmarks')
+    if landmarks is not None:
+        # Rebuilt once per inference pass for MediaPipe's drawing helper
+        if overlay.get('landmark_list') is None:
+            overlay['landmark_list'] = landmark_pb2.NormalizedLandmarkList(landmark=[
+                landmark_pb2.NormalizedLandmark(x=x, y=y, z=z, visibility=v) for x, y, z, v in landmarks.tolist()
+            ])
+        # Landmarks are normalised to the region they were detected in
+        x1, y1, x2, y2 = overlay.get('box') or (0, 0, frame.shape[1], frame.shape[0])
+        mp_drawing.draw_landmarks(
+            frame[y1:y2, x1:x2],
+            overlay['landmark_list'],
+            mp_pose.POSE_CONNECTIONS,
+            mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
+            mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2)
+        )
+    if overlay.get('label') is not None:
+        draw_posture_status(frame, overlay['label'], float(overlay['confidence']))
 
-                # Cache latest points for calibration endpoint (use full-frame scale)
-                try:
-                    h2, w2 = frame.shape[:2]
-                    pts_cache = {}
-                    for idx, lm in enumerate(results_pose.pose_landmarks.landmark):
-                        pts_cache[idx] = (int(lm.x * w2), int(lm.y * h2))
-                    globals()['LATEST_POINTS'] = pts_cache
-                except Exception:
-                    pass
-
-                # Run classifier on the RGB frame
-                try:
-                    cls_results = posture_model(image_rgb, verbose=False)
-                    class_idx = cls_results[0].probs.top1
-                    class_name = cls_results[0].names[class_idx]
-                    confidence = float(cls_results[0].probs.top1conf)
-                except Exception:
-                    # If classifier inference fails, mark unknown
-                    class_name = 'Unknown'
-                    confidence = 0.0
-
-                # Overlay posture label
-                draw_posture_status(frame, class_name, confidence)
-
-                # Update global posture data
-                posture_quality = 'good' if ('Good' in str(class_name)) else 'bad'
-                if posture_quality == 'good':
-                    current_session_data['posture_counts']['good'] += 1
-                else:
-                    current_session_data['posture_counts']['bad'] += 1
-                    gen_frames.alarm_triggered = True
-
-                globals()['CURRENT_POSTURE_DATA'] = {
-                    'posture_quality': posture_quality,
-                    'confidence': confidence,
-                    'timestamp': current_time,
-                    'last_update': current_time
-                }
+def pose_payload(overlay, frame_shape, current_time):
+    """Compact landmark message for skeleton-only viewers.
 
-                current_session_data['last_posture'] = class_name
-            else:
-                # No landmarks found
-                globals()['CURRENT_POSTURE_DATA'] = {
-                    'posture_quality': 'unknown',
-                    'confidence': 0.0,
-                    'timestamp': current_time,
-                    'last_update': current_time
-                }
-        else:
-            # Original detector + rule-based posture classification path
-            results = yolo_model(frame, verbose=False)
-            persons = []
-
-            for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    # Only process if it's a person (class 0)
-                    if int(box.cls) == 0 and box.conf[0] > 0.5:  # Lowered for better side/back detection
-                        persons.append(box.xyxy[0].cpu().numpy())
-
-            # Update posture data when no person is detected
-            if not persons:
-                current_time = time.time()
-                globals()['CURRENT_POSTURE_DATA'] = {
-                    'posture_quality': 'unknown',
-                    'confidence': 0.0,
-                    'timestamp': current_time,
-                    'last_update': current_time
-                }
+    landmarks is a flat [x, y, visibility, ...] list per MediaPipe landmark id,
+    in thousandths of the (unmirrored) frame width/height, or None.
+    """
+    h, w = frame_shape[:2]
+    payload = {
+        't': round(current_time, 3),
+        'width': w,
+        'height': h,
+        'posture_quality': overlay['quality'],
+        'label': overlay['label'],
+        'confidence': round(float(overlay['confidence']), 3),
+        'landmarks': None
+    }
+    landmarks = overlay.get('landmarks')
+    if landmarks is not None:
+        # Map from the detection region back to the full frame
+        x1, y1, x2, y2 = overlay.get('box') or (0, 0, w, h)
+        arr = landmarks[:, (0, 1, 3)].copy()
+        arr[:, 0] = (x1 + arr[:, 0] * (x2 - x1)) / w
+        arr[:, 1] = (y1 + arr[:, 1] * (y2 - y1)) / h
+        payload['landmarks'] = np.rint(np.clip(arr, -1.0, 2.0) * 1000).astype(int).ravel().tolist()
+    return payload
+
+def run_inference(frame, state, current_time):
+    """Full YOLO/MediaPipe pass on one frame.
+
+    Publishes the reading to every viewer in state['user_ids'] and returns the
+    overlay dict (landmarks, box, label, confidence, quality) reused until the
+    next pass. With a PersonTracker the detector path crops around the last
+    landmarks and only runs YOLO when a re-detection is due. The models run
+    through posture_models: in this process on the pipeline's
+    FramePreprocessor, or on the stream's worker in the inference pool.
+    """
+    user_ids = state.get('user_ids', [])
+    tracker = state.get('tracker')
+    overlay = {'landmarks': None, 'box': None, 'label': None, 'confidence': 0.0, 'quality': 'unknown', 'raw_quality': 'unknown'}
+
+    roi = tracker.roi() if tracker and not posture_models.use_classifier else None
+    if inference_pool is not None and inference_pool.is_running:
+        result = inference_pool.infer(state['stream_id'], frame, roi)
+        if result is None:
+            # No worker answered; keep showing the previous reading
+            return state['overlay']
+    elif model_manager.is_ready:
+        # No pool, or it has been shut down: run the models in this process
+        result = model_manager.infer(frame, state['preprocessor'], roi)
+    else:
+        return state['overlay']
 
-            # Process only a single detected person (first match)
-            if persons:
-                person_box = persons[0]
-                x1, y1, x2, y2 = map(int, person_box)
-
-                # Ensure the box coordinates are within frame boundaries
-                x1, y1 = max(0, x1), max(0, y1)
-                x2, y2 = min(frame.shape[1], x2), min(frame.shape[0], y2)
-
-                # Skip if box is too small
-                if x2 - x1 >= 50 and y2 - y1 >= 50:
-                    person_img = frame[y1:y2, x1:x2]
-                    if person_img.size != 0:
-                        person_img_rgb = cv2.cvtColor(person_img, cv2.COLOR_BGR2RGB)
-                        landmark_results = pose.process(person_img_rgb)
-
-                        if landmark_results.pose_landmarks:
-                            # Draw landmarks on the person image
-                            mp_drawing.draw_landmarks(
-                                person_img,
-                                landmark_results.pose_landmarks,
-                                mp_pose.POSE_CONNECTIONS,
-                                mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                                mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2)
-                            )
-
-                            # Cache latest points for calibration endpoint
-                            try:
-                                h2, w2 = person_img.shape[:2]
-                                pts_cache = {}
-                                for idx, lm in enumerate(landmark_results.pose_landmarks.landmark):
-                                    pts_cache[idx] = (int(lm.x * w2), int(lm.y * h2))
-                                globals()['LATEST_POINTS'] = pts_cache
-                            except Exception:
-                                pass
-
-                            # Rule-based posture classification
-                            posture, confidence = classify_posture(landmark_results.pose_landmarks, person_img.shape)
-
-                            # Update global posture data for real-time access
-                            current_time = time.time()
-
-                            # Determine posture quality for the indicator
-                            if "Good" in posture:
-                                posture_quality = 'good'
-                                current_session_data['posture_counts']['good'] += 1
-                            else:
-                                posture_quality = 'bad'
-                                current_session_data['posture_counts']['bad'] += 1
-                                # Trigger alarm for bad posture
-                                gen_frames.alarm_triggered = True
-
-                            # Update global posture data
-                            globals()['CURRENT_POSTURE_DATA'] = {
-                                'posture_quality': posture_quality,
-                                'confidence': confidence,
-                                'timestamp': current_time,
-                                'last_update': current_time
-                            }
-
-                            current_session_data['last_posture'] = posture
-
-                            # Draw a compact label on the frame for visibility
-                            draw_posture_status(frame, posture, float(confidence))
-        # Removed multi-user display and facial recognition overlays
-        
-        # Save posture data periodically
-        if current_time - last_save_time >= save_interval and current_session_data['total_frames'] > 0:
-            # Calculate session statistics
-            total_postures = current_session_data['posture_counts']['good'] + current_session_data['posture_counts']['bad']
-            if total_postures > 0:
-                good_percentage = (current_session_data['posture_counts']['good'] / total_postures) * 100
-                session_duration = current_time - current_session_data['start_time']
-                
-                # Determine overall posture status for this session
-                session_good_pct = app.config.get('SESSION_GOOD_THRESHOLD', 0.8) * 100
-                session_fair_pct = app.config.get('SESSION_FAIR_THRESHOLD', 0.6) * 100
-                if good_percentage >= session_good_pct:
-                    overall_posture = "Good Posture"
-                elif good_percentage >= session_fair_pct:
-                    overall_posture = "Fair Posture"
-                else:
-                    overall_posture = "Poor Posture"
-                
-                # Store session data for later saving (avoid session context issues)
-                # We'll save this data when the user stops monitoring
-                # Calculate corrections as transitions from bad to good posture
-                corrections_estimate = max(0, current_session_data['posture_counts']['bad'] // 10)  # Estimate: 1 correction per 10 bad frames
-                current_session_data['pending_save'] = {
-                    'posture_type': overall_posture,
-                    'confidence_score': good_percentage / 100.0,
-                    'session_duration': session_duration,
-                    'corrections_count': corrections_estimate
-                }
-                
-                # Reset session data
-                current_session_data = {
-                    'start_time': current_time,
-                    'posture_counts': {'good': 0, 'bad': 0},
-                    'total_frames': 0,
-                    'last_posture': None
-                }
-                last_save_time = current_time
+    if state.get('timings') is not None:
+        state['timings'].record_all(result.get('timings'))
 
-        # Flip frame horizontally to mirror (selfie view) similar to simple script
-        if app.config.get('CAMERA_MIRROR', True):
-            frame = cv2.flip(frame, 1)
+    landmarks = result['landmarks']
+    if result['mode'] == 'classifier':
+        # Classifier-driven path (no person detector), on the whole frame like posture_detection_simple.py
+        if landmarks is None:
+            # No landmarks found
+            overlay['quality'], _ = update_posture_state(state, user_ids, 'unknown', 0.0, current_time)
+            return overlay
 
-        ret, buffer = cv2.imencode('.jpg', frame)
-        frame = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-    cap.release()
+        # Cache latest points for calibration endpoint (use full-frame scale)
+        try:
+            store_latest_points(user_ids, landmarks_to_array(landmarks, frame.shape))
+        except Exception:
+            pass
+
+        # Update each viewer's posture data (bad posture also raises their alarm)
+        class_name, confidence = result['class_name'], result['confidence']
+        posture_quality = 'good' if ('Good' in str(class_name)) else 'bad'
+        smoothed_quality, _ = update_posture_state(state, user_ids, posture_quality, confidence, current_time)
+        overlay.update(landmarks=landmarks, label=class_name, confidence=confidence,
+                       quality=smoothed_quality, raw_quality=posture_quality)
+        return overlay
+
+    # Original detector + rule-based posture classification path
+    if result['box'] is None:
+        # Update posture data when no person is detected
+        overlay['quality'], _ = update_posture_state(state, user_ids, 'unknown', 0.0, current_time)
+        return overlay
+    x1, y1, x2, y2 = result['box']
+    if tracker and result['detected']:
+        tracker.detected((x1, y1, x2, y2))
+
+    if landmarks is None:
+        # Box too small, or person lost; the next pass runs the detector again
+        if tracker:
+            tracker.lose()
+        overlay['quality'], _ = update_posture_state(state, user_ids, 'unknown', 0.0, current_time)
+        return overlay
+
+    # Cache latest points for calibration endpoint
+    points = landmarks_to_array(landmarks, (y2 - y1, x2 - x1))
+    if tracker:
+        tracker.follow(points, (x1, y1, x2, y2), frame.shape)
+    try:
+        store_latest_points(user_ids, points)
+    except Exception:
+        pass
+
+    # Rule-based posture classification, scored against each viewer's own calibration.
+    # The overlay follows the first viewer.
+    posture, confidence, smoothed_quality = None, 0.0, None
+    score_ms = 0.0
+    for user_id in (user_ids or [None]):
+        calibration = posture_state.get_calibration(user_id) if user_id is not None else None
+        started = time.perf_counter()
+        user_posture, user_confidence, _, _ = score_posture(points, calibration)
+        score_ms += (time.perf_counter() - started) * 1000.0
+        user_quality = 'good' if "Good" in user_posture else 'bad'
+        user_smoothed, _ = update_posture_state(state, [user_id] if user_id is not None else [],
+                                                user_quality, user_confidence, current_time)
+        if posture is None:
+            posture, confidence, smoothed_quality = user_posture, user_confidence, user_smoothed
+    # Scorer time only, without the calibration lookups and smoothing around it
+    if state.get('timings') is not None:
+        state['timings'].record('score', score_ms)
+
+    overlay.update(
+        landmarks=landmarks,
+        box=(x1, y1, x2, y2),
+        label=posture,
+        confidence=confidence,
+        quality=smoothed_quality,
+        raw_quality='good' if "Good" in posture else 'bad'
+    )
+    return overlay
+
+def process_frame(frame, state):
+    """Run posture analysis on one captured frame and return the annotated frame.
+
+    Inference runs at the cadence chosen by state['cadence']; frames in between
+    reuse the last overlay and reading. When the pipeline has no video viewers
+    (state['render'] is False) the frame is not annotated, and skeleton-only
+    viewers get a pose_payload() in state['pose_update'] after each pass.
+    """
+    render = state.get('render', True)
+
+    # Models load in the background; show the raw feed until they're ready
+    if not posture_models.is_ready:
+        if posture_models.state == posture_models.PENDING:
+            posture_models.start_background_load()
+        if render:
+            message = 'Model loading failed' if posture_models.state == posture_models.FAILED else 'Loading posture models...'
+            cv2.putText(frame, message, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 200, 255), 2)
+            if app.config.get('CAMERA_MIRROR', True):
+                cv2.flip(frame, 1, dst=frame)
+        return frame
+
+    current_time = time.time()
+
+    cadence = state['cadence']
+    timings = state.get('timings')
+    if cadence.should_infer(current_time):
+        started = time.perf_counter()
+        state['overlay'] = run_inference(frame, state, current_time)
+        if timings is not None:
+            timings.record('inference', (time.perf_counter() - started) * 1000.0)
+        # Raw readings, so a flicker speeds inference up while the smoother decides
+        cadence.record(state['overlay']['raw_quality'])
+        if state.get('pose_listeners'):
+            state['pose_update'] = pose_payload(state['overlay'], frame.shape, current_time)
+    overlay = state['overlay']
+    if render:
+        started = time.perf_counter()
+        draw_overlay(frame, overlay)
+        if timings is not None:
+            timings.record('draw', (time.perf_counter() - started) * 1000.0)
+
+    # Flip frame horizontally to mirror (selfie view) similar to simple script; in place, no copy
+    if render and app.config.get('CAMERA_MIRROR', True):
+        cv2.flip(frame, 1, dst=frame)
+
+    return frame
+
+# Uploaded frames already arrive at the client's chosen rate, so every one is analysed
+frame_ingest = FrameIngest(
+    process_frame,
+    lambda: new_frame_state(inference_mode='every'),
+    max_concurrent=Config.INGEST_MAX_CONCURRENT,
+    min_interval=1.0 / max(Config.INGEST_FPS, 0.1)
+)
+
+def gen_frames(user_id=None, stream_settings=None):
+    """Multipart JPEG stream for one client, served from the shared camera pipeline."""
+    yield from get_pipeline().frames(user_id, stream_settings)
+
+def get_pipeline():
+    """The shared pipeline for the configured camera."""
+    return get_stream_pipeline(get_camera_index(), process_frame, new_frame_state,
+                               encoder=app.config.get('STREAM_ENCODER', 'auto'),
+                               capture_options={'loop': app.config.get('CAMERA_SOURCE_LOOP', True)})
+
+def stream_settings_for_request():
+    """Preview encoding for this viewer: query string, then the user's saved preset, then the default."""
+    preset = request.args.get('preset') or session.get('stream_preset') or app.config.get('STREAM_PRESET', 'medium')
+    return resolve_stream_settings(
+        preset,
+        quality=request.args.get('quality'),
+        max_width=request.args.get('width'),
+        fps=request.args.get('fps')
+    )
 
 # Routes
 @app.route('/')
@@ -694,6 +660,10 @@ def login():
             # Store complete user data in session
             session['user'] = result
             session.permanent = True
+            # Saved preview settings follow the user across logins and devices
+            for key in ('stream_mode', 'stream_preset'):
+                if result.get(key):
+                    session[key] = result[key]
             
             # Check if user is admin and set appropriate redirect
             redirect_url = url_for('admin') if username == 'admin' else url_for('index')
@@ -790,19 +760,13 @@ def create_account():
 def profile():
     # Get user data from database to include profile picture
     user_id = session['user'].get('id')
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor(dictionary=True)
+    try:
+        with db_cursor(dictionary=True) as (conn, cursor):
             cursor.execute("SELECT profile_picture FROM users WHERE id = %s", (user_id,))
             user_data = cursor.fetchone()
             profile_picture = user_data['profile_picture'] if user_data and user_data['profile_picture'] else None
-        except Exception as e:
-            logger.error(f"Error fetching user profile picture: {e}")
-            profile_picture = None
-        finally:
-            conn.close()
-    else:
+    except Exception as e:
+        logger.error(f"Error fetching user profile picture: {e}")
         profile_picture = None
     
     return render_template('profile.html', profile_picture=profile_picture)
@@ -965,105 +929,91 @@ def change_password():
         user_id = session.get('user', {}).get('id')
 
         # Connect to database
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'success': False, 'message': 'Database connection failed'})
-
         try:
-            cursor = conn.cursor(dictionary=True)
-            
-            # If user is not logged in, try to find by username
-            if not user_id and username:
-                cursor.execute("SELECT id, password FROM users WHERE username = %s", (username,))
-                user = cursor.fetchone()
-                if user:
-                    user_id = user['id']
-            else:
-                # Get current user data
-                cursor.execute("SELECT id, password FROM users WHERE id = %s", (user_id,))
-                user = cursor.fetchone()
+            with db_cursor(dictionary=True) as (conn, cursor):
+                # If user is not logged in, try to find by username
+                if not user_id and username:
+                    cursor.execute("SELECT id, password, email, username FROM users WHERE username = %s", (username,))
+                    user = cursor.fetchone()
+                    if user:
+                        user_id = user['id']
+                else:
+                    # Get current user data
+                    cursor.execute("SELECT id, password, email, username FROM users WHERE id = %s", (user_id,))
+                    user = cursor.fetchone()
             
-            if not user:
-                return jsonify({'success': False, 'message': 'User not found'})
+                if not user:
+                    return jsonify({'success': False, 'message': 'User not found'})
 
-            # Verify current password using bcrypt (supports bcrypt-stored hashes)
-            stored_hash = user['password']
-            if isinstance(stored_hash, bytes):
-                stored_hash_str = stored_hash.decode('utf-8')
-            else:
-                stored_hash_str = stored_hash
-            if not bcrypt.checkpw(current_password.encode('utf-8'), stored_hash_str.encode('utf-8')):
-                return jsonify({'success': False, 'message': 'Current password is incorrect'})
+                # Verify current password using bcrypt (supports bcrypt-stored hashes)
+                stored_hash = user['password']
+                if isinstance(stored_hash, bytes):
+                    stored_hash_str = stored_hash.decode('utf-8')
+                else:
+                    stored_hash_str = stored_hash
+                if not bcrypt.checkpw(current_password.encode('utf-8'), stored_hash_str.encode('utf-8')):
+                    return jsonify({'success': False, 'message': 'Current password is incorrect'})
 
-            # Validate new password
-            if len(new_password) < 8:
-                return jsonify({'success': False, 'message': 'Password must be at least 8 characters long'})
+                # Validate new password
+                if len(new_password) < 8:
+                    return jsonify({'success': False, 'message': 'Password must be at least 8 characters long'})
             
-            if not re.match(r'^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[@$!%*?&])[A-Za-z\d@$!%*?&]{8,}$', new_password):
-                return jsonify({'success': False, 'message': 'Password must include uppercase, lowercase, numbers, and special characters'})
-
-            # Handle based on method
-            if method == 'immediate':
-                # Immediate password change using bcrypt for consistency
-                hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-                cursor.execute(
-                    "UPDATE users SET password = %s WHERE id = %s",
-                    (hashed_password, user_id)
-                )
-                conn.commit()
-                
-                return jsonify({'success': True, 'message': 'Password updated successfully'})
-                
-            else:  # email verification method
-                # Generate password change verification token
-                verification_token = email_service.generate_verification_token()
-                expires_at = datetime.now() + timedelta(hours=1)
-                
-                # Save verification token
-                token_success, token_result = save_verification_token(user_id, verification_token, expires_at, "password_change")
+                if not re.match(r'^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[@$!%*?&])[A-Za-z\d@$!%*?&]{8,}$', new_password):
+                    return jsonify({'success': False, 'message': 'Password must include uppercase, lowercase, numbers, and special characters'})
+
+                # Handle based on method
+                if method == 'immediate':
+                    # Immediate password change using bcrypt for consistency
+                    hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+                    cursor.execute(
+                        "UPDATE users SET password = %s WHERE id = %s",
+                        (hashed_password, user_id)
+                    )
+                    conn.commit()
                 
-                if token_success:
-                    # Get user email for verification
-                    cursor.execute("SELECT email, username FROM users WHERE id = %s", (user_id,))
-                    user_info = cursor.fetchone()
-                    
-                    if user_info:
-                        # Send verification email
-                        email_sent = email_service.send_verification_email(
-                            user_info['email'], 
-                            user_info['username'], 
-                            verification_token, 
-                            "password_change"
-                        )
-                        
-                        if email_sent:
-                            return jsonify({
-                                'success': True, 
-                                'message': 'Password change request sent! Please check your email to complete the process.',
-                                'requires_verification': True
-                            })
-                        else:
-                            return jsonify({
-                                'success': False, 
-                                'message': 'Failed to send verification email. Please try again.'
-                            })
-                    else:
-                        return jsonify({
-                            'success': False, 
-                            'message': 'User information not found.'
-                        })
-                else:
-                    return jsonify({
-                        'success': False, 
-                        'message': 'Failed to generate verification token.'
-                    })
+                    return jsonify({'success': True, 'message': 'Password updated successfully'})
+
+            # Email verification method. The pooled connection is returned above: saving the
+            # token checks out its own connection and the SMTP send can take seconds
+            verification_token = email_service.generate_verification_token()
+            expires_at = datetime.now() + timedelta(hours=1)
+        
+            # Save verification token
+            token_success, token_result = save_verification_token(user_id, verification_token, expires_at, "password_change")
+            if not token_success:
+                return jsonify({
+                    'success': False, 
+                    'message': 'Failed to generate verification token.'
+                })
+            if not user.get('email'):
+                return jsonify({
+                    'success': False, 
+                    'message': 'User information not found.'
+                })
 
+            # Send verification email
+            email_sent = email_service.send_verification_email(
+                user['email'], 
+                user['username'], 
+                verification_token, 
+                "password_change"
+            )
+            if email_sent:
+                return jsonify({
+                    'success': True, 
+                    'message': 'Password change request sent! Please check your email to complete the process.',
+                    'requires_verification': True
+                })
+            return jsonify({
+                'success': False, 
+                'message': 'Failed to send verification email. Please try again.'
+            })
+
+        except DatabaseUnavailable:
+            return jsonify({'success': False, 'message': 'Database connection failed'})
         except Exception as e:
             logger.error(f"Error changing password: {e}")
             return jsonify({'success': False, 'message': 'An error occurred'})
-        finally:
-            if conn:
-                conn.close()
 
     # For GET requests, just render the template
     return render_template('change-password.html')
@@ -1111,33 +1061,29 @@ def verify_password_change():
             
             # Update password using bcrypt for consistency
             hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            conn = get_db_connection()
-            if conn:
-                try:
-                    cursor = conn.cursor()
+            try:
+                with db_cursor() as (conn, cursor):
                     cursor.execute(
                         "UPDATE users SET password = %s WHERE id = %s",
                         (hashed_password, user['id'])
                     )
                     conn.commit()
-                    cursor.close()
-                    conn.close()
-                    
-                    # Clear the token
-                    clear_password_change_token(user['id'])
-                    
-                    # Send notification email
-                    email_service.send_password_change_notification(user['email'], user['username'])
-                    
-                    flash('Password changed successfully!', 'success')
-                    return redirect(url_for('login'))
-                except Exception as e:
-                    logger.error(f"Error updating password: {e}")
-                    flash('An error occurred while updating password', 'error')
-                    return redirect(url_for('login'))
-            else:
+                
+                # Clear the token
+                clear_password_change_token(user['id'])
+                
+                # Send notification email
+                email_service.send_password_change_notification(user['email'], user['username'])
+                
+                flash('Password changed successfully!', 'success')
+                return redirect(url_for('login'))
+            except DatabaseUnavailable:
                 flash('Database connection failed', 'error')
                 return redirect(url_for('login'))
+            except Exception as e:
+                logger.error(f"Error updating password: {e}")
+                flash('An error occurred while updating password', 'error')
+                return redirect(url_for('login'))
         else:
             # Show password change form
             return render_template('verify-password-change.html', token=token)
@@ -1154,7 +1100,152 @@ def reset_password():
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(gen_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    # Lazy mode: first stream triggers model loading; frames show a loading banner meanwhile
+    posture_models.start_background_load()
+    user_id = session.get('user', {}).get('id')
+    return Response(gen_frames(user_id, stream_settings_for_request()),
+                    mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/pose-stream')
+@login_required
+def pose_stream():
+    """Skeleton-only alternative to /video_feed: SSE landmark and posture payloads, no video"""
+    posture_models.start_background_load()
+    config = {
+        'connections': sorted([a, b] for a, b in mp_pose.POSE_CONNECTIONS),
+        'mirror': app.config.get('CAMERA_MIRROR', True)
+    }
+    events = get_pipeline().pose_events(session['user']['id'], app.config.get('POSTURE_EVENT_HEARTBEAT', 15.0), config)
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Disable proxy buffering so events arrive immediately
+        }
+    )
+
+@app.route('/ingest-frame', methods=['POST'])
+@login_required
+def ingest_frame():
+    """Analyse one browser-captured JPEG/WebP frame (raw request body) and return the latest reading"""
+    if request.content_length and request.content_length > app.config.get('INGEST_MAX_BYTES', 1024 * 1024):
+        return jsonify({'success': False, 'message': 'Frame too large'}), 413
+    data = request.get_data(cache=False)
+    if not data:
+        return jsonify({'success': False, 'message': 'No frame data provided'}), 400
+
+    posture_models.start_background_load()
+    try:
+        processed, result = frame_ingest.submit(session['user']['id'], data)
+    except Exception as e:
+        logger.error(f"Error processing uploaded frame: {e}")
+        return jsonify({'success': False, 'message': 'Error processing frame'}), 500
+    if 'error' in result:
+        return jsonify({'success': False, 'message': result['error'], 'interval_ms': result['interval_ms']}), 400
+
+    return jsonify({
+        'success': True,
+        'processed': processed,
+        'models_ready': posture_models.is_ready,
+        **result
+    })
+
+@app.route('/video-feed-stats')
+@login_required
+def video_feed_stats():
+    """Per-camera stream stats (viewers, encoding, bytes/sec, encode time) and browser upload counters"""
+    try:
+        return jsonify({
+            'success': True,
+            'pipelines': [p.stats() for p in get_all_pipelines()],
+            'ingest': frame_ingest.stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting video feed stats: {e}")
+        return jsonify({'success': False, 'message': 'Error getting video feed stats'})
+
+@app.route('/healthz')
+def healthz():
+    """Readiness probe: reports model load state without waiting for it"""
+    models = posture_models.status()
+    database_ok = db_health.healthy is True
+    ready = models['ready'] and database_ok
+    status_code = 200 if ready else 503
+    return jsonify({
+        'status': 'ready' if ready else ('failed' if models['state'] == posture_models.FAILED else 'starting'),
+        'models': models,
+        'database': database_ok,
+        'database_status': db_health.status()
+    }), status_code
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics: stage and database latency histograms, stream, upload and pool counters"""
+    if Config.METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {Config.METRICS_TOKEN}":
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+
+    pipelines = [p.stats() for p in get_all_pipelines()]
+    ingest = frame_ingest.stats()
+    pool = pool_stats()
+    viewers = {}
+    for pipeline in pipelines:
+        for viewer in pipeline['subscribers']:
+            key = (str(pipeline['camera_index']), viewer['mode'])
+            viewers[key] = viewers.get(key, 0) + 1
+
+    def per_camera(field, label='camera', prefix=''):
+        return [({label: f"{prefix}{p['camera_index']}"}, p[field]) for p in pipelines]
+
+    lines = stage_latency.render() + db_latency.render()
+    lines += format_metric('posturease_streams_active', 'gauge', 'Camera pipelines currently running.',
+                           [({}, sum(1 for p in pipelines if p['active']))])
+    lines += format_metric('posturease_stream_viewers', 'gauge', 'Connected viewers per camera and mode.',
+                           [({'camera': camera, 'mode': mode}, count) for (camera, mode), count in sorted(viewers.items())])
+    lines += format_metric('posturease_frames_processed_total', 'counter', 'Frames run through process_frame.',
+                           per_camera('frames_processed', 'source', 'camera:') +
+                           [({'source': 'upload'}, ingest['frames_processed'])])
+    lines += format_metric('posturease_frames_dropped_total', 'counter',
+                           'Frames dropped before processing (camera frames not picked up in time, uploads rejected for backpressure).',
+                           per_camera('frames_dropped', 'source', 'camera:') +
+                           [({'source': 'upload'}, ingest['frames_dropped'])])
+    lines += format_metric('posturease_frames_encoded_total', 'counter', 'JPEG frames encoded for video viewers.',
+                           per_camera('frames_encoded'))
+    lines += format_metric('posturease_stream_bytes_total', 'counter', 'Bytes of video sent to viewers.',
+                           per_camera('bytes_sent'))
+    lines += format_metric('posturease_upload_users', 'gauge', 'Users currently uploading frames from the browser.',
+                           [({}, ingest['active_users'])])
+    lines += format_metric('posturease_db_pool_size', 'gauge', 'Configured MySQL connection pool size.',
+                           [({}, pool['size'])])
+    lines += format_metric('posturease_db_pool_connections', 'gauge', 'Pooled MySQL connections by state.',
+                           [({'state': 'idle'}, pool['idle']), ({'state': 'in_use'}, pool['in_use'])])
+    lines += format_metric('posturease_db_pool_checkout_timeouts_total', 'counter',
+                           'Connection checkouts that timed out waiting for a free slot.',
+                           [({}, pool['checkout_timeouts'])])
+    lines += format_metric('posturease_db_healthy', 'gauge', 'Last background database probe succeeded.',
+                           [({}, db_health.healthy is True)])
+    lines += format_metric('posturease_models_ready', 'gauge', 'Posture models loaded and serving.',
+                           [({}, posture_models.is_ready)])
+    writer = record_writer.stats()
+    lines += record_flush_latency.render()
+    lines += format_metric('posturease_record_queue_depth', 'gauge', 'Posture records waiting to be written.',
+                           [({}, writer['queue_depth'])])
+    lines += format_metric('posturease_records_total', 'counter', 'Posture records by write outcome.',
+                           [({'outcome': 'written'}, writer['records_written']),
+                            ({'outcome': 'failed'}, writer['records_failed']),
+                            ({'outcome': 'dropped'}, writer['records_dropped'])])
+    lines += format_metric('posturease_record_batches_total', 'counter', 'Posture record batches written.',
+                           [({}, writer['batches_written'])])
+    lines += format_metric('posturease_monitoring_sessions_active', 'gauge', 'Open server-side monitoring sessions.',
+                           [({}, monitoring_sessions.active_count)])
+    if inference_pool is not None:
+        pool_status = inference_pool.status()
+        lines += format_metric('posturease_inference_workers_ready', 'gauge', 'Inference worker processes ready.',
+                               [({}, sum(1 for w in pool_status['workers'] if w['ready']))])
+        lines += format_metric('posturease_inference_worker_restarts_total', 'counter',
+                               'Inference workers replaced after a crash or timeout.',
+                               [({}, pool_status['restarts'])])
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
 
 @app.route('/logout')
 def logout():
@@ -1169,14 +1260,14 @@ def calibrate_posture():
     Ask user to sit upright and look straight ahead, then invoke this.
     """
     try:
-        global CALIBRATION, LATEST_POINTS
-        pts = LATEST_POINTS
+        user_id = session['user']['id']
+        pts = posture_state.get_points(user_id)
         if not pts:
             return jsonify({'success': False, 'message': 'No person detected. Please face the camera and try again.'}), 400
 
-        ls = pts.get(mp_pose.PoseLandmark.LEFT_SHOULDER.value)
-        rs = pts.get(mp_pose.PoseLandmark.RIGHT_SHOULDER.value)
-        nose = pts.get(mp_pose.PoseLandmark.NOSE.value)
+        ls = pts[mp_pose.PoseLandmark.LEFT_SHOULDER.value]
+        rs = pts[mp_pose.PoseLandmark.RIGHT_SHOULDER.value]
+        nose = pts[mp_pose.PoseLandmark.NOSE.value]
         if not (ls and rs and nose):
             return jsonify({'success': False, 'message': 'Insufficient landmarks for calibration. Ensure your shoulders and face are visible.'}), 400
 
@@ -1186,16 +1277,16 @@ def calibrate_posture():
         angle_rad = np.arctan2(vx, -vy)
         angle_deg = float(abs(angle_rad * 180.0 / np.pi))
 
-        CALIBRATION['front_angle_deg'] = angle_deg
-        CALIBRATION['timestamp'] = time.time()
-
         # Optionally accept custom tolerance from client
         data = request.get_json(silent=True) or {}
         tol = data.get('tolerance_deg')
-        if isinstance(tol, (int, float)) and tol > 0:
-            CALIBRATION['tolerance_deg'] = float(tol)
+        if not (isinstance(tol, (int, float)) and tol > 0):
+            tol = None
 
-        return jsonify({'success': True, 'message': 'Calibration saved', 'front_angle_deg': angle_deg, 'tolerance_deg': CALIBRATION['tolerance_deg']})
+        posture_state.set_calibration(user_id, angle_deg, time.time(), tol)
+        calibration = posture_state.get_calibration(user_id)
+
+        return jsonify({'success': True, 'message': 'Calibration saved', 'front_angle_deg': angle_deg, 'tolerance_deg': calibration['tolerance_deg']})
     except Exception as e:
         logger.error(f"Calibration error: {e}")
         return jsonify({'success': False, 'message': 'Calibration failed'}), 500
@@ -1206,34 +1297,71 @@ def save_posture():
         return jsonify({'success': False, 'message': 'Not logged in'})
     
     data = request.get_json()
-    success, result = save_posture_record(
-        user_id=session['user']['id'],
-        posture_type=data.get('posture_type'),
-        confidence_score=data.get('confidence_score')
-    )
+    success, result = record_writer.submit(session['user']['id'], {
+        'posture_type': data.get('posture_type'),
+        'confidence_score': data.get('confidence_score')
+    })
     
-    return jsonify({'success': success, 'message': result})
+    return jsonify({'success': success, 'message': result or 'Posture record saved'})
+
+@app.route('/start-monitoring-session', methods=['POST'])
+@login_required
+def start_monitoring_session():
+    """Open a server-side monitoring session; time per posture state is accounted from the live stream"""
+    try:
+        monitoring_sessions.start(session['user']['id'])
+        return jsonify({'success': True, 'message': 'Monitoring session started'})
+    except Exception as e:
+        logger.error(f"Error starting monitoring session: {e}")
+        return jsonify({'success': False, 'message': 'Error starting monitoring session'})
+
+@app.route('/stop-monitoring-session', methods=['POST'])
+@login_required
+def stop_monitoring_session():
+    """Close the user's monitoring session and save its posture record"""
+    try:
+        record = monitoring_sessions.stop(session['user']['id'])
+        # The user is likely to open their history next; don't wait for a full batch
+        record_writer.flush_soon()
+        if record is None:
+            return jsonify({'success': True, 'session': None, 'message': 'No monitoring session to save'})
+        return jsonify({'success': True, 'session': record, 'message': 'Monitoring session saved successfully'})
+    except Exception as e:
+        logger.error(f"Error stopping monitoring session: {e}")
+        return jsonify({'success': False, 'message': 'Error saving monitoring session'})
+
+@app.route('/monitoring-session-stats')
+@login_required
+def monitoring_session_stats():
+    """Live totals of the user's monitoring session (session time, good/bad time, corrections); pushed as 'session' events on /posture-events, fetched here only without SSE"""
+    stats = monitoring_sessions.stats(session['user']['id'])
+    if stats is not None:
+        stats = {k: round(v, 1) if isinstance(v, float) else v for k, v in stats.items()}
+    return jsonify({'success': True, 'session': stats})
 
 @app.route('/save-monitoring-session', methods=['POST'])
 def save_monitoring_session():
-    """Save posture data when monitoring session ends"""
+    """Save posture data when monitoring session ends (clients that keep their own timers)"""
     if 'user' not in session:
         return jsonify({'success': False, 'message': 'User not logged in'})
     
+    # A server-side session supersedes the client's own numbers
+    if monitoring_sessions.is_active(session['user']['id']):
+        return stop_monitoring_session()
+    
     data = request.get_json()
     if not data:
         return jsonify({'success': False, 'message': 'No data provided'})
     
     try:
-        success, result = save_posture_record(
-            user_id=session['user']['id'],
-            posture_type=data.get('posture_type', 'Unknown'),
-            confidence_score=data.get('confidence_score', 0.0),
-            session_duration=data.get('session_duration', 0),
-            corrections_count=data.get('corrections_count', 0),
-            good_time=data.get('good_time', 0),
-            bad_time=data.get('bad_time', 0)
-        )
+        success, result = record_writer.submit(session['user']['id'], {
+            'posture_type': data.get('posture_type', 'Unknown'),
+            'confidence_score': data.get('confidence_score', 0.0),
+            'session_duration': data.get('session_duration', 0),
+            'corrections_count': data.get('corrections_count', 0),
+            'good_time': data.get('good_time', 0),
+            'bad_time': data.get('bad_time', 0)
+        }, urgent=True)
         
         if success:
             logger.info(f"Saved monitoring session for user {session['user']['id']}: {data.get('posture_type')}")
@@ -1250,6 +1378,8 @@ def clear_posture_history():
     """Clear all posture history records for the current user"""
     try:
         user_id = session['user']['id']
+        # Records still queued for writing would reappear after the DELETE
+        record_writer.discard(user_id)
         success, result = clear_user_posture_history(user_id)
         if success:
             return jsonify({'success': True, 'deleted': result})
@@ -1286,12 +1416,13 @@ def delete_posture_record_endpoint():
 def get_current_posture():
     """Get current posture data for frontend monitoring"""
     try:
-        global CURRENT_POSTURE_DATA
+        user_id = session.get('user', {}).get('id')
+        posture_data = posture_state.get_posture(user_id) if user_id is not None else None
         
         # Check if we have recent posture data (within last 5 seconds)
         current_time = time.time()
-        if (CURRENT_POSTURE_DATA.get('last_update') and 
-            current_time - CURRENT_POSTURE_DATA['last_update'] < 5.0):
+        if (posture_data and posture_data.get('last_update') and 
+            current_time - posture_data['last_update'] < 5.0):
             
             # Detailed ML prediction removed; return minimal info
             detailed_info = {}
@@ -1299,9 +1430,9 @@ def get_current_posture():
             return jsonify({
                 'success': True,
                 'posture_data': {
-                    'posture_quality': CURRENT_POSTURE_DATA['posture_quality'],
-                    'confidence': CURRENT_POSTURE_DATA['confidence'],
-                    'timestamp': CURRENT_POSTURE_DATA['timestamp'],
+                    'posture_quality': posture_data['posture_quality'],
+                    'confidence': posture_data['confidence'],
+                    'timestamp': posture_data['timestamp'],
                     'detailed': detailed_info
                 }
             })
@@ -1319,6 +1450,31 @@ def get_current_posture():
         logger.error(f"Error getting current posture: {e}")
         return jsonify({'success': False, 'message': 'Error getting posture data'})
 
+@app.route('/posture-events')
+@login_required
+def posture_events_stream():
+    """Server-Sent Events stream of posture state and alarm transitions"""
+    return Response(
+        stream_with_context(posture_events.stream(session['user']['id'])),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Disable proxy buffering so events arrive immediately
+        }
+    )
+
+@app.route('/get-pose-engine-status')
+@login_required
+def get_pose_engine_status():
+    """Report the active MediaPipe model complexity and measured pose latency"""
+    if inference_pool is not None:
+        # Each worker runs its own engine; their status arrives with their results
+        engines = [(w['models'] or {}).get('pose_engine') for w in inference_pool.status()['workers']]
+        return jsonify({'success': True, 'pose_engines': engines})
+    if model_manager.pose is None:
+        return jsonify({'success': False, 'message': 'Pose model not loaded yet', 'state': model_manager.state})
+    return jsonify({'success': True, 'pose_engine': model_manager.pose.status()})
+
 @app.route('/check-posture-alarm')
 def check_posture_alarm():
     """Check if posture alarm should be triggered based on AI detection"""
@@ -1326,11 +1482,8 @@ def check_posture_alarm():
         return jsonify({'success': False, 'message': 'User not logged in'})
     
     try:
-        # Check if alarm was triggered in the video stream
-        # We'll use a global variable to track alarm state
-        if hasattr(gen_frames, 'alarm_triggered') and gen_frames.alarm_triggered:
-            # Reset the alarm flag
-            gen_frames.alarm_triggered = False
+        # Check if alarm was triggered in the video stream for this user (reading clears it)
+        if posture_state.consume_alarm(session['user']['id']):
             return jsonify({
                 'success': True,
                 'alarm_triggered': True,
@@ -1386,29 +1539,25 @@ def upload_profile_picture():
         file.save(filepath)
         
         # Update database with profile picture path
-        conn = get_db_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
+        try:
+            with db_cursor() as (conn, cursor):
                 profile_picture_url = f"/static/uploads/profile_pictures/{filename}"
                 cursor.execute("UPDATE users SET profile_picture = %s WHERE id = %s", (profile_picture_url, user_id))
                 conn.commit()
-                
-                # Update session with new profile picture
-                session['user']['profile_picture'] = profile_picture_url
-                
-                return jsonify({
-                    'success': True,
-                    'message': 'Profile picture uploaded successfully',
-                    'profile_picture_url': profile_picture_url
-                })
-            except Exception as e:
-                logger.error(f"Database error updating profile picture: {e}")
-                return jsonify({'success': False, 'message': f'Database error: {str(e)}'})
-            finally:
-                conn.close()
-        else:
+            
+            # Update session with new profile picture
+            session['user']['profile_picture'] = profile_picture_url
+            
+            return jsonify({
+                'success': True,
+                'message': 'Profile picture uploaded successfully',
+                'profile_picture_url': profile_picture_url
+            })
+        except DatabaseUnavailable:
             return jsonify({'success': False, 'message': 'Database connection failed'})
+        except Exception as e:
+            logger.error(f"Database error updating profile picture: {e}")
+            return jsonify({'success': False, 'message': f'Database error: {str(e)}'})
             
     except Exception as e:
         logger.error(f"Error uploading profile picture: {e}")
@@ -1466,122 +1615,115 @@ def update_profile():
             logger.warning(f"Invalid username format: {data['username']}")
             return jsonify({'success': False, 'message': 'Username can only contain letters, numbers, and underscores'})
         
-        conn = get_db_connection()
-        if not conn:
-            logger.error("Database connection failed")
-            return jsonify({'success': False, 'message': 'Database connection failed'})
-        
         try:
-            cursor = conn.cursor(dictionary=True)
-            
-            # Check if username is already taken by another user
-            cursor.execute("SELECT id FROM users WHERE username = %s AND id != %s", (data['username'], user_id))
-            if cursor.fetchone():
-                logger.warning(f"Username already taken: {data['username']}")
-                return jsonify({'success': False, 'message': 'Username already taken'})
-            
-            # Check if email is already taken by another user
-            cursor.execute("SELECT id FROM users WHERE email = %s AND id != %s", (data['email'], user_id))
-            if cursor.fetchone():
-                logger.warning(f"Email already taken: {data['email']}")
-                return jsonify({'success': False, 'message': 'Email already taken'})
-            
-            # Get current user data
-            cursor.execute("SELECT birth_date, gender FROM users WHERE id = %s", (user_id,))
-            current_user = cursor.fetchone()
-            
-            # Update user information
-            update_query = """
-                UPDATE users 
-                SET first_name = %s,
-                    last_name = %s,
-                    email = %s,
-                    username = %s,
-                    birth_date = %s,
-                    gender = %s,
-                    updated_at = NOW()
-            """
-            # Handle birth_date properly
-            birth_date = data.get('birth_date')
-            if birth_date and birth_date.strip():
-                birth_date_value = birth_date
-            else:
-                birth_date_value = current_user['birth_date']
+            with db_cursor(dictionary=True) as (conn, cursor):
+                # Check if username is already taken by another user
+                cursor.execute("SELECT id FROM users WHERE username = %s AND id != %s", (data['username'], user_id))
+                if cursor.fetchone():
+                    logger.warning(f"Username already taken: {data['username']}")
+                    return jsonify({'success': False, 'message': 'Username already taken'})
+            
+                # Check if email is already taken by another user
+                cursor.execute("SELECT id FROM users WHERE email = %s AND id != %s", (data['email'], user_id))
+                if cursor.fetchone():
+                    logger.warning(f"Email already taken: {data['email']}")
+                    return jsonify({'success': False, 'message': 'Email already taken'})
             
-            # Handle gender properly
-            gender = data.get('gender')
-            if gender and gender.strip():
-                gender_value = gender
-            else:
-                gender_value = current_user['gender']
-            
-            update_params = [
-                data['firstName'],
-                data['lastName'],
-                data['email'],
-                data['username'],
-                birth_date_value,
-                gender_value
-            ]
+                # Get current user data
+                cursor.execute("SELECT birth_date, gender FROM users WHERE id = %s", (user_id,))
+                current_user = cursor.fetchone()
+            
+                # Update user information
+                update_query = """
+                    UPDATE users 
+                    SET first_name = %s,
+                        last_name = %s,
+                        email = %s,
+                        username = %s,
+                        birth_date = %s,
+                        gender = %s,
+                        updated_at = NOW()
+                """
+                # Handle birth_date properly
+                birth_date = data.get('birth_date')
+                if birth_date and birth_date.strip():
+                    birth_date_value = birth_date
+                else:
+                    birth_date_value = current_user['birth_date']
             
-            # Add password update if provided
-            if data.get('password') and data['password'].strip():
-                update_query += ", password = %s"
-                update_params.append(generate_password_hash(data['password']))
+                # Handle gender properly
+                gender = data.get('gender')
+                if gender and gender.strip():
+                    gender_value = gender
+                else:
+                    gender_value = current_user['gender']
+            
+                update_params = [
+                    data['firstName'],
+                    data['lastName'],
+                    data['email'],
+                    data['username'],
+                    birth_date_value,
+                    gender_value
+                ]
             
-            update_query += " WHERE id = %s"
-            update_params.append(user_id)
+                # Add password update if provided
+                if data.get('password') and data['password'].strip():
+                    update_query += ", password = %s"
+                    update_params.append(generate_password_hash(data['password']))
             
-            logger.info(f"Updating user {user_id} with query: {update_query}")
-            logger.info(f"Update params: {update_params}")
+                update_query += " WHERE id = %s"
+                update_params.append(user_id)
             
-            try:
-                cursor.execute(update_query, tuple(update_params))
-                conn.commit()
-                logger.info(f"Database update successful for user {user_id}")
-            except Exception as e:
-                logger.error(f"Database update failed for user {user_id}: {e}")
-                conn.rollback()
-                return jsonify({'success': False, 'message': f'Database update failed: {str(e)}'})
-            
-            # Get updated user data
-            cursor.execute("""
-                SELECT id, username, email, first_name, last_name, 
-                       birth_date, gender, created_at, updated_at
-                FROM users 
-                WHERE id = %s
-            """, (user_id,))
-            
-            updated_user = cursor.fetchone()
-            
-            if updated_user:
-                # Update session data with all user information
-                session['user'].update({
-                    'username': updated_user['username'],
-                    'email': updated_user['email'],
-                    'first_name': updated_user['first_name'],
-                    'last_name': updated_user['last_name'],
-                    'birth_date': str(updated_user['birth_date']) if updated_user['birth_date'] else None,
-                    'gender': updated_user['gender']
-                })
+                logger.info(f"Updating user {user_id} with query: {update_query}")
+                logger.info(f"Update params: {update_params}")
+            
+                try:
+                    cursor.execute(update_query, tuple(update_params))
+                    conn.commit()
+                    logger.info(f"Database update successful for user {user_id}")
+                except Exception as e:
+                    logger.error(f"Database update failed for user {user_id}: {e}")
+                    conn.rollback()
+                    return jsonify({'success': False, 'message': f'Database update failed: {str(e)}'})
+            
+                # Get updated user data
+                cursor.execute("""
+                    SELECT id, username, email, first_name, last_name, 
+                           birth_date, gender, created_at, updated_at
+                    FROM users 
+                    WHERE id = %s
+                """, (user_id,))
+            
+                updated_user = cursor.fetchone()
+            
+                if updated_user:
+                    # Update session data with all user information
+                    session['user'].update({
+                        'username': updated_user['username'],
+                        'email': updated_user['email'],
+                        'first_name': updated_user['first_name'],
+                        'last_name': updated_user['last_name'],
+                        'birth_date': str(updated_user['birth_date']) if updated_user['birth_date'] else None,
+                        'gender': updated_user['gender']
+                    })
                 
-                logger.info(f"Successfully updated profile for user_id: {user_id}")
-                return jsonify({
-                    'success': True,
-                    'message': 'Profile updated successfully',
-                    'user': session['user']
-                })
+                    logger.info(f"Successfully updated profile for user_id: {user_id}")
+                    return jsonify({
+                        'success': True,
+                        'message': 'Profile updated successfully',
+                        'user': session['user']
+                    })
             
-            logger.warning(f"Failed to update profile for user_id: {user_id}")
-            return jsonify({'success': False, 'message': 'Failed to update profile'})
+                logger.warning(f"Failed to update profile for user_id: {user_id}")
+                return jsonify({'success': False, 'message': 'Failed to update profile'})
             
+        except DatabaseUnavailable:
+            logger.error("Database connection failed")
+            return jsonify({'success': False, 'message': 'Database connection failed'})
         except Exception as e:
             logger.error(f"Database error while updating profile: {e}")
             return jsonify({'success': False, 'message': 'Database error occurred'})
-        finally:
-            if conn:
-                conn.close()
-                
     except Exception as e:
         logger.error(f"Error updating profile: {e}")
         return jsonify({'success': False, 'message': str(e)})
@@ -1657,21 +1799,18 @@ def update_user_admin(user_id):
 
 	# If optional fields missing, fetch current values
 	if birth_date is None or gender is None:
-		conn = get_db_connection()
-		if not conn:
-			return jsonify({'success': False, 'message': 'Database connection failed'})
 		try:
-			cursor = conn.cursor(dictionary=True)
-			cursor.execute("SELECT birth_date, gender FROM users WHERE id = %s", (user_id,))
-			current_user = cursor.fetchone()
-			if not current_user:
-				return jsonify({'success': False, 'message': 'User not found'})
-			if birth_date is None:
-				birth_date = current_user.get('birth_date')
-			if gender is None:
-				gender = current_user.get('gender')
-		finally:
-			conn.close()
+			with db_cursor(dictionary=True) as (conn, cursor):
+				cursor.execute("SELECT birth_date, gender FROM users WHERE id = %s", (user_id,))
+				current_user = cursor.fetchone()
+				if not current_user:
+					return jsonify({'success': False, 'message': 'User not found'})
+				if birth_date is None:
+					birth_date = current_user.get('birth_date')
+				if gender is None:
+					gender = current_user.get('gender')
+		except DatabaseUnavailable:
+			return jsonify({'success': False, 'message': 'Database connection failed'})
 
 	success, result = update_user(
 		user_id=user_id,
@@ -1733,78 +1872,71 @@ def get_user_stats():
                 'stats': cached_stats['data']
             })
         
-        conn = get_db_connection()
-        if not conn:
-            logger.error("Database connection failed")
-            return jsonify({'success': False, 'message': 'Database connection failed'})
-        
         try:
-            cursor = conn.cursor(dictionary=True)
-            
-            # Optimized single query to get all stats at once with better performance
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as sessions,
-                    COALESCE(SUM(session_duration), 0) as total_duration,
-                    SUM(CASE WHEN posture_type LIKE '%Good%' THEN 1 ELSE 0 END) as good_records,
-                    COUNT(*) as total_records
-                FROM posture_records 
-                WHERE user_id = %s
-            """, (user_id,))
-            
-            result = cursor.fetchone()
-            
-            if result:
-                sessions = result['sessions'] or 0
-                total_duration = result['total_duration'] or 0
-                good_records = result['good_records'] or 0
-                total_records = result['total_records'] or 0
+            with db_cursor(dictionary=True) as (conn, cursor):
+                # Optimized single query to get all stats at once with better performance
+                cursor.execute("""
+                    SELECT 
+                        COUNT(*) as sessions,
+                        COALESCE(SUM(session_duration), 0) as total_duration,
+                        SUM(CASE WHEN posture_type LIKE '%Good%' THEN 1 ELSE 0 END) as good_records,
+                        COUNT(*) as total_records
+                    FROM posture_records 
+                    WHERE user_id = %s
+                """, (user_id,))
+            
+                result = cursor.fetchone()
+            
+                if result:
+                    sessions = result['sessions'] or 0
+                    total_duration = result['total_duration'] or 0
+                    good_records = result['good_records'] or 0
+                    total_records = result['total_records'] or 0
                 
-                # Calculate good posture percentage
-                if total_records > 0:
-                    good_posture_percent = round((good_records / total_records) * 100, 1)
+                    # Calculate good posture percentage
+                    if total_records > 0:
+                        good_posture_percent = round((good_records / total_records) * 100, 1)
+                    else:
+                        good_posture_percent = 0
+                
+                    # Convert total duration to hours
+                    total_time_hours = round(total_duration / 3600, 1)
                 else:
+                    sessions = 0
                     good_posture_percent = 0
-                
-                # Convert total duration to hours
-                total_time_hours = round(total_duration / 3600, 1)
-            else:
-                sessions = 0
-                good_posture_percent = 0
-                total_time_hours = 0
+                    total_time_hours = 0
             
-            cursor.close()
             
-            logger.info(f"Retrieved stats for user {user_id}: {sessions} sessions, {good_posture_percent}% good posture, {total_time_hours}h total time")
+                logger.info(f"Retrieved stats for user {user_id}: {sessions} sessions, {good_posture_percent}% good posture, {total_time_hours}h total time")
             
-            # Cache the results
-            stats_data = {
-                'sessions': sessions,
-                'good_posture_percent': good_posture_percent,
-                'total_time_hours': total_time_hours
-            }
+                # Cache the results
+                stats_data = {
+                    'sessions': sessions,
+                    'good_posture_percent': good_posture_percent,
+                    'total_time_hours': total_time_hours
+                }
             
-            # Initialize cache if it doesn't exist
-            if not hasattr(app, 'stats_cache'):
-                app.stats_cache = {}
+                # Initialize cache if it doesn't exist
+                if not hasattr(app, 'stats_cache'):
+                    app.stats_cache = {}
             
-            # Store in cache with timestamp
-            app.stats_cache[cache_key] = {
-                'data': stats_data,
-                'timestamp': time.time()
-            }
+                # Store in cache with timestamp
+                app.stats_cache[cache_key] = {
+                    'data': stats_data,
+                    'timestamp': time.time()
+                }
             
-            return jsonify({
-                'success': True,
-                'stats': stats_data
-            })
+                return jsonify({
+                    'success': True,
+                    'stats': stats_data
+                })
             
+        except DatabaseUnavailable:
+            logger.error("Database connection failed")
+            return jsonify({'success': False, 'message': 'Database connection failed'})
         except Exception as e:
             logger.error(f"Database error getting user stats: {e}")
             return jsonify({'success': False, 'message': f'Database error: {str(e)}'})
-        finally:
-            conn.close()
-            
     except Exception as e:
         logger.error(f"Error getting user stats: {e}")
         return jsonify({'success': False, 'message': f'Server error: {str(e)}'})
@@ -1818,37 +1950,31 @@ def get_user_data():
             logger.error("User not found in session")
             return jsonify({'success': False, 'message': 'User not found in session'})
         
-        conn = get_db_connection()
-        if not conn:
+        try:
+            with db_cursor(dictionary=True) as (conn, cursor):
+                cursor.execute("""
+                    SELECT id, username, email, first_name, last_name, 
+                           birth_date, gender, profile_picture, created_at, updated_at
+                    FROM users 
+                    WHERE id = %s
+                """, (user_id,))
+            
+                user = cursor.fetchone()
+            
+                if user:
+                    logger.info(f"Successfully retrieved user data for user_id: {user_id}")
+                    return jsonify({
+                        'success': True,
+                        'user': user
+                    })
+                logger.warning(f"User not found in database for user_id: {user_id}")
+                return jsonify({'success': False, 'message': 'User not found'})
+        except DatabaseUnavailable:
             logger.error("Database connection failed")
             return jsonify({'success': False, 'message': 'Database connection failed'})
-        
-        try:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT id, username, email, first_name, last_name, 
-                       birth_date, gender, profile_picture, created_at, updated_at
-                FROM users 
-                WHERE id = %s
-            """, (user_id,))
-            
-            user = cursor.fetchone()
-            cursor.close()
-            
-            if user:
-                logger.info(f"Successfully retrieved user data for user_id: {user_id}")
-                return jsonify({
-                    'success': True,
-                    'user': user
-                })
-            logger.warning(f"User not found in database for user_id: {user_id}")
-            return jsonify({'success': False, 'message': 'User not found'})
         except Exception as e:
             logger.error(f"Database error while getting user data: {e}")
             return jsonify({'success': False, 'message': 'Database error occurred'})
-        finally:
-            if conn:
-                conn.close()
     except Exception as e:
         logger.error(f"Error getting user data: {e}")
         return jsonify({'success': False, 'message': str(e)})
@@ -1862,7 +1988,26 @@ def update_camera_settings():
         if not data:
             return jsonify({'success': False, 'message': 'No data provided'})
         
+        # Validate everything before applying anything, so a bad field doesn't leave a partial update
         mirror_enabled = data.get('mirror_enabled', True)
+        if not isinstance(mirror_enabled, bool):
+            return jsonify({'success': False, 'message': 'mirror_enabled must be true or false'})
+        stream_mode = data.get('stream_mode')
+        if stream_mode is not None and stream_mode not in ('video', 'landmarks', 'upload'):
+            return jsonify({'success': False, 'message': f'Unknown preview mode: {stream_mode}'})
+        stream_preset = data.get('stream_preset')
+        if stream_preset is not None and stream_preset not in STREAM_PRESETS:
+            return jsonify({'success': False, 'message': f'Unknown stream quality: {stream_preset}'})
+        
+        # Preview mode and quality are per user, saved with their account; applied the next time their dashboard connects
+        if stream_mode is not None or stream_preset is not None:
+            success, result = save_stream_settings(session['user']['id'], stream_mode, stream_preset)
+            if not success:
+                return jsonify({'success': False, 'message': 'Error saving camera settings'})
+            if stream_mode is not None:
+                session['stream_mode'] = stream_mode
+            if stream_preset is not None:
+                session['stream_preset'] = stream_preset
         
         # Update the global camera mirror setting
         # Note: This is a simple implementation that updates the config
@@ -1874,13 +2019,48 @@ def update_camera_settings():
         return jsonify({
             'success': True, 
             'message': 'Camera settings updated successfully',
-            'mirror_enabled': mirror_enabled
+            'mirror_enabled': mirror_enabled,
+            'stream_mode': session.get('stream_mode', 'video'),
+            'stream_preset': session.get('stream_preset', app.config.get('STREAM_PRESET', 'medium'))
         })
         
     except Exception as e:
         logger.error(f"Error updating camera settings: {e}")
         return jsonify({'success': False, 'message': 'Error updating camera settings'})
 
+@app.route('/get-available-cameras')
+@login_required
+def get_available_cameras():
+    """Return the cached list of detected cameras and their capabilities"""
+    try:
+        snapshot = camera_registry.snapshot()
+        return jsonify({
+            'success': True,
+            'cameras': snapshot['cameras'],
+            'last_probe': snapshot['last_probe'],
+            'probing': snapshot['probing'],
+            'configured_index': app.config.get('CAMERA_INDEX', -1)
+        })
+    except Exception as e:
+        logger.error(f"Error getting available cameras: {e}")
+        return jsonify({'success': False, 'message': 'Error getting available cameras'})
+
+@app.route('/admin/cameras/refresh', methods=['POST'])
+@login_required
+def refresh_cameras_admin():
+    """Re-probe camera devices (admin only)"""
+    if session['user'].get('username') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    try:
+        # Devices held open by a running stream can't be reopened; keep their cached entries
+        busy = [p.camera_index for p in get_active_pipelines()]
+        cameras = camera_registry.probe(skip=busy)
+        return jsonify({'success': True, 'cameras': cameras})
+    except Exception as e:
+        logger.error(f"Error refreshing cameras: {e}")
+        return jsonify({'success': False, 'message': 'Error refreshing cameras'})
+
 @app.route('/get-camera-settings')
 @login_required
 def get_camera_settings():
@@ -1890,7 +2070,10 @@ def get_camera_settings():
         
         return jsonify({
             'success': True,
-            'mirror_enabled': mirror_enabled
+            'mirror_enabled': mirror_enabled,
+            'stream_mode': session.get('stream_mode', 'video'),
+            'stream_preset': session.get('stream_preset', app.config.get('STREAM_PRESET', 'medium')),
+            'stream_presets': STREAM_PRESETS
         })
         
     except Exception as e:
@@ -1911,68 +2094,62 @@ def admin_user_posture_history(user_id):
             return jsonify({'success': False, 'message': 'Unauthorized'})
         
         # Get user information
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'success': False, 'message': 'Database connection failed'})
-        
         try:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT id, username, email, first_name, last_name 
-                FROM users 
-                WHERE id = %s
-            """, (user_id,))
-            user = cursor.fetchone()
-            
-            if not user:
-                return jsonify({'success': False, 'message': 'User not found'})
-            
-            # Get posture history
-            success, history = get_user_posture_history(user_id, limit=100)
+            with db_cursor(dictionary=True) as (conn, cursor):
+                cursor.execute("""
+                    SELECT id, username, email, first_name, last_name 
+                    FROM users 
+                    WHERE id = %s
+                """, (user_id,))
+                user = cursor.fetchone()
             
-            if not success:
-                return jsonify({'success': False, 'message': history})
-            
-            # Calculate statistics
-            total_records = len(history) if history else 0
-            good_posture_count = 0
-            total_confidence = 0
-            total_duration = 0
-            
-            if history:
-                for record in history:
-                    if 'Good' in record.get('posture_type', ''):
-                        good_posture_count += 1
-                    total_confidence += record.get('confidence_score', 0)
-                    total_duration += record.get('session_duration', 0)
-            
-            # Calculate percentages and averages
-            good_posture_percentage = (good_posture_count / total_records * 100) if total_records > 0 else 0
-            avg_confidence = (total_confidence / total_records * 100) if total_records > 0 else 0
-            total_hours = total_duration / 3600 if total_duration else 0
-            
-            stats = {
-                'total_records': total_records,
-                'good_posture_percentage': round(good_posture_percentage, 1),
-                'total_hours': round(total_hours, 1),
-                'avg_confidence': round(avg_confidence, 1),
-                'health_score': round((good_posture_percentage + avg_confidence) / 2, 1)
-            }
+                if not user:
+                    return jsonify({'success': False, 'message': 'User not found'})
+            
+                # Get posture history
+                success, history = get_user_posture_history(user_id, limit=100)
+            
+                if not success:
+                    return jsonify({'success': False, 'message': history})
+            
+                # Calculate statistics
+                total_records = len(history) if history else 0
+                good_posture_count = 0
+                total_confidence = 0
+                total_duration = 0
+            
+                if history:
+                    for record in history:
+                        if 'Good' in record.get('posture_type', ''):
+                            good_posture_count += 1
+                        total_confidence += record.get('confidence_score', 0)
+                        total_duration += record.get('session_duration', 0)
+            
+                # Calculate percentages and averages
+                good_posture_percentage = (good_posture_count / total_records * 100) if total_records > 0 else 0
+                avg_confidence = (total_confidence / total_records * 100) if total_records > 0 else 0
+                total_hours = total_duration / 3600 if total_duration else 0
+            
+                stats = {
+                    'total_records': total_records,
+                    'good_posture_percentage': round(good_posture_percentage, 1),
+                    'total_hours': round(total_hours, 1),
+                    'avg_confidence': round(avg_confidence, 1),
+                    'health_score': round((good_posture_percentage + avg_confidence) / 2, 1)
+                }
             
-            return jsonify({
-                'success': True,
-                'user': user,
-                'history': history,
-                'stats': stats
-            })
+                return jsonify({
+                    'success': True,
+                    'user': user,
+                    'history': history,
+                    'stats': stats
+                })
             
+        except DatabaseUnavailable:
+            return jsonify({'success': False, 'message': 'Database connection failed'})
         except Exception as e:
             logger.error(f"Database error getting user posture history: {e}")
             return jsonify({'success': False, 'message': 'Database error occurred'})
-        finally:
-            if conn:
-                conn.close()
-                
     except Exception as e:
         logger.error(f"Error getting user posture history: {e}")
         return jsonify({'success': False, 'message': str(e)})
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Offline replay benchmark for the streaming pipeline.
+
+Replays a recorded video file or image directory through the same
+StreamPipeline the app serves /video_feed from (capture thread, process_frame
+with pose/classifier inference, overlay, JPEG encode), headlessly, and
+reports per-stage latency percentiles, throughput, CPU and peak memory.
+
+By default every recorded frame is processed as fast as possible
+(lockstep), so runs are comparable; --realtime instead releases frames at
+the recording's frame rate and lets the pipeline drop frames like it does
+with a live camera. The JSON report (--output) can be diffed against an
+earlier one with --compare.
+
+Usage:
+    python bench.py recordings/desk.mp4
+    python bench.py recordings/frames/ --frames 300 --output bench.json
+    python bench.py recordings/desk.mp4 --compare bench-previous.json
+    INFERENCE_WORKERS=2 python bench.py recordings/desk.mp4 --realtime
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# Headless: load models explicitly below, never probe camera devices
+os.environ.setdefault('MODEL_LOAD_MODE', 'lazy')
+os.environ.setdefault('CAMERA_INDEX', '0')
+
+import psutil  # noqa: E402
+
+import app as posturease  # noqa: E402
+from config import Config  # noqa: E402
+from video_pipeline import StreamPipeline, resolve_stream_settings  # noqa: E402
+
+# Stages in pipeline order, for the printed table
+STAGE_ORDER = ('capture', 'process', 'inference', 'detect', 'pose', 'classify', 'score', 'draw', 'encode')
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def cpu_seconds(process):
+    """User + system CPU of this process and its live children (inference workers)."""
+    total = sum(process.cpu_times()[:2])
+    for child in process.children(recursive=True):
+        try:
+            total += sum(child.cpu_times()[:2])
+        except psutil.NoSuchProcess:
+            pass
+    return total
+
+
+def peak_rss_mb(process):
+    """Peak RSS of this process (Linux high-water mark where available) plus current RSS of children."""
+    try:
+        with open(f'/proc/{process.pid}/status') as f:
+            peak = next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmHWM'))
+    except (OSError, StopIteration):
+        peak = process.memory_info().rss
+    for child in process.children(recursive=True):
+        try:
+            peak += child.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return peak / 1e6
+
+
+def run(source, max_frames, realtime, preset, quality, width, encoder, load_timeout):
+    models = posturease.posture_models
+    started = time.perf_counter()
+    if not models.ensure_loaded(timeout=load_timeout):
+        # Still useful for capture/draw/encode numbers; the report records the model state
+        print(f"⚠️ Posture models not loaded ({models.state}); benchmarking without inference", file=sys.stderr)
+    load_seconds = time.perf_counter() - started
+
+    settings = resolve_stream_settings(preset, quality=quality, max_width=width)
+    # Encode every processed frame; the viewer FPS cap is a delivery setting, not pipeline cost
+    settings['fps'] = 1000
+    pipeline = StreamPipeline(source, posturease.process_frame, posturease.new_frame_state, encoder=encoder,
+                              capture_options={'lossless': not realtime, 'realtime': realtime})
+
+    process = psutil.Process()
+    cpu_before = cpu_seconds(process)
+    started = time.perf_counter()
+    chunks, sent_bytes = 0, 0
+    frames = pipeline.frames(None, settings)
+    for chunk in frames:
+        chunks += 1
+        sent_bytes += len(chunk)
+        if max_frames and pipeline.frames_processed >= max_frames:
+            break
+    frames.close()
+    wall = time.perf_counter() - started
+    cpu = cpu_seconds(process) - cpu_before
+
+    processed = pipeline.frames_processed
+    state = pipeline.state or {}
+    return {
+        'source': os.path.abspath(source),
+        'mode': 'realtime' if realtime else 'lockstep',
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'config': {
+            'inference_mode': Config.INFERENCE_MODE,
+            'inference_workers': Config.INFERENCE_WORKERS,
+            'pose_model_complexity': Config.POSE_MODEL_COMPLEXITY,
+            'pose_input_width': Config.POSE_INPUT_WIDTH,
+            'classifier_backend': Config.CLASSIFIER_BACKEND,
+            'classifier_precision': Config.CLASSIFIER_PRECISION,
+            'person_tracking': Config.PERSON_TRACKING,
+            'stream': {k: settings[k] for k in ('quality', 'max_width')},
+            'encoder': pipeline.encoder.backend
+        },
+        'models': models.status(),
+        'model_load_seconds': round(load_seconds, 2),
+        'frames': processed,
+        'frames_encoded': chunks,
+        'wall_seconds': round(wall, 3),
+        'fps': round(processed / wall, 2) if wall > 0 else 0.0,
+        'cpu_percent': round(100.0 * cpu / wall, 1) if wall > 0 else 0.0,
+        'peak_rss_mb': round(peak_rss_mb(process), 1),
+        'mean_jpeg_kb': round(sent_bytes / chunks / 1024, 1) if chunks else 0.0,
+        'cadence': state['cadence'].stats() if state.get('cadence') else None,
+        'stages': state['timings'].summary() if state.get('timings') else {}
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"\n📼 {report['source']} ({report['mode']}, revision {report['revision']})")
+    print(f"Frames: {report['frames']}  FPS: {report['fps']}  CPU: {report['cpu_percent']}%  "
+          f"Peak RSS: {report['peak_rss_mb']} MB  Encoder: {report['config']['encoder']}")
+    header = f"{'stage':<10} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    if baseline:
+        header += f" {'Δp50':>8} {'Δp95':>8}"
+    print(header)
+    stages = report['stages']
+    for stage in sorted(stages, key=lambda s: (STAGE_ORDER.index(s) if s in STAGE_ORDER else len(STAGE_ORDER), s)):
+        row = stages[stage]
+        line = f"{stage:<10} {row['count']:>6} {row['p50']:>8.2f} {row['p95']:>8.2f} {row['p99']:>8.2f} {row['max']:>8.2f}"
+        old = (baseline or {}).get('stages', {}).get(stage)
+        if old:
+            line += f" {row['p50'] - old['p50']:>+8.2f} {row['p95'] - old['p95']:>+8.2f}"
+        print(line)
+    if baseline:
+        print(f"FPS {baseline['fps']} -> {report['fps']}, CPU {baseline['cpu_percent']}% -> {report['cpu_percent']}%, "
+              f"peak RSS {baseline['peak_rss_mb']} -> {report['peak_rss_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recording through the streaming pipeline and report latency')
+    parser.add_argument('source', help='Video file or directory of images')
+    parser.add_argument('--frames', type=int, default=0, help='Stop after this many frames (default: whole recording)')
+    parser.add_argument('--realtime', action='store_true', help='Pace frames at the recording FPS and allow drops')
+    parser.add_argument('--preset', default=Config.STREAM_PRESET, help='Stream encoding preset (low/medium/high/max)')
+    parser.add_argument('--quality', type=int, help='Override the preset JPEG quality')
+    parser.add_argument('--width', type=int, help='Override the preset max width (0 = full size)')
+    parser.add_argument('--encoder', default=Config.STREAM_ENCODER, help='JPEG encoder (auto/simplejpeg/turbojpeg/opencv)')
+    parser.add_argument('--load-timeout', type=float, default=300.0, help='Seconds to wait for the models')
+    parser.add_argument('--output', help='Write the JSON report here')
+    parser.add_argument('--compare', help='Earlier JSON report to show deltas against')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        parser.error(f"Source not found: {args.source}")
+
+    report = run(args.source, args.frames, args.realtime, args.preset, args.quality, args.width,
+                 args.encoder, args.load_timeout)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Report saved to {args.output}")
+    if posturease.inference_pool is not None:
+        posturease.inference_pool.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+import os
+import threading
+import time
+import logging
+import cv2
+import numpy as np
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+class ReplaySource:
+    """
+    cv2.VideoCapture-like reader over a recorded video file or a directory
+    of images (read in sorted filename order), so recorded sessions can be
+    fed through the same capture path as a live camera.
+
+    With realtime=True frames are released at the recording's frame rate
+    (fps, default 30 for image directories) like a camera would deliver
+    them; otherwise read() returns frames as fast as they can be decoded.
+    With loop=True the recording restarts when it reaches the end.
+    """
+
+    def __init__(self, path, realtime=True, loop=False, fps=None):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self._video = None
+        self._images = None
+        self._position = 0
+        if os.path.isdir(path):
+            self._images = sorted(os.path.join(path, f) for f in os.listdir(path)
+                                  if f.lower().endswith(IMAGE_EXTENSIONS))
+            self.fps = fps or 30.0
+        else:
+            self._video = cv2.VideoCapture(path)
+            self.fps = fps or self._video.get(cv2.CAP_PROP_FPS) or 30.0
+        self._next_due = None
+
+    def isOpened(self):
+        if self._images is not None:
+            return bool(self._images)
+        return self._video is not None and self._video.isOpened()
+
+    def _read_next(self, image):
+        if self._images is not None:
+            if self._position >= len(self._images):
+                return False, None
+            frame = cv2.imread(self._images[self._position], cv2.IMREAD_COLOR)
+            self._position += 1
+            if frame is None:
+                return False, None
+            if image is not None and image.shape == frame.shape:
+                np.copyto(image, frame)
+                return True, image
+            return True, frame
+        self._position += 1
+        return self._video.read(image)
+
+    def _rewind(self):
+        self._position = 0
+        if self._video is not None:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def read(self, image=None):
+        if self.realtime:
+            now = time.monotonic()
+            if self._next_due is not None and now < self._next_due:
+                time.sleep(self._next_due - now)
+            self._next_due = max(now, self._next_due or now) + 1.0 / self.fps
+        success, frame = self._read_next(image)
+        if not success and self.loop and self._position > 1:
+            self._rewind()
+            success, frame = self._read_next(image)
+        return success, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self._images) if self._images is not None else self._video.get(prop)
+        return self._video.get(prop) if self._video is not None else 0.0
+
+    def set(self, prop, value):
+        # Capture properties (buffer size, resolution) don't apply to recordings
+        return False
+
+    def release(self):
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+
+
+def open_frame_source(source, realtime=True, loop=False):
+    """
+    Open a frame source: a camera index (int or digit string) through
+    cv2.VideoCapture, or a video file / image directory path as a ReplaySource.
+    """
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        return cv2.VideoCapture(int(source))
+    return ReplaySource(source, realtime=realtime, loop=loop)
+
+
+class CameraStream:
+    """
+    Capture frames from a camera on a dedicated thread.
+
+    Only the most recent frame is kept: a new capture overwrites the slot
+    whether or not the previous frame was consumed, so a slow consumer sees
+    stale frames dropped instead of queued and latency stays bounded by a
+    single processing step.
+
+    Frames are decoded into a ring of three reused buffers: one holding the
+    latest frame, one owned by the consumer (valid until its next
+    read_latest() call, so it may draw on it in place) and one being
+    captured into.
+
+    camera_index may also be a video file or image directory path (see
+    open_frame_source()). lossless=True makes capture wait for the consumer
+    instead of dropping frames, so a replay processes every recorded frame;
+    decode times go to timings (a StageTimings) as 'capture' if given.
+    """
+
+    def __init__(self, camera_index, lossless=False, realtime=True, loop=False, timings=None):
+        self.camera_index = camera_index
+        self.lossless = lossless
+        self.realtime = realtime
+        self.loop = loop
+        self.timings = timings
+        self._cap = None
+        self._thread = None
+        self._cond = threading.Condition()
+        self._slots = [None, None, None]
+        self._latest_slot = None
+        self._consumer_slot = None
+        self._seq = 0
+        self._consumed_seq = 0
+        self._running = False
+        self.frames_captured = 0
+        self.frames_dropped = 0
+
+    @property
+    def is_running(self):
+        return self._running
+
+    def start(self):
+        """Open the device and start the capture thread. Returns False if the camera cannot be opened."""
+        if self._running:
+            return True
+        cap = open_frame_source(self.camera_index, realtime=self.realtime, loop=self.loop)
+        if not cap.isOpened():
+            logger.error(f"Could not open camera index {self.camera_index}")
+            cap.release()
+            return False
+        # Keep the driver-side queue as short as possible; we only want fresh frames
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self._cap = cap
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._capture_loop,
+            name=f"camera-capture-{self.camera_index}",
+            daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Started capture thread for camera index {self.camera_index}")
+        return True
+
+    def _capture_loop(self):
+        try:
+            while self._running:
+                with self._cond:
+                    if self.lossless:
+                        # Replay mode: hand over every frame before capturing the next
+                        while self._running and self._seq > self._consumed_seq:
+                            self._cond.wait(0.5)
+                    slot = next(i for i in range(3) if i not in (self._latest_slot, self._consumer_slot))
+                # Decode into the free buffer; OpenCV reallocates only if the frame size changes
+                started = time.perf_counter()
+                success, frame = self._cap.read(self._slots[slot])
+                if self.timings is not None and success:
+                    self.timings.record('capture', (time.perf_counter() - started) * 1000.0)
+                if not success or frame is None:
+                    if isinstance(self._cap, ReplaySource):
+                        logger.info(f"Replay of {self.camera_index} reached the end")
+                    else:
+                        logger.warning(f"Camera index {self.camera_index} stopped delivering frames")
+                    break
+                with self._cond:
+                    if self._seq > self._consumed_seq:
+                        # Previous frame was never picked up by the consumer
+                        self.frames_dropped += 1
+                    self._slots[slot] = frame
+                    self._latest_slot = slot
+                    self._seq += 1
+                    self.frames_captured += 1
+                    self._cond.notify_all()
+        finally:
+            with self._cond:
+                self._running = False
+                self._cond.notify_all()
+
+    def read_latest(self, last_seq=0, timeout=1.0):
+        """
+        Return (seq, frame) for the newest frame captured after last_seq.
+
+        Blocks up to timeout seconds. Returns (last_seq, None) if no newer
+        frame arrived in time or the capture thread has stopped.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._seq <= last_seq and self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return last_seq, None
+                self._cond.wait(remaining)
+            if self._seq <= last_seq:
+                return last_seq, None
+            self._consumed_seq = self._seq
+            self._consumer_slot = self._latest_slot
+            self._cond.notify_all()
+            return self._seq, self._slots[self._latest_slot]
+
+    def stop(self):
+        """Stop the capture thread and release the device."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        logger.info(f"Stopped capture for camera index {self.camera_index} "
+                    f"(captured={self.frames_captured}, dropped={self.frames_dropped})")
+
+
+class CameraRegistry:
+    """
+    Cached camera discovery.
+
+    Probing opens every candidate device and reads a frame, which takes
+    seconds, so it is done once (normally in the background at startup) and
+    repeated only when a cached camera fails to open or an admin asks for a
+    refresh.
+    """
+
+    def __init__(self, max_index=5):
+        self.max_index = max_index
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._probed = threading.Event()
+        self._cameras = []
+        self._last_probe = None
+
+    def _probe_index(self, index):
+        cap = cv2.VideoCapture(index)
+        try:
+            if not cap.isOpened():
+                return None
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                return None
+            height, width = frame.shape[:2]
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+            return {
+                'index': index,
+                'width': int(width),
+                'height': int(height),
+                'fps': round(float(fps), 1)
+            }
+        finally:
+            cap.release()
+
+    def probe(self, skip=()):
+        """
+        Probe camera indices and replace the cache.
+
+        Indices in skip (e.g. devices currently held open by a stream) are not
+        reopened; their previous cache entries are kept as-is.
+        """
+        with self._probe_lock:
+            started = time.time()
+            with self._lock:
+                previous = {c['index']: c for c in self._cameras}
+            cameras = []
+            for index in range(self.max_index):
+                if index in skip:
+                    if index in previous:
+                        cameras.append(previous[index])
+                    continue
+                info = self._probe_index(index)
+                if info:
+                    cameras.append(info)
+            with self._lock:
+                self._cameras = cameras
+                self._last_probe = time.time()
+            self._probed.set()
+            logger.info(f"Camera probe found {[c['index'] for c in cameras]} in {time.time() - started:.1f}s")
+            return list(cameras)
+
+    def probe_in_background(self, skip=()):
+        """Start a probe on a daemon thread and return immediately."""
+        thread = threading.Thread(target=self.probe, kwargs={'skip': tuple(skip)},
+                                  name="camera-probe", daemon=True)
+        thread.start()
+        return thread
+
+    def get_cameras(self, timeout=10.0):
+        """Return cached cameras, waiting for (or running) the first probe if needed."""
+        if not self._probed.is_set():
+            if self._probe_lock.locked():
+                self._probed.wait(timeout)
+            else:
+                self.probe()
+        with self._lock:
+            return list(self._cameras)
+
+    def mark_failed(self, index, skip=()):
+        """
+        Drop a camera that failed to open and re-probe in the background.
+
+        skip lists devices held open by running streams; as in probe(), they
+        are not reopened and keep their cache entries.
+        """
+        with self._lock:
+            self._cameras = [c for c in self._cameras if c['index'] != index]
+        logger.warning(f"Camera index {index} failed to open; re-probing cameras")
+        if not self._probe_lock.locked():
+            self.probe_in_background(skip=[i for i in skip if i != index])
+
+    def snapshot(self):
+        """JSON-serialisable view of the cache."""
+        with self._lock:
+            return {
+                'cameras': list(self._cameras),
+                'last_probe': self._last_probe,
+                'probing': self._probe_lock.locked()
+            }
+
+
+# Shared registry used by the app and the streaming pipeline
+camera_registry = CameraRegistry(max_index=Config.CAMERA_PROBE_COUNT)
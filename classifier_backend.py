@@ -0,0 +1,144 @@
+import abc
+import ast
+import os
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class UltralyticsClassifier:
+    """Posture classifier run through ultralytics/PyTorch (.pt weights)."""
+
+    backend = 'pytorch'
+
+    def __init__(self, model, source):
+        self.model = model
+        self.source = source
+        self.names = model.names
+
+    def predict(self, image_bgr):
+        """Return (class_name, confidence) for a BGR image."""
+        result = self.model(image_bgr, verbose=False)[0]
+        class_idx = result.probs.top1
+        return result.names[class_idx], float(result.probs.top1conf)
+
+
+class _ExportedClassifier(abc.ABC):
+    """
+    Shared preprocessing for exported YOLOv8-cls models.
+
+    Mirrors ultralytics' classify_transforms for a BGR numpy input: convert
+    to RGB, resize the shortest edge to imgsz with PIL bilinear, center crop,
+    scale to [0, 1] in CHW order (mean 0 / std 1 normalisation is a no-op).
+    The exported graph already ends in a softmax.
+    """
+
+    def __init__(self, source, names, imgsz):
+        self.source = source
+        self.names = names
+        self.imgsz = imgsz
+
+    def preprocess(self, image_bgr):
+        from PIL import Image
+
+        size = self.imgsz
+        image = Image.fromarray(np.ascontiguousarray(image_bgr[..., ::-1]))
+        w, h = image.size
+        # Same rounding as torchvision's shortest-edge Resize
+        if w <= h:
+            new_w, new_h = size, int(size * h / w)
+        else:
+            new_w, new_h = int(size * w / h), size
+        image = image.resize((new_w, new_h), Image.BILINEAR)
+        top = int(round((new_h - size) / 2.0))
+        left = int(round((new_w - size) / 2.0))
+        arr = np.asarray(image, dtype=np.float32)[top:top + size, left:left + size]
+        return (arr.transpose(2, 0, 1) / 255.0)[None]
+
+    @abc.abstractmethod
+    def _run(self, batch):
+        """Class probabilities for a preprocessed NCHW float32 batch."""
+
+    def predict(self, image_bgr):
+        """Return (class_name, confidence) for a BGR image."""
+        probs = np.asarray(self._run(self.preprocess(image_bgr))).reshape(-1)
+        class_idx = int(probs.argmax())
+        return self.names[class_idx], float(probs[class_idx])
+
+
+def _parse_names(raw):
+    names = ast.literal_eval(raw) if isinstance(raw, str) else raw
+    return {int(k): v for k, v in names.items()}
+
+
+def _parse_imgsz(raw):
+    imgsz = ast.literal_eval(raw) if isinstance(raw, str) else raw
+    return int(imgsz[0] if isinstance(imgsz, (list, tuple)) else imgsz)
+
+
+class OnnxClassifier(_ExportedClassifier):
+    """Posture classifier on ONNX Runtime with CPU execution providers."""
+
+    backend = 'onnx'
+
+    def __init__(self, path, threads=0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+        # ultralytics stores names/imgsz as stringified metadata on the graph
+        meta = self.session.get_modelmeta().custom_metadata_map
+        super().__init__(path, _parse_names(meta['names']), _parse_imgsz(meta.get('imgsz', '224')))
+        self._input = self.session.get_inputs()[0].name
+
+    def _run(self, batch):
+        return self.session.run(None, {self._input: batch})[0]
+
+
+class OpenVINOClassifier(_ExportedClassifier):
+    """Posture classifier on the OpenVINO CPU plugin (an *_openvino_model export directory)."""
+
+    backend = 'openvino'
+
+    def __init__(self, model_dir, threads=0):
+        import yaml
+        import openvino as ov
+
+        xml = next(f for f in os.listdir(model_dir) if f.endswith('.xml'))
+        with open(os.path.join(model_dir, 'metadata.yaml')) as f:
+            meta = yaml.safe_load(f)
+        core = ov.Core()
+        config = {'INFERENCE_NUM_THREADS': threads} if threads else {}
+        self.compiled = core.compile_model(core.read_model(os.path.join(model_dir, xml)), 'CPU', config)
+        super().__init__(model_dir, _parse_names(meta['names']), _parse_imgsz(meta.get('imgsz', 224)))
+
+    def _run(self, batch):
+        return self.compiled(batch)[0]
+
+
+def exported_path(weights, backend, precision='fp32'):
+    """
+    Where the export/quantize scripts write the ONNX file / OpenVINO directory
+    for weights: best.onnx, best_openvino_model/, or best_int8.onnx,
+    best_int8_openvino_model/ for the INT8 variant.
+    """
+    stem = os.path.splitext(weights)[0]
+    if precision == 'int8':
+        stem += '_int8'
+    return f"{stem}.onnx" if backend == 'onnx' else f"{stem}_openvino_model"
+
+
+def load_exported_classifier(weights, backend, threads=0, precision='fp32'):
+    """Load the exported counterpart of weights with the given backend ('onnx' or 'openvino')."""
+    path = exported_path(weights, backend, precision)
+    if not os.path.exists(path):
+        script = 'quantize_classifier.py' if precision == 'int8' else 'export_classifier.py'
+        raise FileNotFoundError(f"No {precision} {backend} export at {path}; run 'Training Again/{script}'")
+    if backend == 'onnx':
+        return OnnxClassifier(path, threads)
+    if backend == 'openvino':
+        return OpenVINOClassifier(path, threads)
+    raise ValueError(f"Unknown classifier backend: {backend}")
@@ -15,6 +15,10 @@ class Config:
     MYSQL_USER = os.getenv('MYSQL_USER', 'root')
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', 'james-2003')
     MYSQL_DB = os.getenv('MYSQL_DB', 'posturease')
+    MYSQL_POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', '8'))  # mysql-connector caps pools at 32
+    MYSQL_POOL_TIMEOUT = float(os.getenv('MYSQL_POOL_TIMEOUT', '5'))  # Seconds to wait for a free pooled connection
+    DB_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_HEALTH_CHECK_INTERVAL', '10'))  # Seconds between background DB probes
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # Bearer token required by /metrics (empty: open, like /healthz)
     
     # Flask configuration
     SECRET_KEY = os.getenv('SECRET_KEY', os.urandom(24))
@@ -34,10 +38,95 @@ class Config:
     # Session summary thresholds (percent in [0,1])
     SESSION_GOOD_THRESHOLD = float(os.getenv('SESSION_GOOD_THRESHOLD', '0.8'))
     SESSION_FAIR_THRESHOLD = float(os.getenv('SESSION_FAIR_THRESHOLD', '0.6'))
+    SESSION_IDLE_TIMEOUT = float(os.getenv('SESSION_IDLE_TIMEOUT', '120'))  # Seconds without readings before an open session is saved
+    SESSION_MAX_SEGMENT = float(os.getenv('SESSION_MAX_SEGMENT', '3600'))  # Long sessions are saved in segments of this many seconds
+    
+    # Posture records are queued and written in batches: when RECORD_WRITER_BATCH_SIZE are waiting or the
+    # oldest has waited RECORD_WRITER_FLUSH_INTERVAL seconds; beyond RECORD_WRITER_MAX_QUEUE new records are dropped
+    RECORD_WRITER_BATCH_SIZE = int(os.getenv('RECORD_WRITER_BATCH_SIZE', '50'))
+    RECORD_WRITER_FLUSH_INTERVAL = float(os.getenv('RECORD_WRITER_FLUSH_INTERVAL', '2.0'))
+    RECORD_WRITER_MAX_QUEUE = int(os.getenv('RECORD_WRITER_MAX_QUEUE', '10000'))
     
     # Camera configuration
     CAMERA_INDEX = int(os.getenv('CAMERA_INDEX', '-1'))  # -1 for auto-detection, 0,1,2,etc for specific camera
     CAMERA_MIRROR = os.getenv('CAMERA_MIRROR', 'true').lower() == 'true'  # Enable/disable camera mirroring
+    CAMERA_PROBE_COUNT = int(os.getenv('CAMERA_PROBE_COUNT', '5'))  # Number of device indices probed during auto-detection
+    CAMERA_SOURCE = os.getenv('CAMERA_SOURCE', '')  # Video file or image directory to stream instead of a camera (demos, testing)
+    CAMERA_SOURCE_LOOP = os.getenv('CAMERA_SOURCE_LOOP', 'true').lower() == 'true'  # Restart CAMERA_SOURCE when it ends
+    
+    # Preview stream encoding: default preset ('low', 'medium', 'high', 'max'; viewers can pick their own
+    # in settings or override ?preset=/quality=/width=/fps= on /video_feed) and JPEG encoder
+    # ('auto' uses simplejpeg or PyTurboJPEG when installed, else OpenCV)
+    STREAM_PRESET = os.getenv('STREAM_PRESET', 'medium').lower()
+    STREAM_ENCODER = os.getenv('STREAM_ENCODER', 'auto').lower()
+    
+    # Browser frame upload (/ingest-frame) for hosted deployments without a server camera: the dashboard
+    # sends INGEST_WIDTH-wide JPEG/WebP frames at up to INGEST_FPS; frames arriving while inference is busy
+    # (per user, or INGEST_MAX_CONCURRENT in flight overall) are dropped rather than queued
+    INGEST_FPS = float(os.getenv('INGEST_FPS', '5'))
+    INGEST_WIDTH = int(os.getenv('INGEST_WIDTH', '480'))
+    INGEST_QUALITY = float(os.getenv('INGEST_QUALITY', '0.7'))
+    INGEST_FORMAT = os.getenv('INGEST_FORMAT', 'image/jpeg')
+    INGEST_MAX_CONCURRENT = int(os.getenv('INGEST_MAX_CONCURRENT', '2'))
+    INGEST_MAX_BYTES = int(os.getenv('INGEST_MAX_BYTES', str(1024 * 1024)))
+    
+    # Live posture events (SSE): heartbeat interval and minimum confidence change worth pushing
+    POSTURE_EVENT_HEARTBEAT = float(os.getenv('POSTURE_EVENT_HEARTBEAT', '15'))
+    POSTURE_EVENT_MIN_DELTA = float(os.getenv('POSTURE_EVENT_MIN_DELTA', '0.05'))
+    
+    # Posture smoothing: readings feed an EMA (time constant POSTURE_SMOOTHING_TAU seconds) of the share
+    # of bad readings; the state turns bad at POSTURE_BAD_ENTER, back to good at POSTURE_BAD_EXIT, and a
+    # change must hold for POSTURE_MIN_DWELL seconds before alarms/events fire. Set tau and dwell to 0 for raw readings
+    POSTURE_SMOOTHING_TAU = float(os.getenv('POSTURE_SMOOTHING_TAU', '1.0'))
+    POSTURE_BAD_ENTER = float(os.getenv('POSTURE_BAD_ENTER', '0.6'))
+    POSTURE_BAD_EXIT = float(os.getenv('POSTURE_BAD_EXIT', '0.4'))
+    POSTURE_MIN_DWELL = float(os.getenv('POSTURE_MIN_DWELL', '2.0'))
+    POSTURE_UNKNOWN_AFTER = float(os.getenv('POSTURE_UNKNOWN_AFTER', '2.0'))  # Seconds without a person before 'unknown'
+    POSTURE_STATE_REFRESH = float(os.getenv('POSTURE_STATE_REFRESH', '1.0'))  # Seconds between rewrites of an unchanged state
+    
+    # Inference worker processes: 0 runs the models in the web process; N > 0 starts N workers that
+    # each load the models, receive frames through shared memory and keep each stream on one worker
+    INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', '0'))
+    INFERENCE_WORKER_TIMEOUT = float(os.getenv('INFERENCE_WORKER_TIMEOUT', '10'))  # Seconds before a hung worker is replaced
+    INFERENCE_START_METHOD = os.getenv('INFERENCE_START_METHOD', 'spawn')
+    
+    # Inference cadence: 'every' frame, every 'nth' frame, fixed 'hz', or 'adaptive' (backs off
+    # from INFERENCE_MAX_HZ towards INFERENCE_MIN_HZ while posture is stable); other frames reuse the last result
+    INFERENCE_MODE = os.getenv('INFERENCE_MODE', 'adaptive').lower()
+    INFERENCE_EVERY_N = int(os.getenv('INFERENCE_EVERY_N', '3'))
+    INFERENCE_MAX_HZ = float(os.getenv('INFERENCE_MAX_HZ', '10'))
+    INFERENCE_MIN_HZ = float(os.getenv('INFERENCE_MIN_HZ', '2'))
+    
+    # Model input sizes: frames are resized once before inference. MediaPipe gets at most
+    # POSE_INPUT_WIDTH pixels wide (0 = full resolution); the classifier was trained at 224
+    POSE_INPUT_WIDTH = int(os.getenv('POSE_INPUT_WIDTH', '480'))
+    CLASSIFIER_INPUT_SIZE = int(os.getenv('CLASSIFIER_INPUT_SIZE', '224'))
+    
+    # Posture classifier backend: 'auto' prefers an ONNX, then OpenVINO export of the trained weights
+    # (see Training Again/export_classifier.py) and falls back to PyTorch; or force 'pytorch', 'onnx', 'openvino'
+    CLASSIFIER_BACKEND = os.getenv('CLASSIFIER_BACKEND', 'auto').lower()
+    CLASSIFIER_THREADS = int(os.getenv('CLASSIFIER_THREADS', '0'))  # 0 lets the runtime decide
+    # 'int8' selects the quantized export (Training Again/quantize_classifier.py) when present
+    CLASSIFIER_PRECISION = os.getenv('CLASSIFIER_PRECISION', 'fp32').lower()
+    
+    # Person tracking (detector path): crop around the last landmarks and only run YOLO every
+    # TRACKER_REDETECT_PASSES inference passes or when the person is lost
+    PERSON_TRACKING = os.getenv('PERSON_TRACKING', 'true').lower() == 'true'
+    TRACKER_REDETECT_PASSES = int(os.getenv('TRACKER_REDETECT_PASSES', '15'))
+    TRACKER_PADDING = float(os.getenv('TRACKER_PADDING', '0.2'))  # Fraction of the landmark box added on each side
+    
+    # MediaPipe pose model complexity: 'auto' benchmarks 0/1/2 on live frames and keeps the highest
+    # that fits POSE_LATENCY_BUDGET_MS per frame, adjusting at runtime; or pin it with 0, 1 or 2
+    POSE_MODEL_COMPLEXITY = os.getenv('POSE_MODEL_COMPLEXITY', 'auto').lower()
+    POSE_LATENCY_BUDGET_MS = float(os.getenv('POSE_LATENCY_BUDGET_MS', '50'))
+    
+    # Per-user live posture state: 'memory' (this process only) or 'redis' (shared between workers)
+    POSTURE_STATE_BACKEND = os.getenv('POSTURE_STATE_BACKEND', 'memory').lower()
+    POSTURE_STATE_REDIS_URL = os.getenv('POSTURE_STATE_REDIS_URL', 'redis://localhost:6379/0')
+    
+    # Model loading: 'background' starts loading YOLO/MediaPipe on a worker thread at startup,
+    # 'lazy' defers it until the first video stream (useful for admin-only workers and debug reloads)
+    MODEL_LOAD_MODE = os.getenv('MODEL_LOAD_MODE', 'background').lower()
     
     # Other configurations can be added here 
     
@@ -1,35 +1,110 @@
-import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
+from mysql.connector.errors import PoolError, OperationalError, InterfaceError
 from config import Config
 import bcrypt
 import logging
 import time
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from functools import wraps
+from metrics import db_latency
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class DatabaseUnavailable(Error):
+    """Raised when no pooled connection could be checked out."""
+
+_pool = None
+_pool_lock = threading.Lock()
+_checkout_timeouts = 0  # checkouts that gave up waiting for a free pooled connection
+
+def _timed(func):
+    """Record each call's duration in the db_latency histogram under the function name."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with db_latency.time(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def _get_pool():
+    """Create the shared connection pool on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name='posturease',
+                    pool_size=Config.MYSQL_POOL_SIZE,
+                    pool_reset_session=True,
+                    host=Config.MYSQL_HOST,
+                    user=Config.MYSQL_USER,
+                    password=Config.MYSQL_PASSWORD,
+                    database=Config.MYSQL_DB,
+                    auth_plugin='mysql_native_password',
+                    connect_timeout=10,
+                    use_pure=True
+                )
+                logger.info(f"Created MySQL connection pool (size={Config.MYSQL_POOL_SIZE})")
+    return _pool
+
+def _checkout(timeout):
+    """Take a connection from the pool, waiting up to timeout seconds for a free slot."""
+    global _checkout_timeouts
+    pool = _get_pool()
+    started = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            conn = pool.get_connection()
+            break
+        except PoolError:
+            # Pool exhausted; mysql-connector doesn't block, so poll briefly
+            if time.monotonic() >= deadline:
+                _checkout_timeouts += 1
+                raise
+            time.sleep(0.05)
+    db_latency.observe('pool_checkout', time.perf_counter() - started)
+    # Health-check on checkout: pooled sockets can be dropped by the server
+    # (wait_timeout, restarts), so ping and transparently reconnect once
+    try:
+        conn.ping(reconnect=True, attempts=1, delay=0)
+    except Error:
+        conn.close()
+        raise
+    return conn
+
+def pool_stats():
+    """Size, idle/in-use connections and checkout timeouts of the shared pool."""
+    pool = _pool
+    if pool is None:
+        return {'size': Config.MYSQL_POOL_SIZE, 'idle': 0, 'in_use': 0, 'created': False,
+                'checkout_timeouts': _checkout_timeouts}
+    # mysql-connector keeps idle connections in _cnx_queue; there is no public accessor
+    idle = pool._cnx_queue.qsize()
+    return {
+        'size': pool.pool_size,
+        'idle': idle,
+        'in_use': pool.pool_size - idle,
+        'created': True,
+        'checkout_timeouts': _checkout_timeouts
+    }
+
 def get_db_connection(max_retries=3, retry_delay=1):
     """
-    Attempt to establish a database connection with retries
+    Check out a pooled database connection, with retries.
+
+    Calling close() on the returned connection hands it back to the pool.
+    Prefer the db_connection()/db_cursor() context managers, which do that
+    automatically.
     """
     for attempt in range(max_retries):
         try:
-            connection = mysql.connector.connect(
-                host=Config.MYSQL_HOST,
-                user=Config.MYSQL_USER,
-                password=Config.MYSQL_PASSWORD,
-                database=Config.MYSQL_DB,
-                auth_plugin='mysql_native_password',
-                connect_timeout=10,
-                use_pure=True
-            )
-            if connection.is_connected():
-                logger.info("Successfully connected to MySQL database")
-                return connection
+            return _checkout(Config.MYSQL_POOL_TIMEOUT)
         except Error as e:
-            logger.error(f"Attempt {attempt + 1}/{max_retries} failed to connect to MySQL: {e}")
+            logger.error(f"Attempt {attempt + 1}/{max_retries} failed to get MySQL connection: {e}")
             if attempt < max_retries - 1:
                 time.sleep(retry_delay)
             else:
@@ -37,544 +112,587 @@ def get_db_connection(max_retries=3, retry_delay=1):
                 return None
     return None
 
+@contextmanager
+def db_connection():
+    """
+    Context manager yielding a pooled connection.
+
+    Uncommitted work is rolled back on error and the connection is always
+    returned to the pool. Raises DatabaseUnavailable if none can be obtained.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        db_health.mark_unhealthy("no connection available")
+        raise DatabaseUnavailable("Database connection failed")
+    db_health.mark_healthy()
+    try:
+        yield conn
+    except Exception as e:
+        # Lost connections fail fast for everyone instead of waiting for the next probe
+        if isinstance(e, (OperationalError, InterfaceError)):
+            db_health.mark_unhealthy(e)
+        try:
+            conn.rollback()
+        except Error:
+            pass
+        raise
+    finally:
+        conn.close()
+
+@contextmanager
+def db_cursor(dictionary=False):
+    """
+    Context manager yielding (connection, cursor) from the pool.
+
+    Cursors are buffered so a partially-read result never blocks the
+    connection from being reset and reused.
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=dictionary, buffered=True)
+        try:
+            yield conn, cursor
+        finally:
+            cursor.close()
+
+class DatabaseHealthMonitor:
+    """
+    Background database health check.
+
+    A daemon thread probes the pool every `interval` seconds (more often
+    while the database is down) and keeps a shared flag that request
+    handlers can read for free. Real query failures flip the flag
+    immediately rather than waiting for the next probe.
+    """
+
+    def __init__(self, interval=10.0):
+        self.interval = interval
+        self._wake = threading.Event()
+        self._thread = None
+        self.healthy = None  # None until the first probe completes
+        self.last_check = None
+        self.last_error = None
+
+    @property
+    def is_healthy(self):
+        # Unknown counts as healthy so startup never blocks on the first probe
+        return self.healthy is not False
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="db-health", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self.check_now()
+            delay = self.interval if self.healthy else max(1.0, self.interval / 5)
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def check_now(self):
+        """Probe the database once and update the flag."""
+        try:
+            conn = _checkout(Config.MYSQL_POOL_TIMEOUT)
+            conn.close()
+            self.mark_healthy()
+        except Exception as e:
+            self.mark_unhealthy(e)
+        self.last_check = time.time()
+        return self.healthy
+
+    def mark_healthy(self):
+        if self.healthy is not True:
+            logger.info("Database connection healthy")
+        self.healthy = True
+        self.last_error = None
+
+    def mark_unhealthy(self, error):
+        if self.healthy is not False:
+            logger.error(f"Database marked unhealthy: {error}")
+            # Recheck soon so recovery is picked up quickly
+            self._wake.set()
+        self.healthy = False
+        self.last_error = str(error)
+
+    def status(self):
+        return {
+            'healthy': self.healthy,
+            'last_check': self.last_check,
+            'last_error': self.last_error
+        }
+
+
+db_health = DatabaseHealthMonitor(interval=Config.DB_HEALTH_CHECK_INTERVAL)
+
+@_timed
 def test_connection():
     """
     Test the database connection and return True if successful
     """
     try:
-        conn = get_db_connection()
-        if conn and conn.is_connected():
-            conn.close()
-            return True
-        return False
+        with db_cursor() as (conn, cursor):
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        return True
     except Exception as e:
         logger.error(f"Error testing database connection: {e}")
         return False
 
+@_timed
 def create_user(username, email, password, first_name, last_name, birth_date, gender):
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor()
-        
-        # Check if username or email already exists
-        cursor.execute("SELECT username, email FROM users WHERE username = %s OR email = %s", (username, email))
-        existing_user = cursor.fetchone()
-        
-        if existing_user:
-            if existing_user[0] == username:
-                return False, "Username already exists"
-            else:
-                return False, "Email already registered"
-        
-        # Hash the password and store as UTF-8 string for portability
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-        
-        # Insert user with email verification fields
-        cursor.execute("""
-            INSERT INTO users (username, email, password, first_name, last_name, birth_date, gender, email_verified, verification_token, token_expires)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (username, email, hashed_password, first_name, last_name, birth_date, gender, False, None, None))
-        
-        conn.commit()
-        user_id = cursor.lastrowid
-        
-        cursor.close()
-        conn.close()
-        
-        return True, user_id
+        with db_cursor() as (conn, cursor):
+            # Check if username or email already exists
+            cursor.execute("SELECT username, email FROM users WHERE username = %s OR email = %s", (username, email))
+            existing_user = cursor.fetchone()
+            
+            if existing_user:
+                if existing_user[0] == username:
+                    return False, "Username already exists"
+                else:
+                    return False, "Email already registered"
+            
+            # Hash the password and store as UTF-8 string for portability
+            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            
+            # Insert user with email verification fields
+            cursor.execute("""
+                INSERT INTO users (username, email, password, first_name, last_name, birth_date, gender, email_verified, verification_token, token_expires)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (username, email, hashed_password, first_name, last_name, birth_date, gender, False, None, None))
+            
+            conn.commit()
+            user_id = cursor.lastrowid
+            
+            return True, user_id
     except Error as e:
         logger.error(f"Error creating user: {e}")
         return False, str(e)
 
+@_timed
 def verify_user(username, password):
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor(dictionary=True)
-        
-        # Get user
-        cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-        user = cursor.fetchone()
-        
-        if user:
-            stored_hash = user.get('password')
-            # Ensure we have bytes for bcrypt
-            if isinstance(stored_hash, str):
-                stored_hash_bytes = stored_hash.encode('utf-8')
-            else:
-                stored_hash_bytes = stored_hash
-            if stored_hash_bytes and bcrypt.checkpw(password.encode('utf-8'), stored_hash_bytes):
-                # Remove password from user data
-                user.pop('password', None)
-                cursor.close()
-                conn.close()
-                return True, user
-        
-        cursor.close()
-        conn.close()
-        
-        return False, "Invalid username or password"
+        with db_cursor(dictionary=True) as (conn, cursor):
+            # Get user
+            cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
+            user = cursor.fetchone()
+            
+            if user:
+                stored_hash = user.get('password')
+                # Ensure we have bytes for bcrypt
+                if isinstance(stored_hash, str):
+                    stored_hash_bytes = stored_hash.encode('utf-8')
+                else:
+                    stored_hash_bytes = stored_hash
+                if stored_hash_bytes and bcrypt.checkpw(password.encode('utf-8'), stored_hash_bytes):
+                    # Remove password from user data
+                    user.pop('password', None)
+                    return True, user
+            
+            return False, "Invalid username or password"
     except Error as e:
         logger.error(f"Error verifying user: {e}")
         return False, str(e)
 
+@_timed
 def save_posture_record(user_id, posture_type, confidence_score, session_duration=None, corrections_count=None, good_time=None, bad_time=None):
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO posture_records (user_id, posture_type, confidence_score, session_duration, corrections_count, good_time, bad_time)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (user_id, posture_type, confidence_score, session_duration, corrections_count, good_time, bad_time))
-        
-        conn.commit()
-        record_id = cursor.lastrowid
-        
-        cursor.close()
-        conn.close()
-        
-        return True, record_id
+        with db_cursor() as (conn, cursor):
+            cursor.execute("""
+                INSERT INTO posture_records (user_id, posture_type, confidence_score, session_duration, corrections_count, good_time, bad_time)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, (user_id, posture_type, confidence_score, session_duration, corrections_count, good_time, bad_time))
+            
+            conn.commit()
+            record_id = cursor.lastrowid
+            
+            return True, record_id
     except Error as e:
         logger.error(f"Error saving posture record: {e}")
         return False, str(e)
 
+# Columns written by save_posture_record() and save_posture_records(), after user_id
+POSTURE_RECORD_FIELDS = ('posture_type', 'confidence_score', 'session_duration', 'corrections_count', 'good_time', 'bad_time')
+
+@_timed
+def save_posture_records(records):
+    """
+    Insert many posture records with one multi-row INSERT and a single commit.
+
+    records is a list of (user_id, fields) where fields holds the
+    save_posture_record() keyword arguments. Returns (success, rows inserted).
+    """
+    if not records:
+        return True, 0
+    try:
+        with db_cursor() as (conn, cursor):
+            row = '(' + ', '.join(['%s'] * (len(POSTURE_RECORD_FIELDS) + 1)) + ')'
+            values = []
+            for user_id, fields in records:
+                values.append(user_id)
+                values.extend(fields.get(name) for name in POSTURE_RECORD_FIELDS)
+            cursor.execute(
+                f"INSERT INTO posture_records (user_id, {', '.join(POSTURE_RECORD_FIELDS)}) "
+                f"VALUES {', '.join([row] * len(records))}",
+                values
+            )
+            conn.commit()
+            return True, cursor.rowcount
+    except Error as e:
+        logger.error(f"Error saving {len(records)} posture records: {e}")
+        return False, str(e)
+
+@_timed
 def get_user_posture_history(user_id, limit=100):
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT * FROM posture_records 
-            WHERE user_id = %s 
-            ORDER BY recorded_at DESC 
-            LIMIT %s
-        """, (user_id, limit))
-        
-        records = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        return True, records
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("""
+                SELECT * FROM posture_records 
+                WHERE user_id = %s 
+                ORDER BY recorded_at DESC 
+                LIMIT %s
+            """, (user_id, limit))
+            
+            records = cursor.fetchall()
+            
+            return True, records
     except Error as e:
         logger.error(f"Error getting posture history: {e}")
         return False, str(e)
 
+@_timed
 def clear_user_posture_history(user_id):
     """Delete all posture records for a given user and return number deleted"""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM posture_records WHERE user_id = %s", (user_id,))
-        deleted_count = cursor.rowcount
-        conn.commit()
-
-        cursor.close()
-        conn.close()
-
-        return True, deleted_count
+        with db_cursor() as (conn, cursor):
+            cursor.execute("DELETE FROM posture_records WHERE user_id = %s", (user_id,))
+            deleted_count = cursor.rowcount
+            conn.commit()
+            
+            return True, deleted_count
     except Error as e:
         logger.error(f"Error clearing posture history: {e}")
         return False, str(e)
 
+@_timed
 def delete_posture_record(record_id, user_id):
     """Delete a specific posture record for a given user"""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM posture_records WHERE id = %s AND user_id = %s", (record_id, user_id))
-        deleted_count = cursor.rowcount
-        conn.commit()
-
-        cursor.close()
-        conn.close()
-
-        if deleted_count > 0:
-            return True, "Record deleted successfully"
-        else:
-            return False, "Record not found or access denied"
+        with db_cursor() as (conn, cursor):
+            cursor.execute("DELETE FROM posture_records WHERE id = %s AND user_id = %s", (record_id, user_id))
+            deleted_count = cursor.rowcount
+            conn.commit()
+            
+            if deleted_count > 0:
+                return True, "Record deleted successfully"
+            else:
+                return False, "Record not found or access denied"
     except Error as e:
         logger.error(f"Error deleting posture record: {e}")
         return False, str(e)
 
+@_timed
 def get_exercises():
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute("SELECT * FROM exercises")
-        exercises = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        return True, exercises
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("SELECT * FROM exercises")
+            exercises = cursor.fetchall()
+            
+            return True, exercises
     except Error as e:
         logger.error(f"Error getting exercises: {e}")
         return False, str(e)
 
+@_timed
 def record_completed_exercise(user_id, exercise_id):
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO user_exercises (user_id, exercise_id)
-            VALUES (%s, %s)
-        """, (user_id, exercise_id))
-        
-        conn.commit()
-        record_id = cursor.lastrowid
-        
-        cursor.close()
-        conn.close()
-        
-        return True, record_id
+        with db_cursor() as (conn, cursor):
+            cursor.execute("""
+                INSERT INTO user_exercises (user_id, exercise_id)
+                VALUES (%s, %s)
+            """, (user_id, exercise_id))
+            
+            conn.commit()
+            record_id = cursor.lastrowid
+            
+            return True, record_id
     except Error as e:
         logger.error(f"Error recording completed exercise: {e}")
         return False, str(e)
 
+@_timed
 def update_user(user_id, username, email, first_name, last_name, birth_date, gender):
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor(dictionary=True)
-        # Check if the new username or email is already taken by another user
-        cursor.execute("SELECT id FROM users WHERE (username = %s OR email = %s) AND id != %s", (username, email, user_id))
-        existing = cursor.fetchone()
-        if existing:
-            return False, "Username or email already taken by another user"
-
-        # Update user info
-        cursor.execute("""
-            UPDATE users SET username=%s, email=%s, first_name=%s, last_name=%s, birth_date=%s, gender=%s, updated_at=NOW()
-            WHERE id=%s
-        """, (username, email, first_name, last_name, birth_date, gender, user_id))
-        conn.commit()
-
-        # Fetch updated user info
-        cursor.execute("SELECT id, username, email, first_name, last_name, birth_date, gender FROM users WHERE id=%s", (user_id,))
-        user = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return True, user
+        with db_cursor(dictionary=True) as (conn, cursor):
+            # Check if the new username or email is already taken by another user
+            cursor.execute("SELECT id FROM users WHERE (username = %s OR email = %s) AND id != %s", (username, email, user_id))
+            existing = cursor.fetchone()
+            if existing:
+                return False, "Username or email already taken by another user"
+            
+            # Update user info
+            cursor.execute("""
+                UPDATE users SET username=%s, email=%s, first_name=%s, last_name=%s, birth_date=%s, gender=%s, updated_at=NOW()
+                WHERE id=%s
+            """, (username, email, first_name, last_name, birth_date, gender, user_id))
+            conn.commit()
+            
+            # Fetch updated user info
+            cursor.execute("SELECT id, username, email, first_name, last_name, birth_date, gender FROM users WHERE id=%s", (user_id,))
+            user = cursor.fetchone()
+            return True, user
     except Error as e:
         logger.error(f"Error updating user: {e}")
         return False, str(e)
 
+@_timed
 def get_all_users():
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT id, username, email, first_name, last_name, 
-                   birth_date, gender, created_at, updated_at
-            FROM users
-            WHERE username != 'admin'
-            ORDER BY created_at DESC
-        """)
-        
-        users = cursor.fetchall()
-        
-        # Add default status for users (since status column doesn't exist yet)
-        for user in users:
-            user['status'] = True  # Default to active
-        
-        cursor.close()
-        conn.close()
-        
-        return True, users
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("""
+                SELECT id, username, email, first_name, last_name, 
+                       birth_date, gender, created_at, updated_at
+                FROM users
+                WHERE username != 'admin'
+                ORDER BY created_at DESC
+            """)
+            
+            users = cursor.fetchall()
+            
+            # Add default status for users (since status column doesn't exist yet)
+            for user in users:
+                user['status'] = True  # Default to active
+            
+            return True, users
     except Error as e:
         logger.error(f"Error getting users: {e}")
         return False, str(e)
 
+@_timed
 def delete_user(user_id):
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor()
-        
-        # First delete related records (including face embeddings, guarded if table missing)
-        cursor.execute("DELETE FROM posture_records WHERE user_id = %s", (user_id,))
-        cursor.execute("DELETE FROM user_exercises WHERE user_id = %s", (user_id,))
-        try:
-            cursor.execute("DELETE FROM user_face_embeddings WHERE user_id = %s", (user_id,))
-        except Error as e:
-            # If table does not exist, ignore; otherwise re-raise
-            if getattr(e, 'errno', None) in (1146,):  # ER_NO_SUCH_TABLE
-                logger.warning("user_face_embeddings table missing; skipping delete")
-            else:
-                raise
-        
-        # Then delete the user
-        cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
-        
-        conn.commit()
-        
-        cursor.close()
-        conn.close()
-        
-        return True, "User deleted successfully"
+        with db_cursor() as (conn, cursor):
+            # First delete related records (including face embeddings, guarded if table missing)
+            cursor.execute("DELETE FROM posture_records WHERE user_id = %s", (user_id,))
+            cursor.execute("DELETE FROM user_exercises WHERE user_id = %s", (user_id,))
+            try:
+                cursor.execute("DELETE FROM user_face_embeddings WHERE user_id = %s", (user_id,))
+            except Error as e:
+                # If table does not exist, ignore; otherwise re-raise
+                if getattr(e, 'errno', None) in (1146,):  # ER_NO_SUCH_TABLE
+                    logger.warning("user_face_embeddings table missing; skipping delete")
+                else:
+                    raise
+            
+            # Then delete the user
+            cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+            
+            conn.commit()
+            
+            return True, "User deleted successfully"
     except Error as e:
         logger.error(f"Error deleting user: {e}")
         return False, str(e)
 
+@_timed
 def toggle_user_status(user_id, status):
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor()
-        
-        # Check if status column exists
-        cursor.execute("""
-            SELECT COLUMN_NAME 
-            FROM INFORMATION_SCHEMA.COLUMNS 
-            WHERE TABLE_SCHEMA = DATABASE() 
-            AND TABLE_NAME = 'users' 
-            AND COLUMN_NAME = 'status'
-        """)
-        
-        status_column_exists = cursor.fetchone()
-        
-        if status_column_exists:
-            cursor.execute("""
-                UPDATE users 
-                SET status = %s, updated_at = NOW()
-                WHERE id = %s
-            """, (status, user_id))
-        else:
-            # Status column doesn't exist, just update the timestamp
+        with db_cursor() as (conn, cursor):
+            # Check if status column exists
             cursor.execute("""
-                UPDATE users 
-                SET updated_at = NOW()
-                WHERE id = %s
-            """, (user_id,))
-        
-        conn.commit()
-        
-        cursor.close()
-        conn.close()
-        
-        return True, "User status updated successfully"
+                SELECT COLUMN_NAME 
+                FROM INFORMATION_SCHEMA.COLUMNS 
+                WHERE TABLE_SCHEMA = DATABASE() 
+                AND TABLE_NAME = 'users' 
+                AND COLUMN_NAME = 'status'
+            """)
+            
+            status_column_exists = cursor.fetchone()
+            
+            if status_column_exists:
+                cursor.execute("""
+                    UPDATE users 
+                    SET status = %s, updated_at = NOW()
+                    WHERE id = %s
+                """, (status, user_id))
+            else:
+                # Status column doesn't exist, just update the timestamp
+                cursor.execute("""
+                    UPDATE users 
+                    SET updated_at = NOW()
+                    WHERE id = %s
+                """, (user_id,))
+            
+            conn.commit()
+            
+            return True, "User status updated successfully"
     except Error as e:
         logger.error(f"Error updating user status: {e}")
         return False, str(e)
 
+@_timed
 def admin_create_user(username, email, password, first_name, last_name, birth_date, gender):
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor()
-        
-        # Check if username or email already exists
-        cursor.execute("SELECT username, email FROM users WHERE username = %s OR email = %s", (username, email))
-        existing_user = cursor.fetchone()
-        
-        if existing_user:
-            if existing_user[0] == username:
-                return False, "Username already exists"
-            else:
-                return False, "Email already registered"
-        
-        # Hash the password
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-        
-        # Insert user (without status column since it doesn't exist yet)
-        cursor.execute("""
-            INSERT INTO users (username, email, password, first_name, last_name, birth_date, gender)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (username, email, hashed_password, first_name, last_name, birth_date, gender))
-        
-        conn.commit()
-        user_id = cursor.lastrowid
-        
-        cursor.close()
-        conn.close()
-        
-        return True, user_id
+        with db_cursor() as (conn, cursor):
+            # Check if username or email already exists
+            cursor.execute("SELECT username, email FROM users WHERE username = %s OR email = %s", (username, email))
+            existing_user = cursor.fetchone()
+            
+            if existing_user:
+                if existing_user[0] == username:
+                    return False, "Username already exists"
+                else:
+                    return False, "Email already registered"
+            
+            # Hash the password
+            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+            
+            # Insert user (without status column since it doesn't exist yet)
+            cursor.execute("""
+                INSERT INTO users (username, email, password, first_name, last_name, birth_date, gender)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, (username, email, hashed_password, first_name, last_name, birth_date, gender))
+            
+            conn.commit()
+            user_id = cursor.lastrowid
+            
+            return True, user_id
     except Error as e:
         logger.error(f"Error creating user: {e}")
         return False, str(e) 
 
+@_timed
 def save_verification_token(user_id, token, expires_at, token_type="registration"):
     """Save verification token for email verification or password change"""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor()
-        
-        if token_type == "registration":
-            cursor.execute("""
-                UPDATE users SET verification_token = %s, token_expires = %s 
-                WHERE id = %s
-            """, (token, expires_at, user_id))
-        else:  # password change
-            cursor.execute("""
-                UPDATE users SET password_change_token = %s, password_token_expires = %s 
-                WHERE id = %s
-            """, (token, expires_at, user_id))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        return True, "Token saved successfully"
+        with db_cursor() as (conn, cursor):
+            if token_type == "registration":
+                cursor.execute("""
+                    UPDATE users SET verification_token = %s, token_expires = %s 
+                    WHERE id = %s
+                """, (token, expires_at, user_id))
+            else:  # password change
+                cursor.execute("""
+                    UPDATE users SET password_change_token = %s, password_token_expires = %s 
+                    WHERE id = %s
+                """, (token, expires_at, user_id))
+            
+            conn.commit()
+            
+            return True, "Token saved successfully"
     except Error as e:
         logger.error(f"Error saving verification token: {e}")
         return False, str(e)
 
+@_timed
 def verify_email_token(token):
     """Verify email verification token"""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT id, username, email, token_expires 
-            FROM users 
-            WHERE verification_token = %s
-        """, (token,))
-        
-        user = cursor.fetchone()
-        
-        if not user:
-            return False, "Invalid verification token"
-        
-        # Check if token is expired
-        if user['token_expires'] and user['token_expires'] < datetime.now():
-            return False, "Verification token has expired"
-        
-        # Mark email as verified
-        cursor.execute("""
-            UPDATE users 
-            SET email_verified = TRUE, verification_token = NULL, token_expires = NULL 
-            WHERE id = %s
-        """, (user['id'],))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        return True, user
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("""
+                SELECT id, username, email, token_expires 
+                FROM users 
+                WHERE verification_token = %s
+            """, (token,))
+            
+            user = cursor.fetchone()
+            
+            if not user:
+                return False, "Invalid verification token"
+            
+            # Check if token is expired
+            if user['token_expires'] and user['token_expires'] < datetime.now():
+                return False, "Verification token has expired"
+            
+            # Mark email as verified
+            cursor.execute("""
+                UPDATE users 
+                SET email_verified = TRUE, verification_token = NULL, token_expires = NULL 
+                WHERE id = %s
+            """, (user['id'],))
+            
+            conn.commit()
+            
+            return True, user
     except Error as e:
         logger.error(f"Error verifying email token: {e}")
         return False, str(e)
 
+@_timed
 def verify_password_change_token(token):
     """Verify password change token"""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT id, username, email, password_change_token, password_token_expires 
-            FROM users 
-            WHERE password_change_token = %s
-        """, (token,))
-        
-        user = cursor.fetchone()
-        
-        if not user:
-            return False, "Invalid password change token"
-        
-        # Check if token is expired
-        if user['password_token_expires'] and user['password_token_expires'] < datetime.now():
-            return False, "Password change token has expired"
-        
-        return True, user
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("""
+                SELECT id, username, email, password_change_token, password_token_expires 
+                FROM users 
+                WHERE password_change_token = %s
+            """, (token,))
+            
+            user = cursor.fetchone()
+            
+            if not user:
+                return False, "Invalid password change token"
+            
+            # Check if token is expired
+            if user['password_token_expires'] and user['password_token_expires'] < datetime.now():
+                return False, "Password change token has expired"
+            
+            return True, user
     except Error as e:
         logger.error(f"Error verifying password change token: {e}")
         return False, str(e)
 
+@_timed
 def clear_password_change_token(user_id):
     """Clear password change token after successful password change"""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE users 
-            SET password_change_token = NULL, password_token_expires = NULL 
-            WHERE id = %s
-        """, (user_id,))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        return True, "Token cleared successfully"
+        with db_cursor() as (conn, cursor):
+            cursor.execute("""
+                UPDATE users 
+                SET password_change_token = NULL, password_token_expires = NULL 
+                WHERE id = %s
+            """, (user_id,))
+            
+            conn.commit()
+            
+            return True, "Token cleared successfully"
     except Error as e:
         logger.error(f"Error clearing password change token: {e}")
         return False, str(e)
 
+@_timed
+def save_stream_settings(user_id, stream_mode=None, stream_preset=None):
+    """Store a user's preview mode and stream quality; None leaves a setting unchanged"""
+    try:
+        with db_cursor() as (conn, cursor):
+            cursor.execute("""
+                UPDATE users
+                SET stream_mode = COALESCE(%s, stream_mode), stream_preset = COALESCE(%s, stream_preset)
+                WHERE id = %s
+            """, (stream_mode, stream_preset, user_id))
+            conn.commit()
+            
+            return True, "Stream settings saved"
+    except Error as e:
+        logger.error(f"Error saving stream settings: {e}")
+        return False, str(e)
+
+@_timed
 def get_user_by_email(email):
     """Get user by email address"""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
-        user = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
-        
-        if user:
-            # Remove password from user data
-            user.pop('password', None)
-            return True, user
-        
-        return False, "User not found"
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
+            user = cursor.fetchone()
+            
+            if user:
+                # Remove password from user data
+                user.pop('password', None)
+                return True, user
+            
+            return False, "User not found"
     except Error as e:
         logger.error(f"Error getting user by email: {e}")
         return False, str(e) 
\ No newline at end of file
@@ -0,0 +1,121 @@
+import threading
+import time
+import logging
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class FrameIngest:
+    """
+    Posture analysis for frames uploaded by the browser instead of read from
+    a server-side camera.
+
+    Each user gets their own process_frame() state (cadence, tracker,
+    preprocessor buffers, session stats), created with make_state() on their
+    first frame and dropped after session_timeout seconds without one.
+    Frames are never queued: if the user's previous frame is still being
+    analysed, or max_concurrent frames are already in flight across all
+    users, the new frame is dropped and the caller gets the last result
+    back. The suggested upload interval grows with the measured processing
+    time, so clients slow down instead of piling up requests.
+    """
+
+    def __init__(self, process_frame, make_state, max_concurrent=2, session_timeout=60.0, min_interval=0.2):
+        self.process_frame = process_frame
+        self.make_state = make_state
+        self.session_timeout = session_timeout
+        self.min_interval = min_interval
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrent))
+        self._lock = threading.Lock()
+        self._sessions = {}  # user_id -> per-user state
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.frames_invalid = 0
+
+    def _session(self, user_id, now):
+        with self._lock:
+            # Forget users who stopped uploading
+            for stale in [uid for uid, s in self._sessions.items() if now - s['last_seen'] > self.session_timeout]:
+                del self._sessions[stale]
+            session = self._sessions.get(user_id)
+            if session is None:
+                session = self._sessions[user_id] = {
+                    'state': self.make_state(),
+                    'lock': threading.Lock(),
+                    'result': None,
+                    'process_ms': None
+                }
+            session['last_seen'] = now
+            self.frames_received += 1
+            return session
+
+    def _interval_ms(self, session):
+        # Leave headroom over the measured per-frame cost
+        process_ms = session['process_ms'] or 0.0
+        return round(max(self.min_interval * 1000.0, 1.5 * process_ms))
+
+    def submit(self, user_id, data):
+        """
+        Decode and analyse one uploaded JPEG/WebP frame for user_id.
+
+        Returns (processed, result): processed is False when the frame was
+        dropped for backpressure (result then holds the previous reading) or
+        could not be decoded (result has an 'error').
+        """
+        session = self._session(user_id, time.monotonic())
+
+        if not session['lock'].acquire(blocking=False):
+            return self._dropped(session)
+        try:
+            if not self._slots.acquire(blocking=False):
+                return self._dropped(session)
+            try:
+                started = time.perf_counter()
+                frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    with self._lock:
+                        self.frames_invalid += 1
+                    return False, {'error': 'Could not decode frame', 'interval_ms': self._interval_ms(session)}
+
+                state = session['state']
+                state['user_ids'] = [user_id]
+                state['render'] = False
+                state['pose_listeners'] = True
+                self.process_frame(frame, state)
+                pose = state.pop('pose_update', None)
+
+                elapsed_ms = (time.perf_counter() - started) * 1000.0
+                if state.get('timings') is not None:
+                    state['timings'].record('process', elapsed_ms)
+                previous = session['process_ms']
+                session['process_ms'] = elapsed_ms if previous is None else 0.8 * previous + 0.2 * elapsed_ms
+                if pose is not None:
+                    session['result'] = pose
+            finally:
+                self._slots.release()
+        finally:
+            session['lock'].release()
+
+        with self._lock:
+            self.frames_processed += 1
+        return True, {'pose': session['result'], 'interval_ms': self._interval_ms(session)}
+
+    def _dropped(self, session):
+        with self._lock:
+            self.frames_dropped += 1
+        return False, {'pose': session['result'], 'dropped': True, 'interval_ms': self._interval_ms(session)}
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active_users': len(self._sessions),
+                'frames_received': self.frames_received,
+                'frames_processed': self.frames_processed,
+                'frames_dropped': self.frames_dropped,
+                'frames_invalid': self.frames_invalid,
+                'process_ms': {str(uid): round(s['process_ms'], 2)
+                               for uid, s in self._sessions.items() if s['process_ms'] is not None}
+            }
@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+
+
+class FramePreprocessor:
+    """
+    Resize-once stage between the camera frame and the models.
+
+    MediaPipe gets an RGB copy no wider than pose_width and the classifier a
+    classifier_size square (shortest edge resized, then center-cropped, as in
+    training), instead of full camera frames. Output buffers are allocated
+    once per output shape and reused, so steady-state frames allocate
+    nothing. MediaPipe landmarks are normalised to the image they were
+    computed on, so scaling them by the full-resolution frame (or crop)
+    shape maps them back for drawing and calibration without extra work.
+    Returned arrays are overwritten by the next call of the same kind.
+    """
+
+    def __init__(self, pose_width=480, classifier_size=224):
+        self.pose_width = pose_width
+        self.classifier_size = classifier_size
+        self._buffers = {}
+
+    def _buffer(self, kind, shape):
+        buf = self._buffers.get(kind)
+        if buf is None or buf.shape != shape:
+            buf = self._buffers[kind] = np.empty(shape, dtype=np.uint8)
+        return buf
+
+    def pose_input(self, image_bgr):
+        """RGB image for pose.process(), downscaled to pose_width if wider."""
+        h, w = image_bgr.shape[:2]
+        if self.pose_width and w > self.pose_width:
+            size = (self.pose_width, max(1, round(h * self.pose_width / w)))
+            small = self._buffer('pose_bgr', (size[1], size[0], 3))
+            # Bilinear is ~7x cheaper than INTER_AREA here and MediaPipe resamples again anyway
+            cv2.resize(image_bgr, size, dst=small, interpolation=cv2.INTER_LINEAR)
+            image_bgr = small
+        rgb = self._buffer('pose_rgb', image_bgr.shape)
+        cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB, dst=rgb)
+        return rgb
+
+    def classifier_input(self, image_bgr):
+        """BGR classifier_size x classifier_size center crop of the resized image."""
+        size = self.classifier_size
+        h, w = image_bgr.shape[:2]
+        scale = size / min(h, w)
+        new_w, new_h = max(size, int(w * scale)), max(size, int(h * scale))
+        resized = self._buffer('cls_resized', (new_h, new_w, 3))
+        # Area averaging stays close to the antialiased resize the classifier was trained with
+        cv2.resize(image_bgr, (new_w, new_h), dst=resized, interpolation=cv2.INTER_AREA)
+        top, left = (new_h - size) // 2, (new_w - size) // 2
+        return resized[top:top + size, left:left + size]
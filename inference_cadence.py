@@ -0,0 +1,76 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceCadence:
+    """
+    Decides which captured frames get the full YOLO/MediaPipe pass.
+
+    Posture changes over seconds, not frames, so intermediate frames reuse
+    the last result. Modes:
+      'every'    - infer on every frame (original behaviour)
+      'nth'      - infer on every Nth frame
+      'hz'       - infer at most max_hz times per second
+      'adaptive' - start at max_hz; every reading that repeats the previous
+                   posture stretches the interval by backoff, down to min_hz,
+                   and any change snaps straight back to max_hz
+    """
+
+    MODES = ('every', 'nth', 'hz', 'adaptive')
+
+    def __init__(self, mode='adaptive', every_n=3, max_hz=10.0, min_hz=2.0, backoff=1.5):
+        if mode not in self.MODES:
+            logger.warning(f"Unknown inference mode '{mode}'; using 'every'")
+            mode = 'every'
+        self.mode = mode
+        self.every_n = max(1, int(every_n))
+        self.min_interval = 1.0 / max_hz
+        self.max_interval = max(self.min_interval, 1.0 / min_hz)
+        self.backoff = backoff
+        self.interval = self.min_interval
+        self._frames_since = None
+        self._last_infer = None
+        self._last_quality = None
+        self.frames_inferred = 0
+        self.frames_reused = 0
+
+    def should_infer(self, now):
+        """Return True if this frame should run inference."""
+        if self._last_infer is None or self.mode == 'every':
+            due = True
+        elif self.mode == 'nth':
+            due = self._frames_since + 1 >= self.every_n
+        else:
+            due = now - self._last_infer >= self.interval
+
+        if due:
+            self._frames_since = 0
+            self._last_infer = now
+            self.frames_inferred += 1
+        else:
+            self._frames_since += 1
+            self.frames_reused += 1
+        return due
+
+    def record(self, posture_quality):
+        """Feed back the posture from an inference pass to adapt the interval."""
+        if self.mode != 'adaptive':
+            return
+        if posture_quality == self._last_quality:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        else:
+            self.interval = self.min_interval
+        self._last_quality = posture_quality
+
+    @property
+    def current_hz(self):
+        return round(1.0 / self.interval, 2) if self.mode in ('hz', 'adaptive') else None
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'current_hz': self.current_hz,
+            'frames_inferred': self.frames_inferred,
+            'frames_reused': self.frames_reused
+        }
@@ -0,0 +1,318 @@
+import threading
+import time
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Initial shared frame buffer per worker (1080p BGR); grows if a bigger frame arrives
+_DEFAULT_FRAME_BYTES = 1920 * 1080 * 3
+# Worker sends its model status along with every Nth result
+_STATUS_EVERY = 100
+
+
+def _worker_main(conn, pose_width, classifier_size):
+    """Inference worker process: load the models once, then serve frames from shared memory."""
+    from model_manager import model_manager
+    from frame_preprocessor import FramePreprocessor
+
+    model_manager.start_background_load()
+    while not model_manager.ensure_loaded(timeout=0.5):
+        if model_manager.state == model_manager.FAILED:
+            conn.send(('failed', model_manager.error))
+            return
+    conn.send(('ready', model_manager.status()))
+
+    preprocessor = FramePreprocessor(pose_width=pose_width, classifier_size=classifier_size)
+    shm = None
+    served = 0
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            shm_name, shape, roi = message
+            if shm is None or shm.name != shm_name:
+                if shm is not None:
+                    shm.close()
+                shm = shared_memory.SharedMemory(name=shm_name)
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            try:
+                result = model_manager.infer(frame, preprocessor, roi)
+            except Exception as e:
+                result = {'error': str(e)}
+            # Release the view before the buffer can be closed or replaced
+            del frame
+            served += 1
+            conn.send(('result', result, model_manager.status() if served % _STATUS_EVERY == 0 else None))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        if shm is not None:
+            shm.close()
+
+
+class _Worker:
+    """One inference process with its pipe and shared frame buffer (parent side)."""
+
+    def __init__(self, index, ctx, pose_width, classifier_size):
+        self.index = index
+        self.lock = threading.Lock()  # one frame in flight per worker
+        self.shm = shared_memory.SharedMemory(create=True, size=_DEFAULT_FRAME_BYTES)
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, pose_width, classifier_size),
+            name=f"inference-worker-{index}",
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.failed = False
+        self.error = None
+        self.model_status = None
+        self.frames = 0
+        self.infer_ms = None
+
+    def wait_ready(self):
+        """Block until the worker reports its models loaded (or failed)."""
+        try:
+            message = self.conn.recv()
+        except EOFError:
+            message = ('failed', 'worker exited during model load')
+        if message[0] == 'ready':
+            self.model_status = message[1]
+            self.ready = True
+        else:
+            self.error = message[1]
+            self.failed = True
+            logger.error(f"Inference worker {self.index} failed to load models: {self.error}")
+
+    def infer(self, frame, roi, timeout):
+        """Run one frame through the worker; caller holds self.lock."""
+        if frame.nbytes > self.shm.size:
+            # Grow the buffer; the worker reattaches by name on its next frame
+            old = self.shm
+            self.shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+            old.close()
+            old.unlink()
+        started = time.perf_counter()
+        np.ndarray(frame.shape, dtype=np.uint8, buffer=self.shm.buf)[...] = frame
+        self.conn.send((self.shm.name, frame.shape, roi))
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"inference worker {self.index} did not answer within {timeout}s")
+        _, result, model_status = self.conn.recv()
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        self.infer_ms = elapsed_ms if self.infer_ms is None else 0.9 * self.infer_ms + 0.1 * elapsed_ms
+        self.frames += 1
+        if model_status is not None:
+            self.model_status = model_status
+        return result
+
+    def stop(self, timeout=2.0):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        self.conn.close()
+        self.shm.close()
+        self.shm.unlink()
+
+    def status(self, streams):
+        return {
+            'index': self.index,
+            'pid': self.process.pid,
+            'alive': self.process.is_alive(),
+            'ready': self.ready,
+            'error': self.error,
+            'streams': streams,
+            'frames': self.frames,
+            'infer_ms': round(self.infer_ms, 2) if self.infer_ms is not None else None,
+            'models': self.model_status
+        }
+
+
+class InferencePool:
+    """
+    Posture models in worker processes, so inference uses more than one
+    core and stays off the GIL of the process serving requests.
+
+    Each worker loads its own models and gets frames through a shared-memory
+    buffer (one copy in, a small result dict back over a pipe). Streams are
+    pinned to a worker: MediaPipe tracks the pose between frames, so a
+    stream keeps its warm worker for as long as it sends frames, and new
+    streams go to the worker with the fewest active streams. A stream that
+    sends nothing for stream_timeout seconds frees its slot. Crashed or
+    hung workers are replaced.
+
+    Presents the same readiness surface as ModelManager (state, is_ready,
+    start_background_load(), status(), use_classifier) so the app can use
+    either.
+    """
+
+    PENDING = 'pending'
+    LOADING = 'loading'
+    READY = 'ready'
+    FAILED = 'failed'
+
+    def __init__(self, workers=2, pose_width=480, classifier_size=224, timeout=10.0,
+                 stream_timeout=10.0, start_method='spawn'):
+        self.size = max(1, int(workers))
+        self.pose_width = pose_width
+        self.classifier_size = classifier_size
+        self.timeout = timeout
+        self.stream_timeout = stream_timeout
+        self.start_method = start_method
+        self._lock = threading.Lock()
+        self._workers = []
+        self._assignments = {}  # stream id -> (worker index, last frame time)
+        self._started = False
+        self.started_at = None
+        self.restarts = 0
+        self.failures = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            workers = list(self._workers)
+        if not self._started:
+            return self.PENDING
+        if any(w.ready for w in workers):
+            return self.READY
+        if workers and all(w.failed for w in workers):
+            return self.FAILED
+        return self.LOADING
+
+    @property
+    def is_ready(self):
+        return self.state == self.READY
+
+    @property
+    def is_running(self):
+        """False before start_background_load() and after shutdown()."""
+        return self._started
+
+    @property
+    def use_classifier(self):
+        for worker in list(self._workers):
+            if worker.ready and worker.model_status:
+                return worker.model_status['use_classifier']
+        return False
+
+    def start_background_load(self):
+        """Start the worker processes; each loads its models in the background. No-op once started."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self.started_at = time.time()
+            ctx = multiprocessing.get_context(self.start_method)
+            for index in range(self.size):
+                self._workers.append(self._spawn(ctx, index))
+        logger.info(f"Started {self.size} inference worker(s) ({self.start_method})")
+
+    def ensure_loaded(self, timeout=None):
+        """Start the workers if needed and wait up to timeout seconds for one to be ready."""
+        self.start_background_load()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.state == self.LOADING and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.1)
+        return self.is_ready
+
+    def _spawn(self, ctx, index):
+        worker = _Worker(index, ctx, self.pose_width, self.classifier_size)
+        threading.Thread(target=worker.wait_ready, name=f"inference-worker-{index}-load", daemon=True).start()
+        return worker
+
+    def _assign(self, stream_id, now):
+        """Worker index for stream_id, keeping its previous worker while that one is usable."""
+        with self._lock:
+            # Streams that went quiet no longer count against their worker
+            for stale in [s for s, (_, seen) in self._assignments.items() if now - seen > self.stream_timeout]:
+                del self._assignments[stale]
+            current = self._assignments.get(stream_id)
+            if current is not None and current[0] < len(self._workers) and self._workers[current[0]].ready:
+                index = current[0]
+            else:
+                load = {w.index: 0 for w in self._workers if w.ready}
+                if not load:
+                    return None
+                for other, (assigned, _) in self._assignments.items():
+                    if other != stream_id and assigned in load:
+                        load[assigned] += 1
+                index = min(load, key=lambda i: (load[i], i))
+            self._assignments[stream_id] = (index, now)
+            return self._workers[index]
+
+    def _replace(self, worker):
+        """Swap a crashed or hung worker for a fresh process."""
+        with self._lock:
+            # Already replaced, or the pool was shut down meanwhile
+            if worker.index >= len(self._workers) or self._workers[worker.index] is not worker:
+                return
+            self.restarts += 1
+            ctx = multiprocessing.get_context(self.start_method)
+            self._workers[worker.index] = self._spawn(ctx, worker.index)
+        worker.process.kill()
+        worker.stop(timeout=0.5)
+        logger.warning(f"Replaced inference worker {worker.index}")
+
+    def infer(self, stream_id, frame, roi=None):
+        """
+        ModelManager.infer() for frame on stream_id's worker.
+
+        Returns None when no worker is ready or the worker failed on this
+        frame; the caller keeps its previous result.
+        """
+        worker = self._assign(stream_id, time.monotonic())
+        if worker is None:
+            return None
+        with worker.lock:
+            try:
+                result = worker.infer(np.ascontiguousarray(frame), roi, self.timeout)
+            except (EOFError, OSError, TimeoutError) as e:
+                logger.error(f"Inference worker {worker.index} failed: {e!r}")
+                self.failures += 1
+                result = None
+                failed = True
+            else:
+                failed = False
+        if failed:
+            self._replace(worker)
+            return None
+        if 'error' in result:
+            logger.error(f"Inference error in worker {worker.index}: {result['error']}")
+            return None
+        return result
+
+    def status(self):
+        with self._lock:
+            workers = list(self._workers)
+            streams = {}
+            for index, _ in self._assignments.values():
+                streams[index] = streams.get(index, 0) + 1
+        ready = [w for w in workers if w.ready]
+        return {
+            'state': self.state,
+            'ready': bool(ready),
+            'error': None if ready else next((w.error for w in workers if w.error), None),
+            'use_classifier': self.use_classifier,
+            'workers': [w.status(streams.get(w.index, 0)) for w in workers],
+            'restarts': self.restarts,
+            'failures': self.failures
+        }
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._assignments.clear()
+            self._started = False
+        for worker in workers:
+            worker.stop()
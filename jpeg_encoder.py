@@ -0,0 +1,52 @@
+import logging
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+class JpegEncoder:
+    """
+    JPEG encoding for the preview stream.
+
+    Uses libjpeg-turbo through simplejpeg or PyTurboJPEG when one of them is
+    installed (noticeably faster than OpenCV's bundled libjpeg, especially
+    at low quality), otherwise cv2.imencode. encode() returns a bytes-like
+    object in every case.
+    """
+
+    BACKENDS = ('simplejpeg', 'turbojpeg', 'opencv')
+
+    def __init__(self, backend='auto'):
+        self.backend = None
+        self._turbo = None
+        candidates = self.BACKENDS if backend == 'auto' else (backend, 'opencv')
+        for candidate in candidates:
+            try:
+                self._init_backend(candidate)
+                self.backend = candidate
+                break
+            except Exception as e:
+                if backend != 'auto':
+                    logger.warning(f"JPEG encoder '{candidate}' unavailable ({e}); falling back")
+        logger.info(f"JPEG encoder: {self.backend}")
+
+    def _init_backend(self, name):
+        if name == 'simplejpeg':
+            import simplejpeg
+            self._simplejpeg = simplejpeg
+        elif name == 'turbojpeg':
+            from turbojpeg import TurboJPEG
+            self._turbo = TurboJPEG()
+        elif name != 'opencv':
+            raise ValueError(f"Unknown JPEG encoder: {name}")
+
+    def encode(self, image_bgr, quality=75):
+        """Encode a BGR image; returns None if encoding failed."""
+        if self.backend == 'simplejpeg':
+            if not image_bgr.flags['C_CONTIGUOUS']:
+                image_bgr = image_bgr.copy()
+            return self._simplejpeg.encode_jpeg(image_bgr, quality=quality, colorspace='BGR', fastdct=True)
+        if self.backend == 'turbojpeg':
+            return self._turbo.encode(image_bgr, quality=quality)
+        ret, buffer = cv2.imencode('.jpg', image_bgr, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buffer if ret else None
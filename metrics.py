@@ -0,0 +1,91 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond encodes up to slow database calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _number(value):
+    if value is None:
+        return 'NaN'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Latency histogram with one label, rendered in the Prometheus text format.
+
+    Cheap enough to call per frame: observe() is a bisect and two additions
+    under a lock. Buckets are cumulative only when rendered.
+    """
+
+    def __init__(self, name, documentation, label, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}  # label value -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, label_value, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += seconds
+
+    @contextmanager
+    def time(self, label_value):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(label_value, time.perf_counter() - started)
+
+    def render(self):
+        with self._lock:
+            snapshot = {value: list(series) for value, series in self._series.items()}
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for value, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                labels = _labels({self.label: value, 'le': _number(float(bound))})
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels({self.label: value})
+            lines.append(f"{self.name}_sum{labels} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def format_metric(name, kind, documentation, samples):
+    """Exposition lines for a gauge or counter; samples is a list of ({label: value}, number)."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+    return lines
+
+
+# Process-wide histograms fed by StageTimings (frame pipeline), db.py and the posture record writer
+stage_latency = Histogram('posturease_stage_seconds', 'Time spent in each frame pipeline stage.', 'stage')
+db_latency = Histogram('posturease_db_call_seconds', 'Time spent in each database call.', 'call')
+record_flush_latency = Histogram('posturease_record_flush_seconds', 'Time to write one batch of posture records.', 'outcome')
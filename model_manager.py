@@ -0,0 +1,244 @@
+import os
+import threading
+import time
+import logging
+import numpy as np
+from config import Config
+from pose_engine import PoseEngine
+from classifier_backend import UltralyticsClassifier, load_exported_classifier
+from posture_scoring import normalized_landmarks
+
+logger = logging.getLogger(__name__)
+
+# Project-trained classifier weights, relative to the app directory
+CLASSIFIER_WEIGHTS = os.path.join('Training Again', 'runs', 'classify', 'train3', 'weights', 'best.pt')
+FALLBACK_CLASSIFIER_WEIGHTS = 'yolov8n-cls.pt'
+DETECTOR_WEIGHTS = 'yolov8n.pt'
+
+
+def _returns_probs(model):
+    """Run a dummy inference and check the model behaves like a classifier."""
+    dummy = np.zeros((32, 32, 3), dtype=np.uint8)
+    for result in model(dummy, verbose=False):
+        if hasattr(result, 'probs') and result.probs is not None:
+            return True
+    return False
+
+
+class ModelManager:
+    """
+    Owns the YOLO and MediaPipe models used by the video pipeline.
+
+    Loading ultralytics/torch, the weights and the pose graph takes several
+    seconds, so it happens on a background thread (or on first use) instead
+    of at import time. Routes that don't need the models never wait for them.
+    """
+
+    PENDING = 'pending'
+    LOADING = 'loading'
+    READY = 'ready'
+    FAILED = 'failed'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self.state = self.PENDING
+        self.error = None
+        self.started_at = None
+        self.loaded_at = None
+
+        self.posture_model = None
+        self.yolo_model = None
+        self.use_classifier = False
+        self.classifier_source = None
+        self.classifier_backend = None
+        self.pose = None
+
+    @property
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def start_background_load(self):
+        """Kick off loading on a daemon thread; no-op if already loading or loaded."""
+        with self._lock:
+            # Allow a retry after a failed load
+            if self._thread is not None and self.state != self.FAILED:
+                return
+            self.error = None
+            self.state = self.LOADING
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._load, name="model-loader", daemon=True)
+            self._thread.start()
+
+    def ensure_loaded(self, timeout=None):
+        """Start loading if needed and wait up to timeout seconds. Returns True when ready."""
+        self.start_background_load()
+        return self._ready.wait(timeout)
+
+    def _load_exported_classifier(self):
+        """Load the ONNX/OpenVINO export of the project classifier, skipping PyTorch entirely."""
+        backend = Config.CLASSIFIER_BACKEND
+        backends = ('onnx', 'openvino') if backend == 'auto' else (backend,)
+        # An INT8 request falls back to the FP32 export if it hasn't been quantized yet
+        precisions = ('int8', 'fp32') if Config.CLASSIFIER_PRECISION == 'int8' else ('fp32',)
+        for precision in precisions:
+            for candidate in backends:
+                try:
+                    self.posture_model = load_exported_classifier(
+                        CLASSIFIER_WEIGHTS, candidate, Config.CLASSIFIER_THREADS, precision
+                    )
+                except FileNotFoundError as e:
+                    logger.info(str(e))
+                    continue
+                except Exception as e:
+                    logger.warning(f"Could not load {precision} {candidate} classifier: {e}")
+                    continue
+                self.use_classifier = True
+                self.classifier_source = self.posture_model.source
+                self.classifier_backend = f"{candidate}-{precision}"
+                logger.info(f"Loaded posture classifier from {self.classifier_source} ({candidate}, {precision})")
+                return True
+        return False
+
+    def _load_yolo(self):
+        if Config.CLASSIFIER_BACKEND != 'pytorch' and self._load_exported_classifier():
+            return
+
+        from ultralytics import YOLO
+
+        # Prefer project classifier weights; gracefully fall back to classifier base, then detector
+        for weights in (CLASSIFIER_WEIGHTS, FALLBACK_CLASSIFIER_WEIGHTS):
+            try:
+                candidate = YOLO(weights)
+                if _returns_probs(candidate):
+                    self.posture_model = UltralyticsClassifier(candidate, weights)
+                    self.use_classifier = True
+                    self.classifier_source = weights
+                    self.classifier_backend = 'pytorch'
+                    logger.info(f"Loaded posture classifier from {weights}")
+                    return
+                logger.warning(f"{weights} did not return classification probabilities")
+            except Exception as e:
+                logger.warning(f"Could not load classifier {weights}: {e}")
+
+        # Revert to detector for person detection
+        self.yolo_model = YOLO(DETECTOR_WEIGHTS)
+        self.use_classifier = False
+        logger.info(f"Classifier unavailable; reverted to {DETECTOR_WEIGHTS} detector")
+
+    def _load_pose(self):
+        # Model complexity is benchmarked against the frame budget unless pinned in config
+        pose = PoseEngine(
+            budget_ms=Config.POSE_LATENCY_BUDGET_MS,
+            complexity=Config.POSE_MODEL_COMPLEXITY,
+            min_detection_confidence=0.3,  # Further lowered for better side/back detection
+            min_tracking_confidence=0.3   # Further lowered for better side/back detection
+        )
+        pose.load()
+        self.pose = pose
+
+    def _load(self):
+        try:
+            self._load_yolo()
+            self._load_pose()
+            self.loaded_at = time.time()
+            self.state = self.READY
+            self._ready.set()
+            logger.info(f"Models ready in {self.loaded_at - self.started_at:.1f}s")
+        except Exception as e:
+            self.error = str(e)
+            self.state = self.FAILED
+            logger.error(f"Failed to load posture models: {e}")
+
+    def infer(self, frame, preprocessor, roi=None):
+        """
+        The model half of one inference pass on a BGR frame.
+
+        Classifier mode runs MediaPipe on the whole frame and classifies it.
+        Detector mode crops roi (a tracked person box) or, when roi is None,
+        the first YOLO person detection, then runs MediaPipe on the crop.
+        Returns a plain dict (safe to send between processes):
+          mode        - 'classifier' or 'detector'
+          landmarks   - normalized_landmarks() array relative to the frame
+                        (classifier) or box (detector), or None
+          class_name, confidence - classifier output
+          box         - detector crop (x1, y1, x2, y2), None if nobody was found
+          detected    - True if box comes from YOLO rather than roi
+          too_small   - box too small to run MediaPipe on
+          timings     - {stage: ms} for the 'detect', 'pose' and 'classify' stages that ran
+        """
+        timings = {}
+        started = time.perf_counter()
+
+        def lap(stage):
+            nonlocal started
+            now = time.perf_counter()
+            timings[stage] = (now - started) * 1000.0
+            started = now
+
+        if self.use_classifier:
+            results_pose = self.pose.process(preprocessor.pose_input(frame))
+            lap('pose')
+            if not results_pose.pose_landmarks:
+                return {'mode': 'classifier', 'landmarks': None, 'timings': timings}
+            try:
+                class_name, confidence = self.posture_model.predict(preprocessor.classifier_input(frame))
+            except Exception:
+                # If classifier inference fails, mark unknown
+                class_name, confidence = 'Unknown', 0.0
+            lap('classify')
+            return {
+                'mode': 'classifier',
+                'landmarks': normalized_landmarks(results_pose.pose_landmarks),
+                'class_name': class_name,
+                'confidence': float(confidence),
+                'timings': timings
+            }
+
+        detected = roi is None
+        if detected:
+            persons = []
+            for result in self.yolo_model(frame, verbose=False):
+                for box in result.boxes:
+                    # Only process if it's a person (class 0)
+                    if int(box.cls) == 0 and box.conf[0] > 0.5:  # Lowered for better side/back detection
+                        persons.append(box.xyxy[0].cpu().numpy())
+            lap('detect')
+            if not persons:
+                return {'mode': 'detector', 'box': None, 'landmarks': None, 'timings': timings}
+
+            # Process only a single detected person (first match), clamped to the frame
+            x1, y1, x2, y2 = map(int, persons[0])
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(frame.shape[1], x2), min(frame.shape[0], y2)
+        else:
+            x1, y1, x2, y2 = roi
+
+        result = {'mode': 'detector', 'box': (x1, y1, x2, y2), 'detected': detected, 'landmarks': None,
+                  'timings': timings}
+        if x2 - x1 < 50 or y2 - y1 < 50 or frame[y1:y2, x1:x2].size == 0:
+            result['too_small'] = True
+            return result
+        landmark_results = self.pose.process(preprocessor.pose_input(frame[y1:y2, x1:x2]))
+        lap('pose')
+        if landmark_results.pose_landmarks:
+            result['landmarks'] = normalized_landmarks(landmark_results.pose_landmarks)
+        return result
+
+    def status(self):
+        """Load state for the readiness endpoint."""
+        return {
+            'state': self.state,
+            'ready': self.is_ready,
+            'error': self.error,
+            'use_classifier': self.use_classifier,
+            'classifier_source': self.classifier_source,
+            'classifier_backend': self.classifier_backend,
+            'pose_engine': self.pose.status() if self.pose is not None else None,
+            'load_seconds': round(self.loaded_at - self.started_at, 2) if self.loaded_at else None
+        }
+
+
+# Shared instance used by the app
+model_manager = ModelManager()
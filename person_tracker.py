@@ -0,0 +1,66 @@
+import numpy as np
+
+
+class PersonTracker:
+    """
+    Single-person region of interest that replaces most YOLO detections.
+
+    After a detection, the crop for the next pass is derived from the
+    previous pass's landmarks: their bounding box plus padding on every
+    side. Full-frame detection runs again every redetect_every passes, or as
+    soon as MediaPipe loses the person.
+    """
+
+    def __init__(self, redetect_every=15, padding=0.2, min_visibility=0.5):
+        self.redetect_every = max(1, int(redetect_every))
+        self.padding = padding
+        self.min_visibility = min_visibility
+        self._box = None
+        self._passes_since_detection = 0
+        self.detections = 0
+        self.tracked = 0
+
+    def roi(self):
+        """Box (x1, y1, x2, y2) to crop this pass, or None if a detection is due."""
+        if self._box is None or self._passes_since_detection >= self.redetect_every:
+            return None
+        self._passes_since_detection += 1
+        self.tracked += 1
+        return self._box
+
+    def detected(self, box):
+        """Record a fresh detector box."""
+        self._box = box
+        self._passes_since_detection = 0
+        self.detections += 1
+
+    def follow(self, points, crop_box, frame_shape):
+        """
+        Move the ROI to the padded bounding box of landmarks found in crop_box.
+
+        points is the (33, 4) landmark array in crop pixel coordinates.
+        """
+        visible = points[points[:, 3] >= self.min_visibility]
+        if len(visible) < 2:
+            self.lose()
+            return
+        xy = visible[:, :2] + (crop_box[0], crop_box[1])
+        (x1, y1), (x2, y2) = xy.min(axis=0), xy.max(axis=0)
+        pad_x = (x2 - x1) * self.padding
+        pad_y = (y2 - y1) * self.padding
+        h, w = frame_shape[:2]
+        self._box = (
+            int(max(0, x1 - pad_x)), int(max(0, y1 - pad_y)),
+            int(min(w, np.ceil(x2 + pad_x))), int(min(h, np.ceil(y2 + pad_y)))
+        )
+
+    def lose(self):
+        """Landmarks lost: detect on the next pass."""
+        self._box = None
+
+    def stats(self):
+        return {
+            'tracking': self._box is not None,
+            'detections': self.detections,
+            'tracked_passes': self.tracked
+        }
@@ -0,0 +1,158 @@
+import threading
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class PoseEngine:
+    """
+    MediaPipe Pose with the model complexity picked from measured latency.
+
+    Complexity 2 (heavy) is the most accurate but can take hundreds of ms per
+    frame on CPU-only machines. The engine first checks which complexities
+    can be built here (lite/heavy weights are downloaded on first use), then
+    benchmarks them lightest first on the first real frames it is given,
+    since a blank frame never reaches the landmark model, stopping at the
+    first one over budget. It settles on the highest complexity whose median
+    latency fits budget_ms, and keeps an EMA of the live latency to step
+    down (or back up) when load drifts; a level that was never benchmarked
+    is probed the same way before upgrading to it.
+
+    process() is a drop-in for mp.solutions.pose.Pose.process().
+    """
+
+    LEVELS = (0, 1, 2)
+
+    def __init__(self, budget_ms=50.0, complexity='auto', probe_frames=5, window=30,
+                 min_detection_confidence=0.3, min_tracking_confidence=0.3):
+        self.budget_ms = budget_ms
+        self.probe_frames = probe_frames
+        self.window = window
+        self._pose_kwargs = {
+            'static_image_mode': False,
+            'min_detection_confidence': min_detection_confidence,
+            'min_tracking_confidence': min_tracking_confidence
+        }
+        self._lock = threading.Lock()
+        self._poses = {}
+        self.available = []
+        self.benchmark_ms = {}  # complexity -> median latency measured on real frames
+        self.fixed = complexity != 'auto'
+        self.level = int(complexity) if self.fixed else None
+        self._probe = []        # remaining (level, samples) while benchmarking
+        self._reprobe = False   # probing a higher level at runtime rather than at startup
+        self._ema_ms = None
+        self._frames_at_level = 0
+        self.switches = 0
+
+    def _build(self, level):
+        import mediapipe as mp
+        return mp.solutions.pose.Pose(model_complexity=level, **self._pose_kwargs)
+
+    def load(self):
+        """Build the pose graphs that are usable here and prepare benchmarking."""
+        levels = [self.level] if self.fixed else self.LEVELS
+        warmup = np.zeros((64, 64, 3), dtype=np.uint8)
+        for level in levels:
+            try:
+                pose = self._build(level)
+                pose.process(warmup)
+                self._poses[level] = pose
+                self.available.append(level)
+            except Exception as e:
+                logger.warning(f"Pose model complexity {level} unavailable: {e}")
+        if not self.available:
+            raise RuntimeError("No MediaPipe pose model could be loaded")
+
+        if self.fixed:
+            logger.info(f"Pose engine fixed at model_complexity={self.level}")
+            return
+        # Benchmark lightest first so the first frames stay cheap; heavier levels
+        # are only tried while the lighter ones fit the budget
+        self._probe = [[level, []] for level in sorted(self.available)]
+        self.level = min(self.available)
+        logger.info(f"Pose engine benchmarking complexities {sorted(self.available)} "
+                    f"against a {self.budget_ms:.0f} ms budget")
+
+    def process(self, image_rgb):
+        with self._lock:
+            level = self._probe[0][0] if self._probe else self.level
+            started = time.perf_counter()
+            results = self._poses[level].process(image_rgb)
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            if self._probe:
+                self._record_probe(level, elapsed_ms)
+            elif not self.fixed:
+                self._track(elapsed_ms)
+            return results
+
+    def _record_probe(self, level, elapsed_ms):
+        samples = self._probe[0][1]
+        samples.append(elapsed_ms)
+        if len(samples) < self.probe_frames:
+            return
+        self.benchmark_ms[level] = round(float(np.median(samples)), 1)
+        self._probe.pop(0)
+        if self.benchmark_ms[level] > self.budget_ms:
+            # Heavier levels won't be faster
+            self._probe = []
+        if not self._probe:
+            fitting = [lvl for lvl in self.benchmark_ms if self.benchmark_ms[lvl] <= self.budget_ms]
+            selected = max(fitting) if fitting else min(self.available)
+            logger.info(f"Pose benchmark {self.benchmark_ms} ms; selected model_complexity={selected}")
+            if self._reprobe:
+                self._reprobe = False
+                self._switch_to(selected)
+            else:
+                self.level = selected
+
+    def _track(self, elapsed_ms):
+        self._ema_ms = elapsed_ms if self._ema_ms is None else 0.9 * self._ema_ms + 0.1 * elapsed_ms
+        self._frames_at_level += 1
+        if self._frames_at_level < self.window:
+            return
+
+        lower = [lvl for lvl in self.available if lvl < self.level]
+        higher = [lvl for lvl in self.available if lvl > self.level]
+        if self._ema_ms > self.budget_ms * 1.2 and lower:
+            logger.info(f"Pose latency {self._ema_ms:.0f} ms over budget; downgrading from complexity {self.level}")
+            # Remember what this level really costs now so we don't bounce straight back
+            self.benchmark_ms[self.level] = round(self._ema_ms, 1)
+            self._switch_to(max(lower))
+        elif self._ema_ms < self.budget_ms * 0.6 and higher:
+            target = min(higher)
+            if target not in self.benchmark_ms:
+                # Skipped at startup because a lighter level was over budget then; measure it now.
+                # The current level's cost is refreshed so the selection compares like with like
+                logger.info(f"Pose latency {self._ema_ms:.0f} ms well under budget; benchmarking complexity {target}")
+                self.benchmark_ms[self.level] = round(self._ema_ms, 1)
+                self._probe = [[target, []]]
+                self._reprobe = True
+                self._ema_ms = None
+                self._frames_at_level = 0
+                return
+            # Scale the benchmarked cost of the next level by how load has drifted since
+            drift = self._ema_ms / max(self.benchmark_ms.get(self.level, self._ema_ms), 1e-6)
+            if self.benchmark_ms[target] * drift <= self.budget_ms:
+                logger.info(f"Pose latency {self._ema_ms:.0f} ms well under budget; upgrading to complexity {target}")
+                self._switch_to(target)
+
+    def _switch_to(self, level):
+        if level != self.level:
+            self.switches += 1
+        self.level = level
+        self._ema_ms = None
+        self._frames_at_level = 0
+
+    def status(self):
+        return {
+            'model_complexity': self.level,
+            'mode': 'fixed' if self.fixed else ('benchmarking' if self._probe else 'adaptive'),
+            'budget_ms': self.budget_ms,
+            'latency_ms': round(self._ema_ms, 1) if self._ema_ms is not None else None,
+            'available': sorted(self.available),
+            'benchmark_ms': dict(self.benchmark_ms),
+            'switches': self.switches
+        }
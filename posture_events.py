@@ -0,0 +1,137 @@
+import json
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event, data):
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _rounded(totals):
+    return {k: round(v, 1) if isinstance(v, float) else v for k, v in totals.items()}
+
+
+class PostureEventBus:
+    """
+    Fan-out of posture state changes to Server-Sent Events clients.
+
+    The inference pipeline publishes only when a user's posture state
+    actually changes (quality flip, confidence moving by more than
+    min_delta, alarm transitions); each connected client gets its own small
+    queue, receives only its own user's events, and falls back to a
+    heartbeat carrying the current state when idle. Monitoring session
+    totals go out as 'session' events through publish_session(), and with
+    every heartbeat when session_stats(user_id) is given.
+    """
+
+    def __init__(self, heartbeat=15.0, min_delta=0.05, queue_size=16, session_stats=None):
+        self.heartbeat = heartbeat
+        self.min_delta = min_delta
+        self.queue_size = queue_size
+        self.session_stats = session_stats
+        self._lock = threading.Lock()
+        self._subscribers = {}  # user_id -> list of client queues
+        self._last_published = {}  # user_id -> last state sent as a 'posture' event
+        self._last_state = {}      # user_id -> latest state, published or not (for heartbeats)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(queues) for queues in self._subscribers.values())
+
+    def _broadcast(self, user_id, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        message = format_sse(event, data)
+        for sub_queue in subscribers:
+            try:
+                sub_queue.put_nowait(message)
+            except queue.Full:
+                # Slow client: drop its oldest message rather than block the pipeline
+                try:
+                    sub_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    sub_queue.put_nowait(message)
+                except queue.Full:
+                    pass
+
+    def publish_state(self, user_id, state):
+        """
+        Publish a user's posture state dict if it differs meaningfully from their last one.
+
+        Returns True if an event was emitted.
+        """
+        with self._lock:
+            # Compared against what clients last received, so slow drifts add up to an event
+            last = self._last_published.get(user_id)
+            changed = (
+                last is None
+                or last['posture_quality'] != state['posture_quality']
+                or abs(last['confidence'] - state['confidence']) >= self.min_delta
+            )
+            self._last_state[user_id] = dict(state)
+            if changed:
+                self._last_published[user_id] = dict(state)
+        if not changed:
+            return False
+
+        self._broadcast(user_id, 'posture', state)
+        # Entering bad posture is an alarm transition
+        if state['posture_quality'] == 'bad' and (last is None or last['posture_quality'] != 'bad'):
+            self._broadcast(user_id, 'alarm', {
+                'alarm_triggered': True,
+                'message': 'Bad posture detected! Please correct your posture.',
+                'timestamp': state.get('timestamp')
+            })
+        return True
+
+    def publish_session(self, user_id, totals):
+        """Push a user's monitoring session totals (time per state, corrections)."""
+        self._broadcast(user_id, 'session', _rounded(totals))
+
+    def _session_message(self, user_id):
+        if self.session_stats is None:
+            return None
+        try:
+            totals = self.session_stats(user_id)
+        except Exception as e:
+            logger.error(f"Could not read session totals for user {user_id}: {e}")
+            return None
+        return format_sse('session', _rounded(totals)) if totals is not None else None
+
+    def stream(self, user_id):
+        """Generator of SSE messages for one client of user_id."""
+        sub_queue = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, []).append(sub_queue)
+            last = self._last_state.get(user_id)
+        try:
+            # Send the current state straight away so the client doesn't wait for a change
+            if last is not None:
+                yield format_sse('posture', last)
+            session_message = self._session_message(user_id)
+            if session_message is not None:
+                yield session_message
+            while True:
+                try:
+                    yield sub_queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    with self._lock:
+                        last = self._last_state.get(user_id)
+                    yield format_sse('heartbeat', last or {'posture_quality': 'unknown', 'confidence': 0.0})
+                    session_message = self._session_message(user_id)
+                    if session_message is not None:
+                        yield session_message
+        finally:
+            with self._lock:
+                queues = self._subscribers.get(user_id, [])
+                if sub_queue in queues:
+                    queues.remove(sub_queue)
+                if not queues:
+                    self._subscribers.pop(user_id, None)
@@ -0,0 +1,144 @@
+import numpy as np
+
+# MediaPipe Pose landmark indices used by the rule-based scorer
+NOSE = 0
+LEFT_EAR = 7
+RIGHT_EAR = 8
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_HIP = 23
+RIGHT_HIP = 24
+RIGHT_KNEE = 26
+NUM_LANDMARKS = 33
+
+GOOD_THRESHOLD = 0.7  # Weighted confidence above this is good posture
+DEFAULT_TOLERANCE_DEG = 12.0
+
+# Gathered points: NOSE, LEFT_EAR, RIGHT_EAR, LEFT_SHOULDER, RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE
+_GATHER = np.array([NOSE, LEFT_EAR, RIGHT_EAR, LEFT_SHOULDER, RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE])
+_G_NOSE, _G_LEAR, _G_REAR, _G_LSH, _G_RSH, _G_RHIP, _G_RKNEE = range(7)
+
+# Joint angles as (a, b, c) triples of gathered points, angle measured at b:
+# neck (ear-shoulder-hip), upper back (shoulder-hip-knee), head tilt (ear-nose-ear)
+# and shoulder alignment (left shoulder-right shoulder-horizontal reference).
+_JOINTS = [
+    (_G_REAR, _G_RSH, _G_RHIP),
+    (_G_RSH, _G_RHIP, _G_RKNEE),
+    (_G_LEAR, _G_NOSE, _G_REAR),
+    (_G_LSH, _G_RSH, _G_RSH),
+]
+
+# Linear map from gathered points to the 8 leg vectors (c - b for each joint,
+# then a - b) plus the nose position, so all differences are one matmul
+_LEGS = np.zeros((9, len(_GATHER)))
+for _i, (_a, _b, _c) in enumerate(_JOINTS):
+    _LEGS[_i, _c] += 1.0
+    _LEGS[_i, _b] -= 1.0
+    _LEGS[4 + _i, _a] += 1.0
+    _LEGS[4 + _i, _b] -= 1.0
+_LEGS[8, _G_NOSE] = 1.0
+# The shoulder reference point sits 100 px right of the right shoulder
+_LEG_OFFSET = np.zeros((9, 2))
+_LEG_OFFSET[3, 0] = 100.0
+_TO_VERTICAL = np.array([-1.0, 1.0])
+
+# Ideal angle and the deviation at which each metric's score reaches zero
+_TARGET_DEG = np.array([170.0, 175.0, 180.0, 180.0])
+_SPAN_DEG = np.array([40.0, 40.0, 30.0, 30.0])
+
+# Weights for neck, back, head, shoulder and calibrated front angle
+WEIGHTS = np.array([0.30, 0.30, 0.15, 0.10, 0.15])
+
+
+def normalized_landmarks(pose_landmarks):
+    """MediaPipe pose landmarks as a (33, 4) float32 array of normalised [x, y, z, visibility]."""
+    return np.array(
+        [(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark],
+        dtype=np.float32
+    )
+
+
+def landmarks_to_array(pose_landmarks, image_shape):
+    """
+    Convert MediaPipe pose landmarks (or a normalized_landmarks() array) to a
+    (33, 4) float32 array of [x_px, y_px, z, visibility].
+
+    Pixel coordinates are truncated to whole pixels like the original
+    dict-of-tuples representation, so scores are unchanged.
+    """
+    h, w = image_shape[:2]
+    if isinstance(pose_landmarks, np.ndarray):
+        arr = pose_landmarks.astype(np.float32, copy=True)
+    else:
+        arr = normalized_landmarks(pose_landmarks)
+    arr[:, 0] = np.trunc(arr[:, 0] * w)
+    arr[:, 1] = np.trunc(arr[:, 1] * h)
+    return arr
+
+
+def _angles(points):
+    """
+    Joint angles (N, 4) and front angle (N,) in degrees for (N, 33, >=2) points.
+
+    The front angle is between the shoulder-midpoint-to-nose vector and vertical.
+    """
+    g = points[:, _GATHER, :2].astype(np.float64)
+    legs = _LEGS @ g + _LEG_OFFSET
+    # Nose row becomes the shoulder-midpoint-to-nose vector, rotated so that
+    # arctan2 measures it from vertical like the other rows measure from +x
+    legs[:, 8] -= np.floor((g[:, _G_LSH] + g[:, _G_RSH]) / 2.0)
+    legs[:, 8] = legs[:, 8, ::-1] * _TO_VERTICAL
+
+    theta = np.degrees(np.arctan2(legs[..., 1], legs[..., 0]))
+    joint = np.abs(theta[:, 0:4] - theta[:, 4:8])
+    return np.minimum(joint, 360.0 - joint), np.abs(theta[:, 8])
+
+
+def score_posture_batch(points, baseline_deg=None, tolerance_deg=DEFAULT_TOLERANCE_DEG):
+    """
+    Score N frames of landmarks at once.
+
+    points is (N, 33, 2+) pixel coordinates. baseline_deg is the calibrated
+    front angle, either a scalar or an (N,) array; None or NaN entries mean
+    uncalibrated (front score 1.0). Returns (confidence, front_angle_deg,
+    front_score), each of shape (N,).
+    """
+    points = np.asarray(points)
+    angles, front_angle = _angles(points)
+    metric_scores = 1.0 - np.minimum(np.abs(_TARGET_DEG - angles) / _SPAN_DEG, 1.0)
+
+    if baseline_deg is None:
+        front_score = np.ones(len(points))
+    else:
+        baseline = np.broadcast_to(np.asarray(baseline_deg, dtype=np.float64), front_angle.shape)
+        tolerance = np.maximum(np.asarray(tolerance_deg, dtype=np.float64), 1e-6)
+        deviation = np.minimum(np.abs(front_angle - baseline) / tolerance, 1.0)
+        front_score = np.where(np.isnan(baseline), 1.0, 1.0 - deviation)
+
+    scores = np.concatenate([metric_scores, front_score[:, None]], axis=1)
+    confidence = np.clip(scores @ WEIGHTS, 0.0, 1.0)
+    return confidence, front_angle, front_score
+
+
+def score_posture(points, calibration=None):
+    """
+    Score one frame of landmarks.
+
+    points is a (33, 2+) array from landmarks_to_array(); calibration is a
+    dict with front_angle_deg/tolerance_deg as kept in the posture state store.
+    Returns (posture, confidence, front_angle_deg, front_score).
+    """
+    points = np.asarray(points)
+    if points.ndim != 2 or points.shape[0] < NUM_LANDMARKS:
+        return "Unknown", 0.0, None, 1.0
+
+    baseline = None
+    tolerance = DEFAULT_TOLERANCE_DEG
+    if calibration and calibration.get('front_angle_deg') is not None:
+        baseline = calibration['front_angle_deg']
+        tolerance = calibration.get('tolerance_deg', DEFAULT_TOLERANCE_DEG)
+
+    confidence, front_angle, front_score = score_posture_batch(points[None], baseline, tolerance)
+    confidence = float(confidence[0])
+    posture = "Good Posture" if confidence > GOOD_THRESHOLD else "Bad Posture"
+    return posture, confidence, float(front_angle[0]), float(front_score[0])
@@ -0,0 +1,223 @@
+import atexit
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SessionAccumulator:
+    """
+    Wall-clock posture accounting for one monitoring session.
+
+    Time is integrated per smoothed posture state between observations, so
+    the totals don't depend on the frame or inference rate. A gap longer
+    than max_gap seconds between observations (stream stopped, tab hidden)
+    counts as 'unknown' rather than as the last state. Corrections are
+    bad -> good transitions of the smoothed state.
+    """
+
+    def __init__(self, now, max_gap=5.0):
+        self.started = now
+        self.max_gap = max_gap
+        self.times = {'good': 0.0, 'bad': 0.0, 'unknown': 0.0}
+        self.corrections = 0
+        self.quality = 'unknown'
+        self.since = now
+        self.last_seen = now
+        self.last_known = None  # last good/bad state, kept across unknown stretches
+
+    def observe(self, quality, now):
+        """Account up to now; returns True if the state changed."""
+        if quality not in self.times:
+            quality = 'unknown'
+        previous = self.quality
+        if now - self.last_seen > self.max_gap:
+            # Nothing heard for a while: the state held until last_seen, then unknown
+            self._switch('unknown', self.last_seen)
+        self.last_seen = now
+        if quality != self.quality:
+            self._switch(quality, now)
+        return self.quality != previous
+
+    def _switch(self, quality, now):
+        if quality == self.quality:
+            return
+        self.times[self.quality] += max(0.0, now - self.since)
+        if quality != 'unknown':
+            # A person stepping away and coming back upright still corrected their posture
+            if self.last_known == 'bad' and quality == 'good':
+                self.corrections += 1
+            self.last_known = quality
+        self.quality = quality
+        self.since = now
+
+    def totals(self, now):
+        """Times per state up to now (the open stretch included) and corrections."""
+        times = dict(self.times)
+        end = now if now - self.last_seen <= self.max_gap else self.last_seen
+        times[self.quality] += max(0.0, end - self.since)
+        if end < now:
+            times['unknown'] += now - end
+        return {
+            'session_duration': now - self.started,
+            'good_time': times['good'],
+            'bad_time': times['bad'],
+            'unknown_time': times['unknown'],
+            'corrections_count': self.corrections,
+            'posture_quality': self.quality
+        }
+
+
+class MonitoringSessions:
+    """
+    Server-side monitoring sessions keyed by user id.
+
+    start() opens a session, the inference pipeline feeds every user's
+    smoothed posture through observe(), and stop() closes the session and
+    saves its row through save(user_id, record). Sessions whose user has
+    stopped sending readings for idle_timeout seconds (tab closed without
+    stopping) are saved and closed by a reaper thread, long sessions are
+    saved in max_segment chunks, and open sessions are saved at exit.
+    on_change(user_id, totals), if given, is called whenever observe()
+    changes a session's posture state, for pushing live totals to clients.
+    """
+
+    def __init__(self, save, good_threshold=0.8, fair_threshold=0.6, max_gap=5.0,
+                 idle_timeout=120.0, max_segment=3600.0, min_duration=5.0, on_change=None):
+        self.save = save
+        self.on_change = on_change
+        self.good_threshold = good_threshold
+        self.fair_threshold = fair_threshold
+        self.max_gap = max_gap
+        self.idle_timeout = idle_timeout
+        self.max_segment = max_segment
+        self.min_duration = min_duration
+        self._lock = threading.Lock()
+        self._sessions = {}  # user_id -> SessionAccumulator
+        self._reaper = None
+        self.rows_saved = 0
+        self.save_failures = 0
+
+    def start(self, user_id, now=None):
+        """Open a session for user_id, saving any session still open for them. Returns the previous row, if any."""
+        now = time.time() if now is None else now
+        with self._lock:
+            previous = self._sessions.pop(user_id, None)
+            self._sessions[user_id] = SessionAccumulator(now, self.max_gap)
+        self._ensure_reaper()
+        return self._finish(user_id, previous, now) if previous else None
+
+    def stop(self, user_id, now=None):
+        """Close user_id's session and save it. Returns the saved record, or None if none was open."""
+        now = time.time() if now is None else now
+        with self._lock:
+            accumulator = self._sessions.pop(user_id, None)
+        return self._finish(user_id, accumulator, now) if accumulator else None
+
+    @property
+    def active_count(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def is_active(self, user_id):
+        with self._lock:
+            return user_id in self._sessions
+
+    def observe(self, user_id, posture_quality, now):
+        """Record user_id's current smoothed posture; ignored unless they have an open session."""
+        with self._lock:
+            accumulator = self._sessions.get(user_id)
+            if accumulator is None or not accumulator.observe(posture_quality, now):
+                return
+            totals = accumulator.totals(now)
+        if self.on_change is not None:
+            try:
+                self.on_change(user_id, totals)
+            except Exception as e:
+                logger.error(f"Session change callback failed for user {user_id}: {e}")
+
+    def stats(self, user_id, now=None):
+        """Live totals for user_id's open session, or None."""
+        now = time.time() if now is None else now
+        with self._lock:
+            accumulator = self._sessions.get(user_id)
+            return accumulator.totals(now) if accumulator else None
+
+    def record(self, totals):
+        """posture_records fields for a finished session's totals."""
+        tracked = totals['good_time'] + totals['bad_time']
+        good_share = totals['good_time'] / tracked if tracked > 0 else 0.0
+        if good_share >= self.good_threshold:
+            posture_type = 'Good Posture'
+        elif good_share >= self.fair_threshold:
+            posture_type = 'Fair Posture'
+        else:
+            posture_type = 'Poor Posture'
+        return {
+            'posture_type': posture_type if tracked > 0 else 'Unknown',
+            'confidence_score': round(good_share, 4),
+            'session_duration': int(round(totals['session_duration'])),
+            'corrections_count': totals['corrections_count'],
+            'good_time': int(round(totals['good_time'])),
+            'bad_time': int(round(totals['bad_time']))
+        }
+
+    def _finish(self, user_id, accumulator, now):
+        totals = accumulator.totals(now)
+        if totals['session_duration'] < self.min_duration:
+            return None
+        record = self.record(totals)
+        try:
+            success, result = self.save(user_id, record)
+        except Exception as e:
+            success, result = False, str(e)
+        if success:
+            self.rows_saved += 1
+            logger.info(f"Saved monitoring session for user {user_id}: {record['posture_type']} "
+                        f"({record['good_time']}s good, {record['bad_time']}s bad, {record['corrections_count']} corrections)")
+        else:
+            self.save_failures += 1
+            logger.error(f"Could not save monitoring session for user {user_id}: {result}")
+        return record
+
+    def _ensure_reaper(self):
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name="monitoring-session-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        interval = max(1.0, min(self.idle_timeout, self.max_segment) / 4)
+        while True:
+            time.sleep(interval)
+            self.reap(time.time())
+
+    def reap(self, now):
+        """Save idle sessions and roll over sessions longer than max_segment."""
+        finished = []
+        with self._lock:
+            for user_id, accumulator in list(self._sessions.items()):
+                if now - accumulator.last_seen >= self.idle_timeout:
+                    finished.append((user_id, self._sessions.pop(user_id), accumulator.last_seen))
+                elif now - accumulator.started >= self.max_segment:
+                    # Save what we have and continue in a fresh segment with the current state
+                    successor = SessionAccumulator(now, self.max_gap)
+                    successor.observe(accumulator.quality, now)
+                    successor.last_known = accumulator.last_known
+                    self._sessions[user_id] = successor
+                    finished.append((user_id, accumulator, now))
+        for user_id, accumulator, end in finished:
+            self._finish(user_id, accumulator, end)
+
+    def flush_all(self):
+        """Save and close every open session (process exit)."""
+        now = time.time()
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for user_id, accumulator in sessions.items():
+            self._finish(user_id, accumulator, min(now, accumulator.last_seen + self.max_gap))
+
+    def register_atexit(self):
+        atexit.register(self.flush_all)
@@ -0,0 +1,79 @@
+import math
+
+
+class PostureSmoother:
+    """
+    Turns per-pass posture readings into a stable posture state.
+
+    Single readings are noisy: one mis-detected frame used to raise an
+    alarm. The smoother keeps a time-weighted EMA (time constant tau
+    seconds) of how often recent readings were bad, so it behaves the same
+    at 2 or 30 inference passes per second. The state only becomes 'bad'
+    once that share reaches enter_bad and only goes back to 'good' once it
+    falls to exit_bad (hysteresis), and either switch must hold for
+    min_dwell seconds before it is committed. With no good/bad reading for
+    unknown_after seconds (nobody in frame) the state becomes 'unknown'.
+
+    The verdict is smoothed rather than the confidence, since confidence
+    means different things for the classifier (class probability) and the
+    rule-based scorer (goodness score).
+    """
+
+    def __init__(self, tau=1.0, enter_bad=0.6, exit_bad=0.4, min_dwell=2.0, unknown_after=2.0):
+        self.tau = tau
+        self.enter_bad = enter_bad
+        self.exit_bad = min(exit_bad, enter_bad)
+        self.min_dwell = min_dwell
+        self.unknown_after = unknown_after
+        self.quality = 'unknown'
+        self.confidence = 0.0
+        self.bad_share = None  # EMA of bad readings (0..1); None until the first reading
+        self.since = None      # time of the last committed transition
+        self.transitions = 0
+        self._pending = None   # (state, first time it was indicated)
+        self._last_reading = None
+
+    def update(self, quality, confidence, now):
+        """Feed one reading ('good', 'bad' or 'unknown'); returns True if the committed state changed."""
+        if quality not in ('good', 'bad'):
+            if self.quality != 'unknown' and now - (self._last_reading or now) >= self.unknown_after:
+                self.bad_share = None
+                self.confidence = 0.0
+                self._pending = None
+                return self._commit('unknown', now)
+            return False
+
+        sample = 1.0 if quality == 'bad' else 0.0
+        if self.bad_share is None:
+            self.bad_share = sample
+            self.confidence = float(confidence)
+        else:
+            dt = max(0.0, now - self._last_reading)
+            alpha = 1.0 if self.tau <= 0 else 1.0 - math.exp(-dt / self.tau)
+            self.bad_share += alpha * (sample - self.bad_share)
+            self.confidence += alpha * (float(confidence) - self.confidence)
+        self._last_reading = now
+
+        if self.bad_share >= self.enter_bad:
+            target = 'bad'
+        elif self.bad_share <= self.exit_bad:
+            target = 'good'
+        else:
+            # Between the thresholds: keep a committed state, otherwise side with the majority
+            target = self.quality if self.quality != 'unknown' else ('bad' if self.bad_share >= 0.5 else 'good')
+
+        if target == self.quality:
+            self._pending = None
+            return False
+        if self._pending is None or self._pending[0] != target:
+            self._pending = (target, now)
+        if now - self._pending[1] >= self.min_dwell:
+            self._pending = None
+            return self._commit(target, now)
+        return False
+
+    def _commit(self, quality, now):
+        self.quality = quality
+        self.since = now
+        self.transitions += 1
+        return True
@@ -0,0 +1,146 @@
+import json
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOLERANCE_DEG = 12.0  # Allowed deviation from the calibrated front angle before marking as bad
+
+
+class InMemoryStateBackend:
+    """
+    Per-user state held in this process.
+
+    Each user's record is an immutable dict that writers replace wholesale
+    under a lock (copy-on-write), so readers such as the polling endpoints
+    never take the lock: a dict lookup always sees either the old or the new
+    record, never a half-written one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = {}
+
+    def get(self, user_id):
+        return self._records.get(user_id) or {}
+
+    def update(self, user_id, **fields):
+        with self._lock:
+            record = dict(self._records.get(user_id) or {})
+            record.update(fields)
+            self._records[user_id] = record
+
+    def pop(self, user_id, field):
+        """Remove a field and return its previous value (None if unset)."""
+        with self._lock:
+            record = self._records.get(user_id)
+            if not record or field not in record:
+                return None
+            record = dict(record)
+            value = record.pop(field)
+            self._records[user_id] = record
+            return value
+
+
+class RedisStateBackend:
+    """
+    Per-user state in a Redis hash per user, shared by every worker process.
+
+    Field values are JSON encoded. Records expire after ttl seconds without
+    a write so abandoned sessions don't accumulate.
+    """
+
+    def __init__(self, url, ttl=86400, prefix='posturease:state'):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._redis.ping()
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, user_id):
+        return f"{self.prefix}:{user_id}"
+
+    def get(self, user_id):
+        raw = self._redis.hgetall(self._key(user_id))
+        return {k.decode(): json.loads(v) for k, v in raw.items()}
+
+    def update(self, user_id, **fields):
+        key = self._key(user_id)
+        pipe = self._redis.pipeline()
+        pipe.hset(key, mapping={k: json.dumps(v) for k, v in fields.items()})
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def pop(self, user_id, field):
+        key = self._key(user_id)
+        pipe = self._redis.pipeline()
+        pipe.hget(key, field)
+        pipe.hdel(key, field)
+        value, removed = pipe.execute()
+        # Only the caller whose HDEL removed the field gets its value
+        return json.loads(value) if removed and value is not None else None
+
+
+class PostureStateStore:
+    """
+    Live monitoring state keyed by user id: latest posture reading, latest
+    landmark points (for calibration), calibration baseline and the pending
+    bad-posture alarm.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def set_posture(self, user_id, posture_quality, confidence, timestamp):
+        self.backend.update(user_id, posture={
+            'posture_quality': posture_quality,
+            'confidence': float(confidence),
+            'timestamp': timestamp,
+            'last_update': timestamp
+        })
+
+    def get_posture(self, user_id):
+        """Latest posture reading for the user, or None."""
+        return self.backend.get(user_id).get('posture')
+
+    def set_points(self, user_id, points):
+        """Store pixel points as a list of (x, y) indexed by landmark id."""
+        self.backend.update(user_id, points=points)
+
+    def get_points(self, user_id):
+        return self.backend.get(user_id).get('points')
+
+    def set_calibration(self, user_id, front_angle_deg, timestamp, tolerance_deg=None):
+        current = self.get_calibration(user_id)
+        self.backend.update(user_id, calibration={
+            'front_angle_deg': front_angle_deg,
+            'timestamp': timestamp,
+            'tolerance_deg': float(tolerance_deg) if tolerance_deg else current['tolerance_deg']
+        })
+
+    def get_calibration(self, user_id):
+        """Calibration baseline for the user (front_angle_deg is None until calibrated)."""
+        return self.backend.get(user_id).get('calibration') or {
+            'front_angle_deg': None,
+            'timestamp': None,
+            'tolerance_deg': DEFAULT_TOLERANCE_DEG
+        }
+
+    def trigger_alarm(self, user_id):
+        self.backend.update(user_id, alarm=True)
+
+    def consume_alarm(self, user_id):
+        """Return True and clear the flag if an alarm is pending for the user."""
+        return bool(self.backend.pop(user_id, 'alarm'))
+
+
+def create_state_store(backend='memory', redis_url=None):
+    """Build the state store, falling back to in-process memory if Redis is unavailable."""
+    if backend == 'redis':
+        try:
+            store = PostureStateStore(RedisStateBackend(redis_url))
+            logger.info(f"Posture state stored in Redis at {redis_url}")
+            return store
+        except Exception as e:
+            logger.warning(f"Redis posture state backend unavailable ({e}); using in-process memory")
+    return PostureStateStore(InMemoryStateBackend())
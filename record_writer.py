@@ -0,0 +1,182 @@
+import atexit
+import threading
+import time
+import logging
+from collections import deque
+from metrics import record_flush_latency
+
+logger = logging.getLogger(__name__)
+
+
+class PostureRecordWriter:
+    """
+    Write-behind queue for posture records.
+
+    submit() only appends to an in-memory queue; a background thread
+    writes the queue out through write_batch(rows) (one multi-row INSERT
+    and one commit, see db.save_posture_records) once batch_size records
+    are waiting or the oldest has waited flush_interval seconds, or at once
+    for urgent records (a user who just stopped monitoring and will open
+    their history next). A failed batch is retried with backoff up to
+    max_retries times before it is dropped. The queue is bounded by
+    max_queue and drained at exit; records submitted after close() are
+    written synchronously.
+    """
+
+    def __init__(self, write_batch, batch_size=50, flush_interval=2.0, max_queue=10000,
+                 max_retries=5, retry_delay=1.0):
+        self.write_batch = write_batch
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._cond = threading.Condition()
+        self._pending = deque()  # (user_id, fields, time queued)
+        self._in_flight = []     # rows of the batch being written
+        self._urgent = False
+        self._stopping = False
+        self._thread = None
+        self.records_written = 0
+        self.records_failed = 0
+        self.records_dropped = 0
+        self.batches_written = 0
+        self.last_flush_ms = None
+
+    @property
+    def queue_depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def submit(self, user_id, fields, urgent=False):
+        """Queue one posture record; returns (True, None), or (False, reason) if the queue is full."""
+        with self._cond:
+            stopping = self._stopping
+        if stopping:
+            # The writer thread is draining or gone; don't leave the record in a queue nobody reads
+            if self._write([(user_id, fields)]):
+                return True, None
+            return False, 'Failed to write posture record'
+        with self._cond:
+            if len(self._pending) >= self.max_queue:
+                self.records_dropped += 1
+                logger.error(f"Posture record queue full ({self.max_queue}); dropping record for user {user_id}")
+                return False, 'Posture record queue is full'
+            self._pending.append((user_id, fields, time.monotonic()))
+            self._urgent = self._urgent or urgent
+            if urgent or len(self._pending) >= self.batch_size:
+                self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="posture-record-writer", daemon=True)
+                self._thread.start()
+        return True, None
+
+    def flush_soon(self):
+        """Write whatever is queued without waiting for a full batch or the flush interval."""
+        with self._cond:
+            if self._pending:
+                self._urgent = True
+                self._cond.notify()
+
+    def discard(self, user_id, timeout=10.0):
+        """
+        Drop user_id's queued records and wait for a batch already being
+        written with theirs, so a following DELETE isn't undone. Returns the
+        number of records dropped.
+        """
+        with self._cond:
+            kept = deque(item for item in self._pending if item[0] != user_id)
+            dropped = len(self._pending) - len(kept)
+            self._pending = kept
+            if not kept:
+                self._urgent = False
+            deadline = time.monotonic() + timeout
+            while any(row[0] == user_id for row in self._in_flight):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"Posture records for user {user_id} still being written after {timeout}s")
+                    break
+                self._cond.wait(remaining)
+        return dropped
+
+    def _next_batch(self):
+        """Wait until a batch is due and take it off the queue; None once stopped and drained."""
+        with self._cond:
+            while True:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return None
+                deadline = self._pending[0][2] + self.flush_interval
+                while self._pending and len(self._pending) < self.batch_size and not (self._urgent or self._stopping):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                # discard() may have emptied the queue meanwhile
+                if self._pending:
+                    break
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            if not self._pending:
+                self._urgent = False
+            self._in_flight = [(user_id, fields) for user_id, fields, _ in batch]
+            return self._in_flight
+
+    def _run(self):
+        while True:
+            rows = self._next_batch()
+            if rows is None:
+                return
+            try:
+                self._write(rows)
+            finally:
+                with self._cond:
+                    self._in_flight = []
+                    self._cond.notify_all()
+
+    def _write(self, rows):
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                success, result = self.write_batch(rows)
+            except Exception as e:
+                success, result = False, str(e)
+            elapsed = time.perf_counter() - started
+            record_flush_latency.observe('ok' if success else 'error', elapsed)
+            self.last_flush_ms = elapsed * 1000.0
+            if success:
+                self.records_written += len(rows)
+                self.batches_written += 1
+                return True
+            if self._stopping or attempt == self.max_retries:
+                break
+            delay = min(30.0, self.retry_delay * 2 ** attempt)
+            logger.warning(f"Writing {len(rows)} posture records failed ({result}); retrying in {delay:g}s")
+            time.sleep(delay)
+        self.records_failed += len(rows)
+        logger.error(f"Dropped {len(rows)} posture records after failed writes: {result}")
+        return False
+
+    def close(self, timeout=10.0):
+        """Write out everything queued and stop the writer thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.warning(f"Posture record writer did not drain within {timeout}s ({self.queue_depth} queued)")
+
+    def register_atexit(self):
+        atexit.register(self.close)
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue_depth,
+            'records_written': self.records_written,
+            'records_failed': self.records_failed,
+            'records_dropped': self.records_dropped,
+            'batches_written': self.batches_written,
+            'last_flush_ms': round(self.last_flush_ms, 2) if self.last_flush_ms is not None else None
+        }
@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+
+class StageTimings:
+    """
+    Rolling per-stage latency samples (milliseconds) for one pipeline.
+
+    Stages are free-form names ('capture', 'pose', 'encode', ...); each keeps
+    its last window samples for percentiles plus running totals. Samples
+    are also fed to histogram (a metrics.Histogram), when given, for /metrics.
+    """
+
+    def __init__(self, window=2000, histogram=None):
+        self.window = window
+        self.histogram = histogram
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._totals = {}  # stage -> [count, total_ms]
+
+    def record(self, stage, ms):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+                self._totals[stage] = [0, 0.0]
+            samples.append(ms)
+            totals = self._totals[stage]
+            totals[0] += 1
+            totals[1] += ms
+        if self.histogram is not None:
+            self.histogram.observe(stage, ms / 1000.0)
+
+    def record_all(self, timings):
+        """Record a {stage: ms} dict, e.g. timings returned by ModelManager.infer()."""
+        for stage, ms in (timings or {}).items():
+            self.record(stage, ms)
+
+    @contextmanager
+    def time(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - started) * 1000.0)
+
+    def summary(self):
+        """{stage: {count, mean, p50, p95, p99, max}} over the sample window (count and mean over all)."""
+        with self._lock:
+            snapshot = {stage: (np.array(samples), tuple(self._totals[stage]))
+                        for stage, samples in self._samples.items()}
+        result = {}
+        for stage, (samples, (count, total)) in sorted(snapshot.items()):
+            p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+            result[stage] = {
+                'count': count,
+                'mean': round(total / count, 3),
+                'p50': round(float(p50), 3),
+                'p95': round(float(p95), 3),
+                'p99': round(float(p99), 3),
+                'max': round(float(samples.max()), 3)
+            }
+        return result
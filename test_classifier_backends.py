@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Parity test for the exported posture classifier backends: the ONNX Runtime
+and OpenVINO exports must give the same top-1 class as the .pt model on the
+validation split (Training Again/yolo_dataset/val)
+"""
+
+import os
+import cv2
+import pytest
+from model_manager import CLASSIFIER_WEIGHTS
+from classifier_backend import exported_path, load_exported_classifier
+
+VAL_DIR = os.path.join('Training Again', 'yolo_dataset', 'val')
+MIN_AGREEMENT = 0.99  # Allow for float rounding on images right at the decision boundary
+MAX_CONFIDENCE_DIFF = 0.01
+
+
+def validation_images():
+    images = []
+    for root, _, files in os.walk(VAL_DIR):
+        images.extend(os.path.join(root, f) for f in sorted(files)
+                      if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')))
+    return images
+
+
+def compare(backend):
+    """Return (agreement, max confidence difference, images compared) against the .pt model."""
+    from ultralytics import YOLO
+    from classifier_backend import UltralyticsClassifier
+
+    reference = UltralyticsClassifier(YOLO(CLASSIFIER_WEIGHTS), CLASSIFIER_WEIGHTS)
+    exported = load_exported_classifier(CLASSIFIER_WEIGHTS, backend)
+    assert exported.names == reference.names, "Class names differ between exports"
+
+    images = validation_images()
+    agree, max_diff = 0, 0.0
+    for path in images:
+        image = cv2.imread(path)
+        ref_name, ref_conf = reference.predict(image)
+        name, conf = exported.predict(image)
+        if name == ref_name:
+            agree += 1
+            max_diff = max(max_diff, abs(conf - ref_conf))
+        else:
+            print(f"  ⚠️ {path}: .pt={ref_name} ({ref_conf:.3f}) {backend}={name} ({conf:.3f})")
+    return agree / len(images), max_diff, len(images)
+
+
+@pytest.mark.parametrize('backend', ['onnx', 'openvino'])
+def test_top1_agreement(backend):
+    """Exported model agrees with the .pt model on the validation split"""
+    if not os.path.exists(CLASSIFIER_WEIGHTS):
+        pytest.skip(f"Trained weights not found: {CLASSIFIER_WEIGHTS}")
+    if not os.path.exists(exported_path(CLASSIFIER_WEIGHTS, backend)):
+        pytest.skip(f"No {backend} export; run 'Training Again/export_classifier.py --format {backend}'")
+    pytest.importorskip('onnxruntime' if backend == 'onnx' else 'openvino')
+    if not validation_images():
+        pytest.skip(f"No validation images in {VAL_DIR}")
+
+    agreement, max_diff, count = compare(backend)
+    print(f"✅ {backend}: top-1 agreement {agreement:.2%} on {count} images, max confidence diff {max_diff:.4f}")
+    assert agreement >= MIN_AGREEMENT
+    assert max_diff <= MAX_CONFIDENCE_DIFF
+
+
+if __name__ == "__main__":
+    print("🧪 Testing exported classifier parity")
+    for backend in ('onnx', 'openvino'):
+        if os.path.exists(exported_path(CLASSIFIER_WEIGHTS, backend)):
+            agreement, max_diff, count = compare(backend)
+            print(f"{backend}: top-1 agreement {agreement:.2%} on {count} images, max confidence diff {max_diff:.4f}")
+        else:
+            print(f"❌ {backend}: no export found at {exported_path(CLASSIFIER_WEIGHTS, backend)}")
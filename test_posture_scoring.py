@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the vectorized posture scorer: checks it against the original
+per-point angle math and times single-frame vs batch scoring
+"""
+
+import time
+import numpy as np
+from posture_scoring import (
+    score_posture, score_posture_batch, NOSE, LEFT_EAR, RIGHT_EAR,
+    LEFT_SHOULDER, RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE
+)
+
+
+def calculate_angle(a, b, c):
+    """Original scalar angle helper"""
+    a, b, c = np.array(a), np.array(b), np.array(c)
+    radians = np.arctan2(c[1]-b[1], c[0]-b[0]) - np.arctan2(a[1]-b[1], a[0]-b[0])
+    angle = np.abs(radians*180.0/np.pi)
+    if angle > 180.0:
+        angle = 360-angle
+    return angle
+
+
+def reference_confidence(points, baseline=None, tol=12.0):
+    """Original dict-of-tuples scoring, kept here as the parity reference"""
+    p = {i: (int(x), int(y)) for i, (x, y) in enumerate(points[:, :2])}
+    neck = calculate_angle(p[RIGHT_EAR], p[RIGHT_SHOULDER], p[RIGHT_HIP])
+    back = calculate_angle(p[RIGHT_SHOULDER], p[RIGHT_HIP], p[RIGHT_KNEE])
+    head = calculate_angle(p[LEFT_EAR], p[NOSE], p[RIGHT_EAR])
+    shoulder = calculate_angle(p[LEFT_SHOULDER], p[RIGHT_SHOULDER],
+                               (p[RIGHT_SHOULDER][0] + 100, p[RIGHT_SHOULDER][1]))
+    ls, rs, nose = p[LEFT_SHOULDER], p[RIGHT_SHOULDER], p[NOSE]
+    mid = ((ls[0] + rs[0]) // 2, (ls[1] + rs[1]) // 2)
+    front_angle = float(abs(np.arctan2(nose[0] - mid[0], -(nose[1] - mid[1])) * 180.0 / np.pi))
+    front = 1.0 if baseline is None else 1.0 - min(abs(front_angle - baseline) / max(tol, 1e-6), 1.0)
+    confidence = (
+        (1.0 - min(abs(170 - neck) / 40.0, 1.0)) * 0.30 +
+        (1.0 - min(abs(175 - back) / 40.0, 1.0)) * 0.30 +
+        (1.0 - min(abs(180 - head) / 30.0, 1.0)) * 0.15 +
+        (1.0 - min(abs(180 - shoulder) / 30.0, 1.0)) * 0.10 +
+        front * 0.15
+    )
+    return max(0.0, min(1.0, confidence))
+
+
+def random_frames(n, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = rng.uniform(-50, 700, size=(n, 33, 4)).astype(np.float32)
+    frames[..., :2] = np.trunc(frames[..., :2])
+    return frames
+
+
+def test_single_frame_parity():
+    """score_posture matches the original scalar math"""
+    frames = random_frames(500)
+    for i, points in enumerate(frames):
+        calibration = {'front_angle_deg': 10.0, 'tolerance_deg': 12.0} if i % 2 else None
+        _, confidence, _, _ = score_posture(points, calibration)
+        expected = reference_confidence(points, 10.0 if calibration else None)
+        assert abs(confidence - expected) < 1e-9, (i, confidence, expected)
+    print("✅ Single-frame scores match the original implementation")
+
+
+def test_batch_parity():
+    """score_posture_batch matches frame-by-frame scoring, including per-frame baselines"""
+    frames = random_frames(500, seed=1)
+    baselines = np.where(np.arange(500) % 3 == 0, np.nan, 8.0)
+    confidence, _, _ = score_posture_batch(frames, baselines)
+    for i, points in enumerate(frames):
+        calibration = None if np.isnan(baselines[i]) else {'front_angle_deg': 8.0}
+        assert abs(confidence[i] - score_posture(points, calibration)[1]) < 1e-12
+    print("✅ Batch scores match single-frame scores")
+
+
+def benchmark(n=5000):
+    frames = random_frames(n, seed=2)
+    start = time.perf_counter()
+    for points in frames[:1000]:
+        reference_confidence(points)
+    reference_us = (time.perf_counter() - start) / 1000 * 1e6
+    start = time.perf_counter()
+    for points in frames[:1000]:
+        score_posture(points)
+    single_us = (time.perf_counter() - start) / 1000 * 1e6
+    start = time.perf_counter()
+    score_posture_batch(frames)
+    batch_us = (time.perf_counter() - start) / n * 1e6
+    print(f"Original: {reference_us:.1f} µs/frame, vectorized: {single_us:.1f} µs/frame, "
+          f"batch of {n}: {batch_us:.2f} µs/frame")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing vectorized posture scoring")
+    test_single_frame_parity()
+    test_batch_parity()
+    benchmark()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for server-side monitoring session accounting: wall-clock time
+per posture state, corrections, gaps and idle/segment flushing
+"""
+
+from posture_sessions import MonitoringSessions
+
+
+def make_sessions(**kwargs):
+    saved = []
+    sessions = MonitoringSessions(lambda user_id, record: (saved.append((user_id, record)) or (True, len(saved))),
+                                  **kwargs)
+    return sessions, saved
+
+
+def observe(sessions, user_id, quality, start, seconds, hz=2.0):
+    """Readings every 1/hz seconds over [start, start + seconds); returns the end time."""
+    for i in range(int(seconds * hz)):
+        sessions.observe(user_id, quality, start + i / hz)
+    return start + seconds
+
+
+def test_time_per_state_and_corrections():
+    """Good/bad time follows the wall clock, a gap counts as unknown, bad -> good is a correction"""
+    sessions, saved = make_sessions()
+    sessions.start(1, now=0.0)
+    t = observe(sessions, 1, 'good', 0.0, 10)
+    t = observe(sessions, 1, 'bad', t, 5)
+    t = observe(sessions, 1, 'good', t, 5)
+    t = observe(sessions, 1, 'bad', t + 20, 10)  # 20 s without readings first
+
+    totals = sessions.stats(1, now=t)
+    assert totals['good_time'] == 14.5 and totals['bad_time'] == 15.0, totals
+    assert totals['unknown_time'] == 20.5 and totals['corrections_count'] == 1, totals
+
+    record = sessions.stop(1, now=t)
+    assert saved == [(1, record)]
+    assert record['session_duration'] == 50 and record['posture_type'] == 'Poor Posture', record
+
+
+def test_same_totals_at_any_rate():
+    """Totals don't depend on how often readings arrive"""
+    results = []
+    for hz in (2.0, 30.0):
+        sessions, _ = make_sessions()
+        sessions.start(1, now=0.0)
+        t = observe(sessions, 1, 'good', 0.0, 8, hz)
+        t = observe(sessions, 1, 'bad', t, 4, hz)
+        totals = sessions.stats(1, now=t)
+        results.append((totals['good_time'], round(totals['bad_time'])))
+    assert results == [(8.0, 4), (8.0, 4)], results
+
+
+def test_idle_and_long_sessions_are_flushed():
+    sessions, saved = make_sessions(idle_timeout=30, max_segment=100)
+    sessions.start(1, now=0.0)
+    observe(sessions, 1, 'good', 0.0, 20)
+    sessions.start(2, now=0.0)
+    observe(sessions, 2, 'good', 0.0, 125)
+
+    sessions.reap(125.0)
+    assert [user_id for user_id, _ in saved] == [1, 2], saved
+    assert saved[0][1]['session_duration'] == 20  # ends at the last reading
+    assert not sessions.is_active(1)
+    # The long session continues in a new segment
+    assert sessions.is_active(2) and sessions.stats(2, now=130.0)['session_duration'] == 5.0
+
+
+def test_state_changes_are_reported():
+    """on_change fires once per state change with the live totals, not on every reading"""
+    changes = []
+    sessions = MonitoringSessions(lambda user_id, record: (True, None),
+                                  on_change=lambda user_id, totals: changes.append((user_id, totals)))
+    sessions.start(1, now=0.0)
+    t = observe(sessions, 1, 'good', 0.0, 10)
+    t = observe(sessions, 1, 'bad', t, 5)
+    observe(sessions, 1, 'good', t, 5)
+
+    assert [totals['posture_quality'] for _, totals in changes] == ['good', 'bad', 'good'], changes
+    assert changes[-1] == (1, sessions.stats(1, now=15.0)) and changes[-1][1]['corrections_count'] == 1
+
+
+if __name__ == "__main__":
+    print("🧪 Testing monitoring session accounting")
+    test_time_per_state_and_corrections()
+    test_same_totals_at_any_rate()
+    test_idle_and_long_sessions_are_flushed()
+    test_state_changes_are_reported()
+    print("✅ All session accounting tests passed")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for posture smoothing: single noisy readings must not flip the
+state, sustained changes must, after the dwell time
+"""
+
+from posture_smoothing import PostureSmoother
+
+
+def feed(smoother, readings, start=0.0, hz=10.0):
+    """Feed (quality, confidence) readings at hz; returns the times the state changed."""
+    changes = []
+    for i, (quality, confidence) in enumerate(readings):
+        now = start + i / hz
+        if smoother.update(quality, confidence, now):
+            changes.append((round(now, 2), smoother.quality))
+    return changes
+
+
+def test_isolated_bad_frames_do_not_alarm():
+    """Occasional bad frames among good ones never commit 'bad'"""
+    smoother = PostureSmoother()
+    readings = [('bad', 0.4) if i % 7 == 3 else ('good', 0.9) for i in range(300)]
+    changes = feed(smoother, readings)
+    assert changes == [(2.0, 'good')], changes
+    assert smoother.quality == 'good'
+
+
+def test_sustained_bad_posture_commits_after_dwell():
+    """A real change commits once, no sooner than min_dwell after it shows"""
+    smoother = PostureSmoother(min_dwell=2.0)
+    feed(smoother, [('good', 0.9)] * 50)
+    changes = feed(smoother, [('bad', 0.3)] * 50, start=5.0)
+    assert len(changes) == 1 and changes[0][1] == 'bad', changes
+    assert changes[0][0] >= 7.0
+    changes = feed(smoother, [('good', 0.9)] * 50, start=10.0)
+    assert len(changes) == 1 and changes[0][1] == 'good', changes
+
+
+def test_hysteresis_holds_between_thresholds():
+    """Alternating readings near 50% keep the committed state instead of toggling"""
+    smoother = PostureSmoother()
+    feed(smoother, [('good', 0.9)] * 50)
+    changes = feed(smoother, [('bad' if i % 2 else 'good', 0.7) for i in range(200)], start=5.0)
+    assert changes == [], changes
+
+
+def test_rate_independent():
+    """The same 3 s of bad posture commits at 2 Hz and at 30 Hz"""
+    for hz in (2.0, 30.0):
+        smoother = PostureSmoother()
+        feed(smoother, [('good', 0.9)] * int(3 * hz), hz=hz)
+        changes = feed(smoother, [('bad', 0.3)] * int(4 * hz), start=3.0, hz=hz)
+        assert [q for _, q in changes] == ['bad'], (hz, changes)
+
+
+def test_unknown_after_person_leaves():
+    smoother = PostureSmoother(unknown_after=2.0)
+    feed(smoother, [('good', 0.9)] * 30)
+    changes = feed(smoother, [('unknown', 0.0)] * 30, start=3.0)
+    assert [q for _, q in changes] == ['unknown'], changes
+    assert smoother.bad_share is None
+
+
+if __name__ == "__main__":
+    print("🧪 Testing posture smoothing")
+    test_isolated_bad_frames_do_not_alarm()
+    test_sustained_bad_posture_commits_after_dwell()
+    test_hysteresis_holds_between_thresholds()
+    test_rate_independent()
+    test_unknown_after_person_leaves()
+    print("✅ All smoothing tests passed")
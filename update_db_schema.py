@@ -64,6 +64,20 @@ def update_db_schema():
             else:
                 raise e
         
+        # Per-user preview mode and stream quality (camera settings page)
+        for column in ('stream_mode', 'stream_preset'):
+            try:
+                cursor.execute(f"""
+                    ALTER TABLE users 
+                    ADD COLUMN {column} VARCHAR(20) NULL
+                """)
+                print(f"Added {column} column")
+            except mysql.connector.Error as e:
+                if "Duplicate column name" in str(e):
+                    print(f"{column} column already exists")
+                else:
+                    raise e
+        
         # Update foreign key constraint for user_face_embeddings to include CASCADE DELETE
         # First, drop the existing foreign key constraint
         cursor.execute("""
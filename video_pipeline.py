@@ -0,0 +1,394 @@
+import threading
+import queue
+import logging
+import time
+import cv2
+import numpy as np
+from camera import CameraStream, camera_registry
+from jpeg_encoder import JpegEncoder
+from posture_events import format_sse
+
+logger = logging.getLogger(__name__)
+
+# Sentinel pushed to subscriber queues when the pipeline shuts down
+_END_OF_STREAM = None
+
+_PART_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+_PART_TRAILER = b'\r\n'
+
+# Preview presets selectable per stream (query string or user settings).
+# max_width 0 keeps the camera resolution.
+STREAM_PRESETS = {
+    'low': {'quality': 50, 'max_width': 480, 'fps': 10},
+    'medium': {'quality': 70, 'max_width': 640, 'fps': 15},
+    'high': {'quality': 85, 'max_width': 960, 'fps': 24},
+    'max': {'quality': 90, 'max_width': 0, 'fps': 30},
+}
+
+
+def resolve_stream_settings(preset='medium', quality=None, max_width=None, fps=None):
+    """
+    Encoding settings for one viewer: the named preset, with any explicitly
+    given value overriding it. Values are clamped to sane ranges; invalid
+    ones fall back to the preset.
+    """
+    settings = dict(STREAM_PRESETS.get(preset) or STREAM_PRESETS['medium'])
+    for key, value, low, high in (('quality', quality, 10, 95),
+                                  ('max_width', max_width, 0, 3840),
+                                  ('fps', fps, 1, 30)):
+        try:
+            if value is not None and value != '':
+                settings[key] = min(max(int(value), low), high)
+        except (TypeError, ValueError):
+            pass
+    # Anything narrower than a thumbnail is a typo, not a request
+    if 0 < settings['max_width'] < 160:
+        settings['max_width'] = 160
+    return settings
+
+
+def multipart_chunk(jpeg):
+    """One multipart/x-mixed-replace part; copies the encoded JPEG exactly once."""
+    return b''.join((_PART_HEADER, jpeg, _PART_TRAILER))
+
+
+def _offer(sub_queue, item):
+    """Put item on a bounded queue, evicting the oldest entry if the client is lagging."""
+    try:
+        sub_queue.put_nowait(item)
+    except queue.Full:
+        try:
+            sub_queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            sub_queue.put_nowait(item)
+        except queue.Full:
+            pass
+
+
+class StreamPipeline:
+    """
+    One camera, one inference loop, many viewers.
+
+    The pipeline thread pulls the newest frame from a CameraStream, runs
+    process_frame() on it and fans multipart JPEG chunks out to every
+    subscriber through a small per-client queue. It starts with the first
+    subscriber and stops once the last one has left. Subscribers carry the
+    id of the logged-in user watching, so process_frame() can attribute
+    posture readings to every viewer through state['user_ids'].
+
+    Each subscriber also has its own encoding settings (quality, max width,
+    target FPS, see resolve_stream_settings()). A frame is only encoded for
+    viewers whose next frame is due, and only once per distinct
+    (quality, max width) among them.
+
+    Pose subscribers (pose_events()) get no video at all: process_frame()
+    leaves a compact landmark payload in state['pose_update'] after each
+    inference pass, which is sent to them as an SSE 'pose' message. While
+    only pose subscribers are connected, state['render'] is False so
+    process_frame() can skip drawing, and nothing is encoded.
+    """
+
+    def __init__(self, camera_index, process_frame, make_state=None, queue_size=2, encoder='auto',
+                 capture_options=None):
+        self.camera_index = camera_index
+        self.capture_options = capture_options or {}  # extra CameraStream arguments (replay mode)
+        self.process_frame = process_frame
+        self.make_state = make_state or dict
+        self.queue_size = queue_size
+        self.encoder = JpegEncoder(encoder)
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._viewers = {}  # subscriber queue -> user id
+        self._settings = {}  # subscriber queue -> encoding settings and next due time (None: pose only)
+        self._last_pose = None
+        self._resize_buffers = {}
+        self._thread = None
+        self._retired_thread = None
+        self.frames_processed = 0
+        self.frames_encoded = 0
+        self._frames_dropped = 0  # capture drops of finished runs
+        self._stream = None
+        self.state = None  # process_frame() state of the running loop, for stats
+        # Encoding stats: per-profile encode time EMA and a 1 s bytes/sec window
+        self._encode_ms = {}
+        self._bytes_total = 0
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self.bytes_per_sec = 0.0
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    @property
+    def is_active(self):
+        with self._lock:
+            return self._thread is not None
+
+    @property
+    def frames_dropped(self):
+        """Captured frames overwritten before the loop picked them up, over all runs."""
+        with self._lock:
+            stream = self._stream
+            return self._frames_dropped + (stream.frames_dropped if stream is not None else 0)
+
+    def viewer_ids(self):
+        """Ids of logged-in users currently watching, in join order."""
+        with self._lock:
+            ids = [self._viewers[q] for q in self._subscribers if self._viewers.get(q) is not None]
+        return list(dict.fromkeys(ids))
+
+    def subscribe(self, user_id=None, settings=None, pose_only=False):
+        sub_queue = queue.Queue(maxsize=self.queue_size)
+        if pose_only:
+            settings = None
+        else:
+            settings = dict(settings or resolve_stream_settings())
+            settings['next_due'] = 0.0
+        with self._lock:
+            self._subscribers.append(sub_queue)
+            self._viewers[sub_queue] = user_id
+            self._settings[sub_queue] = settings
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name=f"stream-pipeline-{self.camera_index}",
+                    daemon=True
+                )
+                self._thread.start()
+        logger.info(f"Subscriber joined camera {self.camera_index} pipeline ({self.subscriber_count} active)")
+        return sub_queue
+
+    def unsubscribe(self, sub_queue):
+        with self._lock:
+            if sub_queue in self._subscribers:
+                self._subscribers.remove(sub_queue)
+            self._viewers.pop(sub_queue, None)
+            self._settings.pop(sub_queue, None)
+        logger.info(f"Subscriber left camera {self.camera_index} pipeline ({self.subscriber_count} active)")
+
+    def frames(self, user_id=None, settings=None):
+        """Generator of multipart JPEG chunks for one client."""
+        sub_queue = self.subscribe(user_id, settings)
+        try:
+            while True:
+                chunk = sub_queue.get()
+                if chunk is _END_OF_STREAM:
+                    break
+                yield chunk
+        finally:
+            self.unsubscribe(sub_queue)
+
+    def _due_subscribers(self, now):
+        """Group subscribers whose next frame is due by (quality, max_width)."""
+        profiles = {}
+        with self._lock:
+            for sub_queue in self._subscribers:
+                settings = self._settings[sub_queue]
+                if settings is None or now < settings['next_due']:
+                    continue
+                # Step the schedule rather than restarting it from now, so camera
+                # jitter doesn't round every interval up to the next frame
+                interval = 1.0 / settings['fps']
+                next_due = settings['next_due'] + interval
+                settings['next_due'] = next_due if next_due > now else now + interval
+                key = (settings['quality'], settings['max_width'])
+                profiles.setdefault(key, []).append(sub_queue)
+        return profiles
+
+    def _scaled(self, frame, max_width):
+        h, w = frame.shape[:2]
+        if not max_width or w <= max_width:
+            return frame
+        size = (max_width, max(1, round(h * max_width / w)))
+        buf = self._resize_buffers.get(max_width)
+        if buf is None or buf.shape[:2] != (size[1], size[0]):
+            buf = self._resize_buffers[max_width] = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        cv2.resize(frame, size, dst=buf, interpolation=cv2.INTER_LINEAR)
+        return buf
+
+    def _deliver(self, frame, timings=None):
+        now = time.monotonic()
+        for (quality, max_width), sub_queues in self._due_subscribers(now).items():
+            started = time.perf_counter()
+            jpeg = self.encoder.encode(self._scaled(frame, max_width), quality)
+            if jpeg is None:
+                continue
+            chunk = multipart_chunk(jpeg)
+            encode_ms = (time.perf_counter() - started) * 1000.0
+            if timings is not None:
+                timings.record('encode', encode_ms)
+            self._record_encode((quality, max_width), encode_ms, len(chunk) * len(sub_queues), now)
+            for sub_queue in sub_queues:
+                _offer(sub_queue, chunk)
+
+    def _record_encode(self, profile, encode_ms, sent_bytes, now):
+        previous = self._encode_ms.get(profile)
+        self._encode_ms[profile] = encode_ms if previous is None else 0.9 * previous + 0.1 * encode_ms
+        self.frames_encoded += 1
+        self._bytes_total += sent_bytes
+        self._window_bytes += sent_bytes
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.bytes_per_sec = self._window_bytes / elapsed
+            self._window_start, self._window_bytes = now, 0
+
+    def stats(self):
+        """Encoding and delivery stats for the stats endpoint."""
+        with self._lock:
+            viewers = [{'user_id': self._viewers.get(q), 'mode': 'pose'} if self._settings[q] is None else
+                       {'user_id': self._viewers.get(q),
+                        'mode': 'video',
+                        'quality': self._settings[q]['quality'],
+                        'max_width': self._settings[q]['max_width'],
+                        'fps': self._settings[q]['fps']} for q in self._subscribers]
+        # The 1 s window only rolls over while frames are encoded
+        idle = time.monotonic() - self._window_start > 2.0
+        return {
+            'camera_index': self.camera_index,
+            'active': self.is_active,
+            'encoder': self.encoder.backend,
+            'subscribers': viewers,
+            'frames_processed': self.frames_processed,
+            'frames_encoded': self.frames_encoded,
+            'frames_dropped': self.frames_dropped,
+            'bytes_sent': self._bytes_total,
+            'bytes_per_sec': 0.0 if idle else round(self.bytes_per_sec, 1),
+            'encode_ms': [{'quality': q, 'max_width': w, 'ms': round(ms, 2)}
+                          for (q, w), ms in sorted(self._encode_ms.items())],
+            'stages': self.state['timings'].summary() if self.state and self.state.get('timings') else {}
+        }
+
+    def pose_events(self, user_id=None, heartbeat=15.0, config=None):
+        """Generator of SSE messages with landmark payloads for one skeleton-only client."""
+        sub_queue = self.subscribe(user_id, pose_only=True)
+        try:
+            if config is not None:
+                yield format_sse('pose-config', config)
+            # Latest reading straight away, so the skeleton doesn't wait for the next pass
+            if self._last_pose is not None:
+                yield self._last_pose
+            while True:
+                try:
+                    message = sub_queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield format_sse('heartbeat', {})
+                    continue
+                if message is _END_OF_STREAM:
+                    break
+                yield message
+        finally:
+            self.unsubscribe(sub_queue)
+
+    def _prepare_state(self, state):
+        state['user_ids'] = self.viewer_ids()
+        with self._lock:
+            pose_only = [self._settings[q] is None for q in self._subscribers]
+        state['render'] = not all(pose_only)
+        state['pose_listeners'] = any(pose_only)
+
+    def _publish_pose(self, payload):
+        message = self._last_pose = format_sse('pose', payload)
+        with self._lock:
+            pose_queues = [q for q in self._subscribers if self._settings[q] is None]
+        for sub_queue in pose_queues:
+            _offer(sub_queue, message)
+
+    def _should_continue(self):
+        # Decide under the lock so a concurrent subscribe() either sees this
+        # thread still running or starts a fresh one
+        with self._lock:
+            if self._subscribers:
+                return True
+            self._thread = None
+            self._retired_thread = threading.current_thread()
+            return False
+
+    def _run(self):
+        # A previous loop may still be releasing the device
+        retired = self._retired_thread
+        if retired is not None and retired is not threading.current_thread():
+            retired.join(timeout=3.0)
+
+        state = self.make_state()
+        timings = state.get('timings')
+        stream = CameraStream(self.camera_index, timings=timings, **self.capture_options)
+        if not stream.start():
+            # Leave devices other pipelines are streaming from alone while re-probing
+            busy = [p.camera_index for p in get_active_pipelines() if p is not self]
+            camera_registry.mark_failed(self.camera_index, skip=busy)
+            with self._lock:
+                subscribers = list(self._subscribers)
+                self._thread = None
+            for sub_queue in subscribers:
+                _offer(sub_queue, _END_OF_STREAM)
+            return
+
+        self.state = state
+        with self._lock:
+            self._stream = stream
+        last_seq = 0
+        try:
+            while self._should_continue():
+                last_seq, frame = stream.read_latest(last_seq)
+                if frame is None:
+                    if not stream.is_running:
+                        break
+                    continue
+
+                self._prepare_state(state)
+                started = time.perf_counter()
+                try:
+                    frame = self.process_frame(frame, state)
+                except Exception as e:
+                    logger.error(f"Error processing frame on camera {self.camera_index}: {e}")
+                if timings is not None:
+                    timings.record('process', (time.perf_counter() - started) * 1000.0)
+
+                self.frames_processed += 1
+                pose_update = state.pop('pose_update', None)
+                if pose_update is not None:
+                    self._publish_pose(pose_update)
+                if state['render']:
+                    self._deliver(frame, timings)
+        finally:
+            stream.stop()
+            with self._lock:
+                self._frames_dropped += stream.frames_dropped
+                self._stream = None
+                subscribers = list(self._subscribers)
+                if self._thread is threading.current_thread():
+                    self._thread = None
+            # Camera failure: tell remaining viewers the stream has ended
+            for sub_queue in subscribers:
+                _offer(sub_queue, _END_OF_STREAM)
+
+
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def get_stream_pipeline(camera_index, process_frame, make_state=None, encoder='auto', capture_options=None):
+    """Return the shared pipeline for camera_index, creating it on first use."""
+    with _pipelines_lock:
+        pipeline = _pipelines.get(camera_index)
+        if pipeline is None:
+            pipeline = StreamPipeline(camera_index, process_frame, make_state, encoder=encoder,
+                                      capture_options=capture_options)
+            _pipelines[camera_index] = pipeline
+        return pipeline
+
+
+def get_all_pipelines():
+    """Return every pipeline created so far, running or not."""
+    with _pipelines_lock:
+        return list(_pipelines.values())
+
+
+def get_active_pipelines():
+    """Return pipelines that currently have a running inference loop."""
+    with _pipelines_lock:
+        return [p for p in _pipelines.values() if p.is_active]